@@ -7,7 +7,7 @@ Config: Bot Config
 import logging
 import sys
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import ValidationError, field_validator
 from pydantic.networks import UrlConstraints
@@ -33,6 +33,11 @@ class ChannelInfo(TypedDict):
     channel_id: int
 
 
+class CacheNamespaceConfig(TypedDict, total=False):
+    maxsize: int
+    ttl: float
+
+
 class Config(BaseSettings):
     """A general configuration setup to read either .env or environment keys."""
 
@@ -50,9 +55,66 @@ class Config(BaseSettings):
 
     MONGO_DB_URL: MongoSRVDsn
     MONGO_DB_NAME: str = "Zaws-File-Share"
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_CONNECT_TIMEOUT_MS: int = 20000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGO_COMPRESSORS: list[str] = []
+    USER_FLUSH_INTERVAL_MS: int = 1000
+    USER_FLUSH_BATCH_SIZE: int = 500
+    USER_LOADER_WINDOW_MS: int = 5
+
+    # Cache config
+    CACHE_NAMESPACES: dict[str, CacheNamespaceConfig] = {}
+    CACHE_INVALIDATION_BACKEND: Literal["memory", "mongo"] = "memory"
+    LINK_CACHE_SIZE: int = 10000
+    LINK_CACHE_SECONDS: int = 600
+    INVALID_LINK_CACHE_SECONDS: int = 60
+    SUBSCRIPTION_CACHE_SIZE: int = 200000
+    SUBSCRIPTION_CACHE_SECONDS: int = 3600
+    SUBSCRIPTION_NEGATIVE_CACHE_SECONDS: int = 5
+    SUBSCRIPTION_CHECK_CONCURRENCY: int = 5
+    BANNED_USERS_REFRESH_SECONDS: int = 60
+
+    # Stats config
+    STATS_DAILY_ROLLUP: bool = True
+    STATS_RECONCILE_SECONDS: int = 3600
+
+    # Broadcast config
+    BROADCAST_WORKERS: int = 10
+    BROADCAST_RATE: float = 25
+    BROADCAST_BATCH_SIZE: int = 200
+    BROADCAST_PROGRESS_SECONDS: int = 15
+
+    # Delivery config
+    DELIVERY_ATTEMPTS: int = 3
+    DELIVERY_WORKERS: int = 4
+    DELIVERY_LEASE_SECONDS: int = 60
+
+    # Auto delete config
+    AUTO_DELETE_PER_SECOND: int = 20
+    AUTO_DELETE_COALESCE_SECONDS: int = 1
+    AUTO_DELETE_LEASE_SECONDS: int = 60
+
+    # Rate limiter config
+    RATE_LIMITER: bool = True
+    RATE_LIMITER_CAPACITY: int = 100000
+    RATE_LIMIT_CHAT_PER_MINUTE: int = 25
+    RATE_LIMIT_USER_PER_MINUTE: int = 25
+    RATE_LIMIT_GLOBAL_PER_SECOND: int = 30
+    RATE_LIMIT_MAX_WAIT_SECONDS: int = 120
+    RATE_LIMITER_BACKEND: Literal["memory", "mongo"] = "memory"
+    RATE_LIMIT_LEASE_SIZE: int = 5
+
+    # Outbound governor config
+    OUTBOUND_PER_SECOND: float = 30
+    OUTBOUND_CHAT_PER_MINUTE: float = 60
+    OUTBOUND_METHOD_PER_SECOND: dict[str, float] = {}
+    FLOOD_WAIT_MAX_SECONDS: int = 60
+    FLOOD_WAIT_JITTER_SECONDS: float = 1
 
     # Bot main config
-    RATE_LIMITER: bool = True
     BACKUP_CHANNEL: int
     ROOT_ADMINS_ID: list[int]
     PRIVATE_REQUEST: bool = False
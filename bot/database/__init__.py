@@ -1,3 +1,14 @@
-from .mongo_db import MongoDB
+from .broadcast import DeadUserPruner, UserSource
+from .connection import DatabaseConnection
+from .models import FileResolverModel, LinkDocument
+from .mongo_db import MongoDB, database
 
-__all__ = ["MongoDB"]
+__all__ = [
+    "DatabaseConnection",
+    "DeadUserPruner",
+    "FileResolverModel",
+    "LinkDocument",
+    "MongoDB",
+    "UserSource",
+    "database",
+]
@@ -0,0 +1,167 @@
+from collections.abc import AsyncIterator, Callable, Coroutine
+from enum import IntFlag
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorCursor, AsyncIOMotorDatabase
+from pymongo import DeleteOne
+
+
+class UserSource(IntFlag):
+    """
+    The collection(s) a user id was found in.
+
+    Attributes:
+        MAIN: The teleshare Users collection.
+        CODEX: The CodeXbotz users collection.
+    """
+
+    MAIN = 1
+    CODEX = 2
+
+
+class Broadcast:
+    db: AsyncIOMotorDatabase
+    increment_stats: Callable[..., Coroutine[Any, Any, None]]
+    forget_users: Callable[[list[int]], None]
+
+    def _user_ids_cursor(self, collection: str, start_after: int | None, batch_size: int) -> AsyncIOMotorCursor:
+        query: dict[str, Any] = {"_id": {"$type": "number"}}
+        if start_after is not None:
+            query["_id"]["$gt"] = start_after
+
+        return self.db[collection].find(query, {"_id": 1}).sort("_id", 1).batch_size(batch_size)
+
+    async def iter_user_ids(
+        self,
+        start_after: int | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[tuple[int, UserSource]]:
+        """
+        Streams the IDs of all users from both user collections in ascending order.
+
+        Both collections are merged while streaming so an ID that exists in both is
+        only yielded once, nothing is materialized in memory.
+
+        Parameters:
+            start_after (int | None): Resume after this user ID, the last ID yielded by a previous run.
+            batch_size (int): Amount of IDs fetched per cursor round trip.
+
+        Yields:
+            tuple[int, UserSource]: The user ID and the collection(s) it was found in.
+        """
+        main_cursor = self._user_ids_cursor("Users", start_after, batch_size)
+        codex_cursor = self._user_ids_cursor("users", start_after, batch_size)
+
+        main_doc = await anext(main_cursor, None)
+        codex_doc = await anext(codex_cursor, None)
+
+        while main_doc is not None or codex_doc is not None:
+            main_id = main_doc["_id"] if main_doc is not None else None
+            codex_id = codex_doc["_id"] if codex_doc is not None else None
+
+            if codex_id is None or (main_id is not None and main_id < codex_id):
+                yield main_id, UserSource.MAIN
+                main_doc = await anext(main_cursor, None)
+            elif main_id is None or codex_id < main_id:
+                yield codex_id, UserSource.CODEX
+                codex_doc = await anext(codex_cursor, None)
+            else:
+                yield main_id, UserSource.MAIN | UserSource.CODEX
+                main_doc = await anext(main_cursor, None)
+                codex_doc = await anext(codex_cursor, None)
+
+    async def count_broadcast_users(self) -> int:
+        """
+        Estimates the amount of users a broadcast will be sent to.
+
+        Returns:
+            int: The estimated amount of users in both user collections.
+        """
+        users_count = await self.db["Users"].estimated_document_count()
+        users_codex_count = await self.db["users"].estimated_document_count()
+        return users_count + users_codex_count
+
+    async def save_broadcast_checkpoint(self, checkpoint: dict[str, Any]) -> None:
+        """
+        Saves the progress of the running broadcast.
+
+        Parameters:
+            checkpoint (dict[str, Any]): The broadcast state to persist.
+        """
+        await self.db["Broadcasts"].replace_one({"_id": "active"}, checkpoint, upsert=True)
+
+    async def get_broadcast_checkpoint(self) -> dict[str, Any] | None:
+        """
+        Retrieves the progress of an unfinished broadcast.
+
+        Returns:
+            dict[str, Any] | None: The persisted broadcast state, or None if no broadcast is running.
+        """
+        return await self.db["Broadcasts"].find_one({"_id": "active"}, {"_id": 0})
+
+    async def clear_broadcast_checkpoint(self) -> None:
+        """Removes the progress of a finished or cancelled broadcast."""
+        await self.db["Broadcasts"].delete_one({"_id": "active"})
+
+    async def cleanup_users(self, unsuccessful_ids: list, unsuccessful_ids_codex: list) -> None:
+        """
+        Cleans up users from the database based on their IDs.
+
+        Parameters:
+            unsuccessful_ids (list): List of user IDs to delete from the database.
+            unsuccessful_ids_codex (list): List of user IDs to delete from the CodeXbotz database.
+        """
+        if unsuccessful_ids:
+            result = await self.db["Users"].bulk_write(
+                [DeleteOne({"_id": user_id}) for user_id in unsuccessful_ids],
+                ordered=False,
+            )
+            await self.increment_stats(users=-result.deleted_count)
+            self.forget_users(unsuccessful_ids)
+
+        if unsuccessful_ids_codex:
+            await self.db["users"].bulk_write(
+                [DeleteOne({"_id": user_id}) for user_id in unsuccessful_ids_codex],
+                ordered=False,
+            )
+
+
+class DeadUserPruner:
+    """
+    Buffers users that can no longer receive messages and deletes them in batches.
+
+    Parameters:
+        database (Broadcast): The database handle used to delete users.
+        batch_size (int): Amount of buffered users that triggers a flush.
+    """
+
+    def __init__(self, database: Broadcast, batch_size: int = 500) -> None:
+        self.database = database
+        self.batch_size = batch_size
+        self.user_ids: list[int] = []
+        self.user_ids_codex: list[int] = []
+        self.pruned = 0
+
+    async def add(self, user_id: int, source: UserSource) -> None:
+        """
+        Buffers a dead user and flushes once the batch is full.
+
+        Parameters:
+            user_id (int): The ID of the user.
+            source (UserSource): The collection(s) the user was found in.
+        """
+        if UserSource.MAIN in source:
+            self.user_ids.append(user_id)
+        if UserSource.CODEX in source:
+            self.user_ids_codex.append(user_id)
+
+        if len(self.user_ids) + len(self.user_ids_codex) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Deletes every buffered user."""
+        user_ids, self.user_ids = self.user_ids, []
+        user_ids_codex, self.user_ids_codex = self.user_ids_codex, []
+
+        self.pruned += len(set(user_ids + user_ids_codex))
+        await self.database.cleanup_users(unsuccessful_ids=user_ids, unsuccessful_ids_codex=user_ids_codex)
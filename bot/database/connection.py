@@ -0,0 +1,79 @@
+from typing import ClassVar
+
+import dns.resolver
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import ConfigurationError
+
+from bot.config import config
+
+
+class DatabaseConnection:
+    """
+    A process-wide motor client shared by every database handle.
+
+    A single client keeps one connection pool, one set of monitor threads and
+    resolves the SRV record once no matter how many handles are created.
+
+    Attributes:
+        _client (ClassVar[AsyncIOMotorClient | None]): The shared client, created on first use.
+    """
+
+    _client: ClassVar[AsyncIOMotorClient | None] = None
+
+    @staticmethod
+    def _create_client() -> AsyncIOMotorClient:
+        """
+        Creates a motor client with the pool, timeout and compression settings from config.
+
+        Returns:
+            AsyncIOMotorClient: The motor client.
+        """
+        client_options = {
+            "host": str(config.MONGO_DB_URL),
+            "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS,
+            "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        }
+        if config.MONGO_COMPRESSORS:
+            client_options["compressors"] = ",".join(config.MONGO_COMPRESSORS)
+
+        try:
+            return AsyncIOMotorClient(**client_options)
+        except ConfigurationError:
+            dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
+            dns.resolver.default_resolver.nameservers = ["8.8.8.8"]
+            return AsyncIOMotorClient(**client_options)
+
+    @classmethod
+    def get_client(cls) -> AsyncIOMotorClient:
+        """
+        Get the shared motor client.
+
+        Returns:
+            AsyncIOMotorClient: The shared motor client.
+        """
+        if cls._client is None:
+            cls._client = cls._create_client()
+        return cls._client
+
+    @classmethod
+    def get_database(cls, name: str | None = None) -> AsyncIOMotorDatabase:
+        """
+        Get a database handle from the shared motor client.
+
+        Parameters:
+            name (str | None): The name of the database. Defaults to config.MONGO_DB_NAME.
+
+        Returns:
+            AsyncIOMotorDatabase: The database handle.
+        """
+        return cls.get_client()[name if name else config.MONGO_DB_NAME]
+
+    @classmethod
+    def close(cls) -> None:
+        """Closes the shared motor client, should only be called during shutdown."""
+        if cls._client is not None:
+            cls._client.close()
+            cls._client = None
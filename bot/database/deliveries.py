@@ -0,0 +1,118 @@
+import datetime
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+
+class Deliveries:
+    """
+    Durable delivery jobs stored as (chat_id, link, offset, message_ids) records.
+
+    The offset is the amount of files already sent, checkpointed after every chunk, so an
+    interrupted delivery resumes from the last sent chunk. Every job is leased by the bot
+    instance delivering it, only jobs whose lease expired are claimed by another instance.
+    """
+
+    db: AsyncIOMotorDatabase
+
+    @staticmethod
+    def _lease_until(lease_seconds: float) -> datetime.datetime:
+        return datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(seconds=lease_seconds)
+
+    async def ensure_delivery_indexes(self) -> None:
+        """Creates the lease index used to claim jobs, should be called once during startup."""
+        await self.db["DeliveryJobs"].create_index("lease_until")
+
+    async def add_delivery_job(self, chat_id: int, link: str, owner: str, lease_seconds: float) -> ObjectId:
+        """
+        Stores a delivery job leased by the bot instance that will deliver it.
+
+        Parameters:
+            chat_id (int): The chat to deliver the files to.
+            link (str): The base64 file link.
+            owner (str): The ID of the bot instance.
+            lease_seconds (float): Seconds before the job can be claimed by another instance.
+
+        Returns:
+            ObjectId: The ID of the job.
+        """
+        result = await self.db["DeliveryJobs"].insert_one(
+            {
+                "chat_id": chat_id,
+                "link": link,
+                "offset": 0,
+                "message_ids": [],
+                "owner": owner,
+                "lease_until": self._lease_until(lease_seconds),
+                "created_at": datetime.datetime.now(tz=datetime.timezone.utc),
+            },
+        )
+        return result.inserted_id
+
+    async def claim_delivery_job(self, owner: str, lease_seconds: float) -> dict | None:
+        """
+        Atomically claims the oldest job whose lease expired, e.g. left by a stopped instance.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+            lease_seconds (float): Seconds before the job can be claimed by another instance.
+
+        Returns:
+            dict | None: The claimed job, None if there is none to claim.
+        """
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        return await self.db["DeliveryJobs"].find_one_and_update(
+            {"lease_until": {"$not": {"$gte": now}}},
+            {"$set": {"owner": owner, "lease_until": self._lease_until(lease_seconds)}},
+            sort=[("_id", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def renew_delivery_jobs(self, owner: str, lease_seconds: float) -> None:
+        """
+        Extends the lease of every job of a bot instance.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+            lease_seconds (float): Seconds before the jobs can be claimed by another instance.
+        """
+        await self.db["DeliveryJobs"].update_many(
+            {"owner": owner},
+            {"$set": {"lease_until": self._lease_until(lease_seconds)}},
+        )
+
+    async def release_delivery_jobs(self, owner: str) -> None:
+        """
+        Expires the lease of every job of a bot instance so another instance resumes them right away.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+        """
+        await self.db["DeliveryJobs"].update_many(
+            {"owner": owner},
+            {"$set": {"lease_until": datetime.datetime.now(tz=datetime.timezone.utc)}},
+        )
+
+    async def checkpoint_delivery_job(self, job_id: ObjectId, offset: int, message_ids: list[int]) -> None:
+        """
+        Saves the progress of a delivery job.
+
+        Parameters:
+            job_id (ObjectId): The ID of the job.
+            offset (int): The amount of files sent so far.
+            message_ids (list[int]): The messages sent since the last checkpoint.
+        """
+        await self.db["DeliveryJobs"].update_one(
+            {"_id": job_id},
+            {"$set": {"offset": offset}, "$push": {"message_ids": {"$each": message_ids}}},
+        )
+
+    async def remove_delivery_job(self, job_id: ObjectId) -> None:
+        """
+        Removes a finished delivery job.
+
+        Parameters:
+            job_id (ObjectId): The ID of the job.
+        """
+        await self.db["DeliveryJobs"].delete_one({"_id": job_id})
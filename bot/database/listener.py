@@ -1,15 +1,20 @@
-from async_lru import alru_cache
+from collections.abc import Callable, Coroutine
+from typing import Any
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 
 class Listener:
     db: AsyncIOMotorDatabase
+    increment_stats: Callable[..., Coroutine[Any, Any, None]]
+    get_user: Callable[[int], Coroutine[Any, Any, dict[str, Any] | None]]
 
-    @alru_cache(maxsize=69, ttl=20)
     async def user_join_request(self, user_id: int, channel_id: int) -> bool:
         """
         Adds a private channel to the user's list of channels in the database.
 
+        The write is an idempotent upsert, a repeated join request leaves the user unchanged.
+
         Parameters:
             user_id (int): The ID of the user.
             channel_id (int): The ID of the channel to add.
@@ -24,9 +29,10 @@ class Listener:
             upsert=True,
         )
 
+        if result.upserted_id is not None:
+            await self.increment_stats(users=1)
         return result.acknowledged
 
-    @alru_cache(maxsize=69, ttl=2)
     async def user_requested_channels(self, user_id: int) -> list:
         """
         Fetches the list of channels for the user from the database.
@@ -37,6 +43,5 @@ class Listener:
         Returns:
             list: The list of private channel IDs the user is part of.
         """
-        collection = self.db["Users"]
-        user_data = await collection.find_one({"_id": user_id}, {"_id": 0, "channels": 1})
+        user_data = await self.get_user(user_id)
         return user_data.get("channels", []) if user_data else []
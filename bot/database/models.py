@@ -0,0 +1,80 @@
+import struct
+
+from pydantic import BaseModel, model_validator
+from pyrogram.file_id import FileId
+from typing_extensions import Self
+
+ALBUM_LIMIT = 10
+ALBUM_MEDIA_TYPES = {"AUDIO", "DOCUMENT", "PHOTO", "VIDEO"}
+MEDIA_TYPES = {*ALBUM_MEDIA_TYPES, "STICKER"}
+
+
+class FileResolverModel(BaseModel):
+    """
+    Represents a file resolver.
+
+    Parameters:
+        file_id (str): The file ID.
+        caption (str | None): The file caption.
+        message_id (int): The message the file is stored in.
+        media_group_id (int | None): The media group the file was sent in.
+        media_type (str | None): The decoded file type, e.g. "DOCUMENT", None if unsupported.
+        album (int | None): The album the file is sent in, None if it is sent on its own.
+        captionable (bool): Whether the file can be sent with a caption.
+    """
+
+    caption: str | None
+    file_id: str
+    message_id: int
+    media_group_id: int | None = None
+    media_type: str | None = None
+    album: int | None = None
+    captionable: bool = True
+
+
+class LinkDocument(BaseModel):
+    """
+    A parsed link document from the Files collection.
+
+    The delivery metadata of the files, i.e. their media type, album and caption flag, is computed
+    once when the document is created so sending a link doesn't decode or regroup its files.
+
+    Parameters:
+        file_origin (int): Where the files came from.
+        files (list[FileResolverModel]): The files the link resolves to.
+        prepared (bool): Whether the delivery metadata of the files was computed, False for old documents.
+    """
+
+    file_origin: int
+    files: list[FileResolverModel]
+    prepared: bool = False
+
+    @model_validator(mode="after")
+    def prepare_files(self) -> Self:
+        """Computes the delivery metadata of the files if the document doesn't have it yet."""
+        if self.prepared:
+            return self
+
+        album, album_size, previous = -1, 0, None
+        for file in self.files:
+            try:
+                media_type = FileId.decode(file_id=file.file_id).file_type.name
+            except (ValueError, IndexError, struct.error):
+                media_type = None
+
+            file.media_type = media_type if media_type in MEDIA_TYPES else None
+            file.captionable = file.media_type != "STICKER"
+
+            # Consecutive files of the same media group are sent as albums of at most ALBUM_LIMIT files.
+            if file.media_group_id is None or file.media_type not in ALBUM_MEDIA_TYPES:
+                file.album, previous = None, None
+                continue
+
+            if previous is None or previous.media_group_id != file.media_group_id or album_size == ALBUM_LIMIT:
+                album, album_size = album + 1, 0
+
+            file.album, previous = album, file
+            album_size += 1
+
+        self.prepared = True
+        return self
@@ -1,10 +1,49 @@
-from async_lru import alru_cache
+import asyncio
+import datetime
+from collections.abc import Hashable
+from typing import ClassVar
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from bot.utilities.invalidation_bus import invalidation_bus
+
 
 class Moderation:
+    """
+    Bans are kept in memory so checking a user never queries the database.
+
+    The set is loaded once on startup, updated by ban_user and unban_user and refreshed with a
+    delta query to pick up bans made by other bot instances, right away when they publish the change
+    on the invalidation bus and periodically in case an event was missed.
+
+    Attributes:
+        _banned_users (ClassVar[set[int]]): The IDs of every banned user.
+        _bans_updated_at (ClassVar[datetime.datetime | None]): The latest ban change seen by the delta query.
+        _refresh_tasks (ClassVar[set[asyncio.Task]]): Refreshes started by invalidation events.
+    """
+
     db: AsyncIOMotorDatabase
 
+    _banned_users: ClassVar[set[int]] = set()
+    _bans_updated_at: ClassVar[datetime.datetime | None] = None
+    _refresh_tasks: ClassVar[set[asyncio.Task]] = set()
+
+    async def _set_banned(self, user_id: int, banned: bool) -> bool:  # noqa: FBT001
+        collection = self.db["Users"]
+        result = await collection.update_one(
+            filter={"_id": user_id},
+            update={"$set": {"_id": user_id, "banned": banned}, "$currentDate": {"ban_updated_at": True}},
+            upsert=False,
+        )
+
+        if result.matched_count:
+            if banned:
+                self._banned_users.add(user_id)
+            else:
+                self._banned_users.discard(user_id)
+            await invalidation_bus.publish("banned_users", user_id)
+        return bool(result.matched_count)
+
     async def ban_user(self, user_id: int) -> bool:
         """
         Bans a user in the database.
@@ -15,14 +54,7 @@ class Moderation:
         Returns:
             bool: Whether the user was successfully banned.
         """
-        collection = self.db["Users"]
-        result = await collection.update_one(
-            filter={"_id": user_id},
-            update={"$set": {"_id": user_id, "banned": True}},
-            upsert=False,
-        )
-
-        return bool(result.matched_count)
+        return await self._set_banned(user_id=user_id, banned=True)
 
     async def unban_user(self, user_id: int) -> bool:
         """
@@ -34,18 +66,11 @@ class Moderation:
         Returns:
             bool: Whether the user was successfully unbanned.
         """
-        collection = self.db["Users"]
-        result = await collection.update_one(
-            filter={"_id": user_id},
-            update={"$set": {"_id": user_id, "banned": False}},
-            upsert=False,
-        )
-        return bool(result.matched_count)
+        return await self._set_banned(user_id=user_id, banned=False)
 
-    @alru_cache(maxsize=69, ttl=15)
-    async def is_user_banned(self, user_id: int) -> bool:
+    def is_user_banned(self, user_id: int) -> bool:
         """
-        Checks if a user is banned in the database.
+        Checks if a user is banned.
 
         Parameters:
             user_id (int): The ID of the user to check.
@@ -53,7 +78,45 @@ class Moderation:
         Returns:
             bool: True if the user is banned, False otherwise.
         """
+        return user_id in self._banned_users
+
+    async def load_banned_users(self) -> None:
+        """Loads every banned user into memory, should be called once during startup."""
         collection = self.db["Users"]
-        user = await collection.find_one({"_id": user_id}, {"_id": 0, "banned": 1})
+        await collection.create_index("ban_updated_at", sparse=True)
+
+        latest = await collection.find_one(
+            {"ban_updated_at": {"$exists": True}},
+            {"_id": 0, "ban_updated_at": 1},
+            sort=[("ban_updated_at", -1)],
+        )
+        Moderation._bans_updated_at = latest["ban_updated_at"] if latest else None
+        Moderation._banned_users = {user["_id"] async for user in collection.find({"banned": True}, {"_id": 1})}
+
+    def bans_invalidated(self, user_id: Hashable | None) -> None:  # noqa: ARG002
+        """
+        Refreshes the bans after another bot instance banned or unbanned a user.
+
+        Parameters:
+            user_id (Hashable | None): The changed user, the delta query picks up every change anyway.
+        """
+        task = asyncio.create_task(self.refresh_banned_users())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def refresh_banned_users(self) -> None:
+        """Applies the bans and unbans made since the last refresh, e.g. by another bot instance."""
+        # $gte, changes made within the same millisecond as the last one seen are applied again.
+        updated_at = self._bans_updated_at
+        cursor = self.db["Users"].find(
+            {"ban_updated_at": {"$gte": updated_at} if updated_at else {"$exists": True}},
+            {"_id": 1, "banned": 1, "ban_updated_at": 1},
+        )
+        async for user in cursor:
+            if user.get("banned"):
+                self._banned_users.add(user["_id"])
+            else:
+                self._banned_users.discard(user["_id"])
+            updated_at = max(updated_at, user["ban_updated_at"]) if updated_at else user["ban_updated_at"]
 
-        return user.get("banned", False) if user else False
+        Moderation._bans_updated_at = updated_at
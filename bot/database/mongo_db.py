@@ -1,59 +1,75 @@
-import dns.resolver
-from async_lru import alru_cache
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConfigurationError
+import asyncio
+import logging
+from collections.abc import Hashable
+from typing import ClassVar
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
 
 from bot.config import config
+from bot.utilities.cache_manager import TTLCache, cache_manager
+from bot.utilities.invalidation_bus import invalidation_bus
 
+from .broadcast import Broadcast
+from .connection import DatabaseConnection
+from .deliveries import Deliveries
 from .listener import Listener
+from .models import LinkDocument
 from .moderation import Moderation
+from .schedules import Schedules
+from .statistics import Statistics
+from .users import Users
+
+logger = logging.getLogger(__name__)
 
 
-class MongoDB(Moderation, Listener):
+class MongoDB(Moderation, Listener, Statistics, Broadcast, Schedules, Users, Deliveries):
     """
     A class representing a MongoDB database connection.
 
+    Link changes are published on the invalidation bus so other bot instances drop their cached copy.
+    Link documents created before their files had delivery metadata are migrated in the background
+    the first time they are fetched.
+
     Parameters:
         name (str | None): The name of the database to connect to. Defaults to config.MONGO_DB_NAME.
+        db (AsyncIOMotorDatabase | None): An existing database handle to use instead of the shared client.
+
+    Attributes:
+        _link_cache (ClassVar[TTLCache]): Parsed link documents shared by every instance.
+        _invalid_links (ClassVar[TTLCache]): Links that are known to not exist in the database.
+        _link_requests (ClassVar[dict[str, asyncio.Task]]): In-flight lookups, used to coalesce concurrent misses.
+        _migrations (ClassVar[set[asyncio.Task]]): Running migrations of old link documents.
     """
 
-    def __init__(self, name: str | None = None) -> None:
-        """
-        Initializes the MongoDB connection.
+    _link_cache: ClassVar[TTLCache] = cache_manager.namespace(
+        "links",
+        TTLCache,
+        maxsize=config.LINK_CACHE_SIZE,
+        ttl=config.LINK_CACHE_SECONDS,
+    )
+    _invalid_links: ClassVar[TTLCache] = cache_manager.namespace(
+        "invalid_links",
+        TTLCache,
+        maxsize=config.LINK_CACHE_SIZE,
+        ttl=config.INVALID_LINK_CACHE_SECONDS,
+    )
+    _link_requests: ClassVar[dict[str, asyncio.Task[LinkDocument | None]]] = {}
+    _migrations: ClassVar[set[asyncio.Task]] = set()
+
+    def __init__(self, name: str | None = None, db: AsyncIOMotorDatabase | None = None) -> None:
+        """
+        Initializes the database handle from the shared MongoDB connection.
 
         Raises:
             ConfigurationError: If the MongoDB connection configuration is invalid.
         """
-        try:
-            self.client = AsyncIOMotorClient(host=str(config.MONGO_DB_URL))
-        except ConfigurationError:
-            dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
-            dns.resolver.default_resolver.nameservers = ["8.8.8.8"]
-            self.client = AsyncIOMotorClient(host=str(config.MONGO_DB_URL))
-        self.db = self.client[name if name else config.MONGO_DB_NAME]
-
-    @alru_cache(maxsize=10, ttl=10)
-    async def add_user(self, user_id: int) -> bool:
-        """
-        Adds a user to the database.
-
-        Parameters:
-            user_id (int): The ID of the user to add.
-
-        Returns:
-            bool: Whether the user was added successfully.
-        """
-        collection = self.db["Users"]
-        result = await collection.update_one(
-            filter={"_id": user_id},
-            update={"$set": {"_id": user_id}},
-            upsert=True,
-        )
-        return result.acknowledged
+        self.db = db if db is not None else DatabaseConnection.get_database(name)
+        self.client = self.db.client
 
     async def add_file(self, file_link: str, file_origin: int, file_data: list[dict[str, str | int]]) -> bool:
         """
-        Adds a file to the database.
+        Adds a file to the database with the delivery metadata of its files.
 
         Parameters:
             file_link (str): The link to the file.
@@ -64,16 +80,20 @@ class MongoDB(Moderation, Listener):
             bool: Whether the file was added successfully.
         """
         collection = self.db["Files"]
+        link_document = LinkDocument.model_validate({"file_origin": file_origin, "files": file_data})
         result = await collection.update_one(
             filter={"_id": file_link},
-            update={
-                "$set": {
-                    "file_origin": file_origin,
-                    "files": file_data,
-                },
-            },
+            update={"$set": link_document.model_dump()},
             upsert=True,
         )
+
+        if result.upserted_id is not None:
+            await self.increment_stats(links=1)
+
+        if result.acknowledged:
+            cache_manager.invalidate("links", file_link)
+            self._link_cache.set(file_link, link_document)
+            await invalidation_bus.publish("links", file_link)
         return result.acknowledged
 
     async def delete_link_document(self, base64_file_link: str) -> bool:
@@ -90,72 +110,107 @@ class MongoDB(Moderation, Listener):
         result = await collection.delete_one(
             filter={"_id": base64_file_link},
         )
+
+        cache_manager.invalidate("links", base64_file_link)
+        self._invalid_links.set(base64_file_link, value=True)
+        await invalidation_bus.publish("links", base64_file_link)
+
+        if result.deleted_count:
+            await self.increment_stats(links=-result.deleted_count)
         return result.deleted_count > 0
 
-    async def get_link_document(self, base64_file_link: str) -> dict | None:
+    @classmethod
+    def link_invalidated(cls, base64_file_link: Hashable | None) -> None:
         """
-        Retrieves a link document from the database.
+        Forgets that a link is invalid and marks its in-flight lookup as stale, runs when links are invalidated.
 
         Parameters:
-            base64_file_link (str): The base64-encoded link to the file.
+            base64_file_link (Hashable | None): The changed link, None if every link changed.
+        """
+        if base64_file_link is None:
+            cls._invalid_links.clear()
+            cls._link_requests.clear()
+        else:
+            cls._invalid_links.pop(base64_file_link)
+            cls._link_requests.pop(base64_file_link, None)  # type: ignore[reportArgumentType]
 
-        Returns:
-            dict | None: The document associated with the link, or None if not found.
+    async def get_link_document(self, base64_file_link: str) -> LinkDocument | None:
         """
-        collection = self.db["Files"]
-        pipeline = [{"$match": {"_id": base64_file_link}}]
+        Retrieves a link document from the cache or the database.
 
-        result = await collection.aggregate(pipeline).to_list(length=None)
-        return result[0] if result else None
+        Concurrent misses for the same link share a single database query.
 
-    async def get_user_ids(self) -> tuple[list[int], list[int]]:
-        """
-        Retrieves the IDs of all users in the database.
+        Parameters:
+            base64_file_link (str): The base64-encoded link to the file.
 
         Returns:
-            tuple[list[int], list[int]]: A tuple containing two lists of user IDs.
+            LinkDocument | None: The document associated with the link, or None if not found.
         """
-        pipeline = [
-            {"$project": {"_id": 1}},
-            {"$group": {"_id": None, "user_ids": {"$addToSet": "$_id"}}},
-            {"$project": {"_id": 0, "user_ids": 1}},
-        ]
-
-        users_collection = self.db["Users"]
-        users_codex_collection = self.db["users"]
+        link_document = self._link_cache.get(base64_file_link)
+        if link_document is not None:
+            return link_document
 
-        user_ids_cursor = users_collection.aggregate(pipeline)
-        user_ids = await user_ids_cursor.to_list(length=None)
+        if base64_file_link in self._invalid_links:
+            return None
 
-        user_ids_codex_cursor = users_codex_collection.aggregate(pipeline)
-        user_ids_codex = await user_ids_codex_cursor.to_list(length=None)
+        task = self._link_requests.get(base64_file_link)
+        if task is None:
+            task = asyncio.create_task(self._fetch_link_document(base64_file_link))
+            self._link_requests[base64_file_link] = task
+            task.add_done_callback(lambda done: self._discard_link_request(base64_file_link, done))
 
-        main_ids = user_ids[0]["user_ids"] if user_ids else []
-        codex_ids = user_ids_codex[0]["user_ids"] if user_ids_codex else []
+        return await asyncio.shield(task)
 
-        return (main_ids, codex_ids)
+    def _discard_link_request(self, base64_file_link: str, task: asyncio.Task) -> None:
+        if self._link_requests.get(base64_file_link) is task:
+            del self._link_requests[base64_file_link]
 
-    async def stats(self) -> tuple[int, int]:
+    async def _fetch_link_document(self, base64_file_link: str) -> LinkDocument | None:
         """
-        Retrieves the number of links and users in the database.
+        Fetches and parses a link document then stores the result in the cache.
+
+        Parameters:
+            base64_file_link (str): The base64-encoded link to the file.
 
         Returns:
-            tuple[int, int]: A tuple containing the number of links and users.
+            LinkDocument | None: The parsed document, or None if not found.
         """
-        link_count = await self.db["Files"].count_documents({})
-        users_count = await self.db["Users"].count_documents({})
-        return (link_count, users_count)
+        document = await self.db["Files"].find_one({"_id": base64_file_link}, {"_id": 0})
+        link_document = LinkDocument(**document) if document else None
+
+        if document and link_document and not document.get("prepared"):
+            task = asyncio.create_task(self._migrate_link_document(base64_file_link, link_document))
+            self._migrations.add(task)
+            task.add_done_callback(self._migrations.discard)
+
+        # The link was added or deleted while this query was in flight, its result is stale.
+        if self._link_requests.get(base64_file_link) is not asyncio.current_task():
+            return link_document
 
-    async def cleanup_users(self, unsuccessful_ids: list, unsuccessful_ids_codex: list) -> None:
+        if link_document:
+            self._link_cache.set(base64_file_link, link_document)
+        else:
+            self._invalid_links.set(base64_file_link, value=True)
+        return link_document
+
+    async def _migrate_link_document(self, base64_file_link: str, link_document: LinkDocument) -> None:
         """
-        Cleans up users from the database based on their IDs.
+        Stores the delivery metadata computed for an old link document.
 
         Parameters:
-            unsuccessful_ids (list): List of user IDs to delete from the database.
-            unsuccessful_ids_codex (list): List of user IDs to delete from the CodeXbotz database.
+            base64_file_link (str): The base64-encoded link to the file.
+            link_document (LinkDocument): The parsed document.
         """
-        if unsuccessful_ids:
-            await self.db["Users"].delete_many({"_id": {"$in": unsuccessful_ids}})
-
-        if unsuccessful_ids_codex:
-            await self.db["users"].delete_many({"_id": {"$in": unsuccessful_ids_codex}})
+        try:
+            await self.db["Files"].update_one(
+                {"_id": base64_file_link, "prepared": {"$ne": True}},
+                {"$set": {"files": link_document.model_dump()["files"], "prepared": True}},
+            )
+        except PyMongoError as e:
+            logger.warning("Couldn't migrate link %s: %s", base64_file_link, e)
+
+
+# create an instance
+database = MongoDB()
+cache_manager.on_invalidate("links", MongoDB.link_invalidated)
+cache_manager.on_invalidate("banned_users", database.bans_invalidated)
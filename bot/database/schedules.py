@@ -0,0 +1,139 @@
+import datetime
+from collections.abc import AsyncIterator
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DeleteMany
+
+
+class Schedules:
+    """
+    Durable auto-delete jobs stored as compact (chat_id, message_ids, link, due_at) records.
+
+    Every job is leased by the bot instance that will run it, only jobs whose lease expired
+    or that were never leased are claimed by another instance.
+    """
+
+    db: AsyncIOMotorDatabase
+
+    @staticmethod
+    def _lease_until(lease_seconds: float) -> datetime.datetime:
+        return datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(seconds=lease_seconds)
+
+    async def ensure_schedule_indexes(self) -> None:
+        """Creates the lease and due time indexes used to claim and remove jobs, should be called once on startup."""
+        collection = self.db["ScheduledDeletes"]
+        await collection.create_index("lease_until")
+        await collection.create_index([("claim", ASCENDING), ("due_at", ASCENDING)])
+        await collection.create_index([("chat_id", ASCENDING), ("due_at", ASCENDING)])
+
+    async def add_scheduled_delete(  # noqa: PLR0913
+        self,
+        chat_id: int,
+        message_ids: list[int],
+        link: str,
+        due_at: datetime.datetime,
+        owner: str,
+        lease_seconds: float,
+    ) -> None:
+        """
+        Stores an auto-delete job leased by the bot instance that will run it.
+
+        Parameters:
+            chat_id (int): The chat ID.
+            message_ids (list[int]): The list of message IDs to delete.
+            link (str): The base64 file link to retrieve the deleted files.
+            due_at (datetime.datetime): When the messages should be deleted.
+            owner (str): The ID of the bot instance.
+            lease_seconds (float): Seconds before the job can be claimed by another instance.
+        """
+        await self.db["ScheduledDeletes"].insert_one(
+            {
+                "chat_id": chat_id,
+                "message_ids": message_ids,
+                "link": link,
+                "due_at": due_at,
+                "owner": owner,
+                "lease_until": self._lease_until(lease_seconds),
+            },
+        )
+
+    async def remove_due_deletes(self, owner: str, chats_due: list[tuple[int, datetime.datetime]]) -> None:
+        """
+        Removes every finished auto-delete job of the given chats leased by a bot instance.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+            chats_due (list[tuple[int, datetime.datetime]]):
+                Chat IDs with the due time of the latest job that was run for them.
+        """
+        if chats_due:
+            await self.db["ScheduledDeletes"].bulk_write(
+                [
+                    DeleteMany({"chat_id": chat_id, "owner": owner, "due_at": {"$lte": due_at}})
+                    for chat_id, due_at in chats_due
+                ],
+                ordered=False,
+            )
+
+    async def renew_scheduled_deletes(self, owner: str, lease_seconds: float) -> None:
+        """
+        Extends the lease of every auto-delete job of a bot instance.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+            lease_seconds (float): Seconds before the jobs can be claimed by another instance.
+        """
+        await self.db["ScheduledDeletes"].update_many(
+            {"owner": owner},
+            {"$set": {"lease_until": self._lease_until(lease_seconds)}},
+        )
+
+    async def release_scheduled_deletes(self, owner: str) -> None:
+        """
+        Expires the lease of every auto-delete job of a bot instance so another instance runs them right away.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+        """
+        await self.db["ScheduledDeletes"].update_many(
+            {"owner": owner},
+            {"$set": {"lease_until": datetime.datetime.now(tz=datetime.timezone.utc)}},
+        )
+
+    async def claim_scheduled_deletes(
+        self,
+        owner: str,
+        lease_seconds: float,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Claims every auto-delete job whose lease expired or that was never leased, e.g. left by a
+        stopped instance, and streams them ordered by due time.
+
+        Each job is claimed atomically so a job is never claimed by two instances, a random claim
+        ID tells the jobs claimed by this call apart from the ones the instance already runs.
+
+        Parameters:
+            owner (str): The ID of the bot instance.
+            lease_seconds (float): Seconds before the jobs can be claimed by another instance.
+            batch_size (int): Amount of jobs fetched per cursor round trip.
+
+        Yields:
+            dict: A claimed job, due_at is always timezone aware.
+        """
+        collection = self.db["ScheduledDeletes"]
+        claim = ObjectId()
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        result = await collection.update_many(
+            {"lease_until": {"$not": {"$gte": now}}},
+            {"$set": {"owner": owner, "lease_until": self._lease_until(lease_seconds), "claim": claim}},
+        )
+        if not result.modified_count:
+            return
+
+        cursor = collection.find({"claim": claim}, {"_id": 0}).sort("due_at", 1).batch_size(batch_size)
+        async for job in cursor:
+            if job["due_at"].tzinfo is None:
+                job["due_at"] = job["due_at"].replace(tzinfo=datetime.timezone.utc)
+            yield job
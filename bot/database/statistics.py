@@ -0,0 +1,90 @@
+import datetime
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from bot.config import config
+
+
+class Statistics:
+    """
+    Maintained link and user counters so stats never scan a whole collection.
+
+    Totals are kept in the "totals" document of the Stats collection, daily rollups
+    of new users and links are kept in "daily:YYYY-MM-DD" documents.
+    """
+
+    db: AsyncIOMotorDatabase
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.datetime.now(tz=datetime.timezone.utc).strftime("%Y-%m-%d")
+
+    async def increment_stats(self, links: int = 0, users: int = 0) -> None:
+        """
+        Increments the maintained counters, negative values decrements them.
+
+        Parameters:
+            links (int): Amount of links added or removed.
+            users (int): Amount of users added or removed.
+        """
+        if not links and not users:
+            return
+
+        operations = [UpdateOne({"_id": "totals"}, {"$inc": {"links": links, "users": users}}, upsert=True)]
+
+        new_links, new_users = max(links, 0), max(users, 0)
+        if config.STATS_DAILY_ROLLUP and (new_links or new_users):
+            today = self._today()
+            operations.append(
+                UpdateOne(
+                    {"_id": f"daily:{today}"},
+                    {"$inc": {"links": new_links, "users": new_users}, "$setOnInsert": {"date": today}},
+                    upsert=True,
+                ),
+            )
+
+        await self.db["Stats"].bulk_write(operations, ordered=False)
+
+    async def reconcile_stats(self) -> tuple[int, int]:
+        """
+        Resets the maintained counters from the collections metadata.
+
+        Returns:
+            tuple[int, int]: A tuple containing the number of links and users.
+        """
+        link_count = await self.db["Files"].estimated_document_count()
+        users_count = await self.db["Users"].estimated_document_count()
+
+        await self.db["Stats"].update_one(
+            filter={"_id": "totals"},
+            update={"$set": {"links": link_count, "users": users_count}},
+            upsert=True,
+        )
+        return (link_count, users_count)
+
+    async def stats(self) -> tuple[int, int]:
+        """
+        Retrieves the number of links and users in the database.
+
+        Returns:
+            tuple[int, int]: A tuple containing the number of links and users.
+        """
+        totals = await self.db["Stats"].find_one({"_id": "totals"})
+        if not totals:
+            return await self.reconcile_stats()
+
+        return (max(totals.get("links", 0), 0), max(totals.get("users", 0), 0))
+
+    async def daily_stats(self, days: int = 7) -> list[dict]:
+        """
+        Retrieves the daily rollups of new links and users.
+
+        Parameters:
+            days (int): Amount of most recent days to retrieve.
+
+        Returns:
+            list[dict]: Rollups with date, links and users keys, newest first.
+        """
+        cursor = self.db["Stats"].find({"_id": {"$regex": "^daily:"}}, {"_id": 0}).sort("date", -1).limit(days)
+        return await cursor.to_list(length=days)
@@ -0,0 +1,177 @@
+import asyncio
+import functools
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Coroutine
+from typing import Any, ClassVar
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from bot.config import config
+from bot.utilities.cache_manager import BatchLoader
+
+logger = logging.getLogger(__name__)
+
+
+class KnownUsers:
+    """
+    A compact set of user IDs.
+
+    The IDs loaded on startup are kept in a sorted array of 8 bytes per user, changes made
+    since then are kept in small sets on top of it.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = array("q")
+        self.added: set[int] = set()
+        self.removed: set[int] = set()
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id in self.added:
+            return True
+        if user_id in self.removed:
+            return False
+        index = bisect_left(self.loaded, user_id)
+        return index < len(self.loaded) and self.loaded[index] == user_id
+
+    def add(self, user_id: int) -> None:
+        self.added.add(user_id)
+        self.removed.discard(user_id)
+
+    def discard(self, user_id: int) -> None:
+        self.added.discard(user_id)
+        self.removed.add(user_id)
+
+    def replace_loaded(self, user_ids: array) -> None:
+        """
+        Replaces the loaded IDs, changes made while they were loading are kept.
+
+        Parameters:
+            user_ids (array): The user IDs in ascending order.
+        """
+        self.loaded = user_ids
+
+
+class Users:
+    """
+    Users are written behind: a user is only written once, new users are buffered and
+    upserted in batches every USER_FLUSH_INTERVAL_MS or USER_FLUSH_BATCH_SIZE users.
+
+    User lookups made within USER_LOADER_WINDOW_MS of each other are read with a single query.
+
+    Attributes:
+        _known_users (ClassVar[KnownUsers]): Every user known to be in the Users collection or buffered.
+        _pending_users (ClassVar[set[int]]): New users waiting to be written.
+        _flush_task (ClassVar[asyncio.Task | None]): The scheduled flush of the pending users.
+    """
+
+    db: AsyncIOMotorDatabase
+    increment_stats: Callable[..., Coroutine[Any, Any, None]]
+
+    _known_users: ClassVar[KnownUsers] = KnownUsers()
+    _pending_users: ClassVar[set[int]] = set()
+    _flush_task: ClassVar[asyncio.Task | None] = None
+
+    @functools.cached_property
+    def _user_loader(self) -> BatchLoader[int, dict[str, Any]]:
+        return BatchLoader(load_many=self._load_users, window=config.USER_LOADER_WINDOW_MS / 1000)
+
+    async def _load_users(self, user_ids: list[int]) -> dict[int, dict[str, Any]]:
+        cursor = self.db["Users"].find({"_id": {"$in": user_ids}}, {"banned": 1, "channels": 1})
+        return {user["_id"]: user async for user in cursor}
+
+    async def get_user(self, user_id: int) -> dict[str, Any] | None:
+        """
+        Fetches a user document, concurrent lookups are batched into a single query.
+
+        Parameters:
+            user_id (int): The ID of the user.
+
+        Returns:
+            dict[str, Any] | None: The user's banned and channels fields, or None if the user does not exist.
+        """
+        return await self._user_loader.load(user_id)
+
+    async def load_known_users(self, batch_size: int = 10000) -> None:
+        """
+        Loads the IDs of every user into memory, can run in the background during startup.
+
+        Parameters:
+            batch_size (int): Amount of IDs fetched per cursor round trip.
+        """
+        user_ids = array("q")
+        cursor = self.db["Users"].find({"_id": {"$type": "number"}}, {"_id": 1}).sort("_id", 1).batch_size(batch_size)
+        async for user in cursor:
+            user_ids.append(user["_id"])
+
+        self._known_users.replace_loaded(user_ids)
+        logger.info("Loaded %d known users", len(user_ids))
+
+    def forget_users(self, user_ids: list[int]) -> None:
+        """
+        Removes deleted users from the known users so they are written again if they come back.
+
+        Parameters:
+            user_ids (list[int]): The IDs of the deleted users.
+        """
+        for user_id in user_ids:
+            self._known_users.discard(user_id)
+            self._pending_users.discard(user_id)
+
+    async def add_user(self, user_id: int) -> bool:
+        """
+        Adds a user to the database, new users are buffered and written in batches.
+
+        Parameters:
+            user_id (int): The ID of the user to add.
+
+        Returns:
+            bool: Whether the user is new.
+        """
+        if user_id in self._known_users:
+            return False
+
+        self._known_users.add(user_id)
+        self._pending_users.add(user_id)
+
+        if len(self._pending_users) >= config.USER_FLUSH_BATCH_SIZE:
+            # Failures are kept out of the caller, e.g. /start, the users stay buffered for the next flush.
+            await self._try_flush_users()
+        elif Users._flush_task is None:
+            Users._flush_task = asyncio.create_task(self._flush_users_later())
+        return True
+
+    async def _flush_users_later(self) -> None:
+        await asyncio.sleep(config.USER_FLUSH_INTERVAL_MS / 1000)
+        Users._flush_task = None
+        await self._try_flush_users()
+
+    async def _try_flush_users(self) -> None:
+        try:
+            await self.flush_users()
+        except Exception:
+            logger.exception("Couldn't write new users, retrying later")
+            if Users._flush_task is None:
+                Users._flush_task = asyncio.create_task(self._flush_users_later())
+
+    async def flush_users(self) -> None:
+        """Writes every buffered user, should also be called on shutdown."""
+        if not self._pending_users:
+            return
+
+        user_ids = list(self._pending_users)
+        self._pending_users.clear()
+
+        try:
+            result = await self.db["Users"].bulk_write(
+                [UpdateOne({"_id": user_id}, {"$set": {"_id": user_id}}, upsert=True) for user_id in user_ids],
+                ordered=False,
+            )
+        except Exception:
+            self._pending_users.update(user_ids)
+            raise
+
+        if result.upserted_count:
+            await self.increment_stats(users=result.upserted_count)
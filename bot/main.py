@@ -1,18 +1,21 @@
 import asyncio
 import logging
 import sys
-import threading
 
-from pyrogram.client import Client
 from pyrogram.errors import ChannelInvalid, ChatAdminRequired
 from pyrogram.sync import idle
 from rich.logging import RichHandler
 from rich.traceback import install
 
 from bot.config import config
+from bot.database import DatabaseConnection, database
 from bot.options import options
-from bot.utilities.helpers import NoInviteLinkError, PyroHelper, RateLimiter
+from bot.utilities.broadcast_manager import broadcast_manager
+from bot.utilities.delivery_queue import delivery_queue
+from bot.utilities.helpers import MongoLimiterBackend, NoInviteLinkError, PyroHelper, RateLimiter
 from bot.utilities.http_server import HTTPServer
+from bot.utilities.invalidation_bus import MongoTransport, invalidation_bus
+from bot.utilities.outbound_governor import GovernedClient
 from bot.utilities.schedule_manager import schedule_manager
 
 install(show_locals=True)
@@ -38,7 +41,7 @@ background_tasks = set()
 
 
 async def main() -> None:
-    bot_client = Client(
+    bot_client = GovernedClient(
         name=config.BOT_SESSION,
         api_id=config.API_ID,
         api_hash=config.API_HASH,
@@ -50,6 +53,22 @@ async def main() -> None:
 
     # Load database settings
     await options.load_settings()
+    await database.load_banned_users()
+    # The counters are only incremented from here on, seed them before any handler runs.
+    await database.reconcile_stats()
+    known_users_task = asyncio.create_task(database.load_known_users())
+    background_tasks.add(known_users_task)
+    known_users_task.add_done_callback(background_tasks.discard)
+
+    if config.RATE_LIMITER_BACKEND == "mongo":
+        limiter_backend = MongoLimiterBackend(db=database.db, lease_size=config.RATE_LIMIT_LEASE_SIZE)
+        await limiter_backend.setup()
+        RateLimiter.use_backend(limiter_backend)
+
+    if config.CACHE_INVALIDATION_BACKEND == "mongo":
+        invalidation_bus.use_transport(MongoTransport(db=database.db))
+    await invalidation_bus.start()
+
     await bot_client.start()
     # Bot setup
 
@@ -62,24 +81,35 @@ async def main() -> None:
     except (ChannelInvalid, ChatAdminRequired, NoInviteLinkError) as e:
         sys.exit(f"Please add and give me permission in FORCE_SUB_CHANNELS and BACKUP_CHANNEL:\n{e}")
 
-    await schedule_manager.start()
+    await schedule_manager.start(client=bot_client)
+    if config.STATS_RECONCILE_SECONDS:
+        schedule_manager.schedule_interval(func=database.reconcile_stats, seconds=config.STATS_RECONCILE_SECONDS)
+    if config.BANNED_USERS_REFRESH_SECONDS:
+        schedule_manager.schedule_interval(
+            func=database.refresh_banned_users,
+            seconds=config.BANNED_USERS_REFRESH_SECONDS,
+        )
+
+    await delivery_queue.start(client=bot_client)
+    await broadcast_manager.resume(client=bot_client)
 
     task = None
     if config.HTTP_SERVER:
         http_server = HTTPServer(host=config.HOSTNAME, port=config.PORT)
         task = asyncio.create_task(http_server.run_server())
         background_tasks.add(task)
-    if config.RATE_LIMITER:
-        thread = threading.Thread(target=RateLimiter.cooldown_limiter)
-        thread.daemon = True
-        thread.start()
 
     await idle()
 
     if task:
         task.add_done_callback(background_tasks.discard)
 
+    await delivery_queue.stop()
+    await schedule_manager.stop()
     await bot_client.stop()
+    await invalidation_bus.stop()
+    await database.flush_users()
+    DatabaseConnection.close()
 
 
 asyncio.run(main())
@@ -1,6 +1,13 @@
+import asyncio
+from collections.abc import Hashable
+from typing import ClassVar
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel
 
 from bot.database import MongoDB
+from bot.utilities.cache_manager import cache_manager
+from bot.utilities.invalidation_bus import invalidation_bus
 
 
 class SettingsModel(BaseModel):
@@ -55,14 +62,19 @@ class Options(MongoDB):
     """
     A class representing the bot's options.
 
+    Updates are published on the invalidation bus so other bot instances reload their settings.
+
     Parameters:
+        db (AsyncIOMotorDatabase | None): An existing database handle, defaults to the shared connection.
         self.settings (SettingsModel): The bot's settings.
         self.collection (str): The name of the collection.
         self.document_id (str): The ID of the document to retrieve/update settings.
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    _reload_tasks: ClassVar[set[asyncio.Task]] = set()
+
+    def __init__(self, db: AsyncIOMotorDatabase | None = None) -> None:
+        super().__init__(db=db)
         self.settings = SettingsModel()
         self.collection = "BotSettings"
         self.document_id = "MainOptions"
@@ -91,6 +103,23 @@ class Options(MongoDB):
             upsert=True,
         )
 
+    async def reload_settings(self) -> None:
+        """Reads the settings without saving them, e.g. after another bot instance updated them."""
+        settings_doc = await self.db[self.collection].find_one({"_id": self.document_id})
+        if settings_doc:
+            self.settings = SettingsModel(**settings_doc)
+
+    def settings_invalidated(self, key: Hashable | None) -> None:  # noqa: ARG002
+        """
+        Reloads the settings after another bot instance updated them.
+
+        Parameters:
+            key (Hashable | None): The updated key, every key is reloaded anyway.
+        """
+        task = asyncio.create_task(self.reload_settings())
+        self._reload_tasks.add(task)
+        task.add_done_callback(self._reload_tasks.discard)
+
     async def update_settings(self, key: str, value: str | int) -> SettingsModel:
         """
         Update the settings and save them to the MongoDB collection.
@@ -118,6 +147,7 @@ class Options(MongoDB):
         if annotation is not None and not isinstance(value, annotation):
             raise InvalidValueError(key)
 
+        previous_value = getattr(self.settings, key)
         setattr(self.settings, key, value)
         self.settings = SettingsModel(**self.settings.model_dump())
 
@@ -129,8 +159,17 @@ class Options(MongoDB):
             update=update,
             upsert=True,
         )
+
+        # Also the new ID, the same message may have been edited and set again.
+        for option_value in (previous_value, value):
+            if isinstance(option_value, int) and not isinstance(option_value, bool):
+                cache_manager.invalidate("option_messages", option_value)
+                await invalidation_bus.publish("option_messages", option_value)
+
+        await invalidation_bus.publish("options", key)
         return self.settings
 
 
 # create an instance
 options = Options()
+cache_manager.on_invalidate("options", options.settings_invalidated)
@@ -7,17 +7,17 @@ from pyrogram.client import Client
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from bot.config import config
-from bot.database import MongoDB
+from bot.database import database
 from bot.options import options
 from bot.utilities.helpers import DataEncoder, RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import ConvoMessage, PyroFilters
 from bot.utilities.pyrotools import FileResolverModel
 
 
 class AutoLinkGen:
-    database = MongoDB()
     background_tasks: ClassVar[set[asyncio.Task]] = set()
-    files_cache: ClassVar[dict[int, dict[int, list[FileResolverModel]]]] = {}
+    files_cache: ClassVar[dict[tuple[int, str], list[FileResolverModel]]] = {}
 
     @classmethod
     async def process_files(
@@ -33,7 +33,7 @@ class AutoLinkGen:
         file_origin = config.BACKUP_CHANNEL if options.settings.BACKUP_FILES else message.chat.id
         file_datas = [i.model_dump() for i in file_data]
 
-        add_file = await cls.database.add_file(file_link=file_link, file_origin=file_origin, file_data=file_datas)
+        add_file = await database.add_file(file_link=file_link, file_origin=file_origin, file_data=file_datas)
 
         if add_file:
             link = f"https://t.me/{client.me.username}?start={file_link}"  # type: ignore[reportOptionalMemberAccess]
@@ -54,7 +54,12 @@ class AutoLinkGen:
     async def media_group_handler(cls, client: Client, message: Message) -> None:
         "backup"
         await asyncio.sleep(3)
-        file_datas = [i.model_dump() for i in cls.files_cache[message.from_user.id][message.media_group_id]]
+        media_group_key = (message.from_user.id, message.media_group_id)
+        media_group_files = cls.files_cache.pop(media_group_key, [])
+        if not media_group_files:
+            return
+
+        file_datas = [i.model_dump() for i in media_group_files]
 
         if options.settings.BACKUP_FILES:
             forwarded_messages = await client.forward_messages(
@@ -75,7 +80,6 @@ class AutoLinkGen:
         else:
             file_datas = [FileResolverModel(**d) for d in file_datas]
 
-        del cls.files_cache[message.from_user.id][message.media_group_id]
         await cls.process_files(client=client, message=message, file_data=file_datas)
 
     @classmethod
@@ -91,14 +95,16 @@ class AutoLinkGen:
         )
 
         if message.media_group_id:
-            if not cls.files_cache.get(user_id, {}).get(message.media_group_id):
-                cls.files_cache[user_id] = {message.media_group_id: []}
+            media_group_key = (user_id, message.media_group_id)
+            media_group_files = cls.files_cache.get(media_group_key)
+            if media_group_files is None:
+                media_group_files = cls.files_cache[media_group_key] = []
                 task = asyncio.create_task(cls.media_group_handler(client=client, message=message))
                 cls.background_tasks.add(task)
                 task.add_done_callback(cls.background_tasks.discard)
 
             resolve_file.media_group_id = message.media_group_id
-            cls.files_cache[user_id][message.media_group_id].append(resolve_file)
+            media_group_files.append(resolve_file)
         else:
             if options.settings.BACKUP_FILES:
                 backup_file = await message.copy(chat_id=config.BACKUP_CHANNEL)
@@ -108,13 +114,16 @@ class AutoLinkGen:
 
 
 @Client.on_message(
-    filters.private
-    & PyroFilters.admin(allow_global=True)
-    & PyroFilters.subscription()
-    & PyroFilters.user_not_in_conversation()
-    & (filters.audio | filters.photo | filters.video | filters.document | filters.sticker),
+    PyroFilters.all_of(
+        filters.private,
+        PyroFilters.admin(allow_global=True),
+        PyroFilters.subscription(),
+        PyroFilters.user_not_in_conversation(),
+        filters.audio | filters.photo | filters.video | filters.document | filters.sticker,
+    ),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def auto_link_gen(client: Client, message: ConvoMessage) -> Message | None:
     """Handle files that is send or forwarded directly to the bot and generate a link for it."""
 
@@ -5,18 +5,18 @@ from pyrogram.client import Client
 from pyrogram.types import Message
 
 from bot.config import config
-from bot.database import MongoDB
+from bot.database import database
 from bot.utilities.helpers import RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import PyroFilters
-from bot.utilities.pyrotools import FileResolverModel, HelpCmd
-
-database = MongoDB()
+from bot.utilities.pyrotools import HelpCmd
 
 
 @Client.on_message(
     filters.private & PyroFilters.admin() & filters.command("delete_link"),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def delete_link(client: Client, message: Message) -> Message:
     """Delete an existing link.
 
@@ -35,8 +35,8 @@ async def delete_link(client: Client, message: Message) -> Message:
             quote=True,
         )
 
-    file_origin = file_document["file_origin"]
-    file_data = [FileResolverModel(**file) for file in file_document["files"]]
+    file_origin = file_document.file_origin
+    file_data = file_document.files
 
     delete_link_document = await database.delete_link_document(base64_file_link=base64_file_link)
 
@@ -7,9 +7,10 @@ from pyrogram.client import Client
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from bot.config import config
-from bot.database import MongoDB
+from bot.database import database
 from bot.options import options
 from bot.utilities.helpers import DataEncoder, RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import ConvoMessage, PyroFilters
 from bot.utilities.pyrotools import HelpCmd
 
@@ -22,11 +23,30 @@ class CacheEntry(TypedDict):
 
 
 class MakeFilesCommand:
-    """Make files command class."""
+    """
+    Make files command class.
+
+    Attributes:
+        files_cache (ClassVar[dict[int, CacheEntry]]):
+            The files of every open conversation. Kept out of the cache manager, an entry lives exactly
+            as long as its conversation and must never expire or be evicted while it is open.
+    """
 
-    database = MongoDB()
     files_cache: ClassVar[dict[int, CacheEntry]] = {}
 
+    @classmethod
+    def get_entry(cls, unique_id: int) -> CacheEntry:
+        """
+        Retrieves the files of a conversation, a new entry is created if it is missing.
+
+        Parameters:
+            unique_id (int): The conversation ID.
+
+        Returns:
+            CacheEntry: The conversation files.
+        """
+        return cls.files_cache.setdefault(unique_id, CacheEntry(files=[], counter=0))
+
     @staticmethod
     @RateLimiter.hybrid_limiter(func_count=1)
     async def message_reply(client: Client, message: Message, **kwargs: Any) -> Message:  # noqa: ANN401, ARG004
@@ -56,7 +76,7 @@ class MakeFilesCommand:
             Message: The replied message.
         """
         unique_id = message.chat.id + message.from_user.id
-        cls.files_cache.setdefault(unique_id, {"files": [], "counter": 0})
+        cls.get_entry(unique_id)
         return await cls.message_reply(client=client, message=message, text="Send your files.", quote=True)
 
     @classmethod
@@ -83,8 +103,9 @@ class MakeFilesCommand:
                 quote=True,
             )
 
-        cls.files_cache[unique_id]["counter"] += 1
-        cls.files_cache[unique_id]["files"].append(
+        entry = cls.get_entry(unique_id)
+        entry["counter"] += 1
+        entry["files"].append(
             {
                 "caption": message.caption.markdown if message.caption else None,
                 "file_id": file_type.file_id,
@@ -94,12 +115,12 @@ class MakeFilesCommand:
             },
         )
 
-        current_files_count = cls.files_cache[unique_id]["counter"]
+        current_files_count = entry["counter"]
         await asyncio.sleep(0.1)
-        if cls.files_cache[unique_id]["counter"] != current_files_count:
+        if entry["counter"] != current_files_count:
             return None
 
-        file_names = "\n".join(i["file_name"] for i in cls.files_cache[unique_id]["files"])
+        file_names = "\n".join(i["file_name"] for i in entry["files"])
         extra_message = ">File list truncated.\n- Send more files to continue.\n- Use /make_link for a shareable link."
         return await cls.message_reply(
             client=client,
@@ -128,13 +149,14 @@ class MakeFilesCommand:
         """
         forward_limit_size = 100
         unique_id = message.chat.id + message.from_user.id
+        entry = cls.get_entry(unique_id)
         user_cache_chunk = [
-            [file["message_id"] for file in cls.files_cache[unique_id]["files"][i : i + forward_limit_size]]
-            for i in range(0, len(cls.files_cache[unique_id]["files"]), forward_limit_size)
+            [file["message_id"] for file in entry["files"][i : i + forward_limit_size]]
+            for i in range(0, len(entry["files"]), forward_limit_size)
         ]
 
         if not user_cache_chunk:
-            cls.files_cache.pop(unique_id)
+            cls.files_cache.pop(unique_id, None)
             return await cls.message_reply(
                 client=client,
                 message=message,
@@ -159,22 +181,20 @@ class MakeFilesCommand:
                             "caption": msg.caption.markdown if msg.caption else None,
                             "file_id": file_type.file_id,
                             "message_id": msg.id,
-                            "media_group_id": message.media_group_id,
+                            "media_group_id": msg.media_group_id,
                         },
                     )
         else:
             # Create a copy of the files cache, excluding the 'file_name' field from each file CacheEntry.
-            files_to_store = [
-                {k: v for k, v in i.items() if k != "file_name"} for i in cls.files_cache[unique_id]["files"]
-            ]
+            files_to_store = [{k: v for k, v in i.items() if k != "file_name"} for i in entry["files"]]
 
         unique_link = f"{uuid.uuid4().int}"
         file_link = DataEncoder.encode_data(unique_link)
         file_origin = config.BACKUP_CHANNEL if options.settings.BACKUP_FILES else message.chat.id
 
-        add_file = await cls.database.add_file(file_link=file_link, file_origin=file_origin, file_data=files_to_store)
+        add_file = await database.add_file(file_link=file_link, file_origin=file_origin, file_data=files_to_store)
 
-        cls.files_cache.pop(unique_id)
+        cls.files_cache.pop(unique_id, None)
 
         if add_file:
             link = f"https://t.me/{client.me.username}?start={file_link}"  # type: ignore[reportOptionalMemberAccess]
@@ -194,14 +214,17 @@ class MakeFilesCommand:
 
 
 @Client.on_message(
-    filters.private
-    & PyroFilters.admin(allow_global=True)
-    & PyroFilters.subscription()
-    & PyroFilters.create_conversation_filter(
-        convo_start=["/make_files", "/batch", "/batch_files"],
-        convo_stop=["/make_link", "/batch_link"],
+    PyroFilters.all_of(
+        filters.private,
+        PyroFilters.admin(allow_global=True),
+        PyroFilters.subscription(),
+        PyroFilters.create_conversation_filter(
+            convo_start=["/make_files", "/batch", "/batch_files"],
+            convo_stop=["/make_link", "/batch_link"],
+        ),
     ),
 )
+@with_priority(Priority.ADMIN)
 async def make_files_command_handler(client: Client, message: ConvoMessage) -> Message | None:
     """Handles a conversation that receives files to generate an accessable file link.
 
@@ -6,18 +6,18 @@ from pyrogram.client import Client
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from bot.config import config
-from bot.database import MongoDB
+from bot.database import database
 from bot.utilities.helpers import DataEncoder, RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import ConvoMessage, PyroFilters
 from bot.utilities.pyrotools import HelpCmd
 
-database = MongoDB()
-
 
 @Client.on_message(
     filters.private & PyroFilters.admin() & filters.command("range_files"),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def range_files(client: Client, message: ConvoMessage) -> Message | None:
     """>**Fetch files directly from backup channel to create a sharable link of ranged file ids.**
 
@@ -61,6 +61,7 @@ async def range_files(client: Client, message: ConvoMessage) -> Message | None:
                 "caption": file.caption.markdown if file.caption else None,
                 "file_id": file_type.file_id,
                 "message_id": file.id,
+                "media_group_id": file.media_group_id,
             },
         )
 
@@ -0,0 +1,20 @@
+from pyrogram import filters
+from pyrogram.client import Client
+from pyrogram.types import ChatMemberUpdated
+
+from bot.config import config
+from bot.utilities.pyrofilters import PyroFilters
+
+
+@Client.on_chat_member_updated(filters.chat(config.FORCE_SUB_CHANNELS))
+async def chat_member_updated(client: Client, chat_member_updated: ChatMemberUpdated) -> None:  # noqa: ARG001
+    """Keeps the subscription cache up to date when users join, leave or are removed from a force sub channel."""
+    member = chat_member_updated.new_chat_member or chat_member_updated.old_chat_member
+    if member is None or member.user is None:
+        return
+
+    new_member = chat_member_updated.new_chat_member
+    if new_member and new_member.status in PyroFilters.SUBSCRIBED_STATUS:
+        PyroFilters.subscription_joined(user_id=member.user.id, channel_id=chat_member_updated.chat.id)
+    else:
+        PyroFilters.subscription_left(user_id=member.user.id, channel_id=chat_member_updated.chat.id)
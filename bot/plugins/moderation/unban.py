@@ -2,18 +2,18 @@ from pyrogram import filters
 from pyrogram.client import Client
 from pyrogram.types import Message
 
-from bot.database import MongoDB
+from bot.database import database
 from bot.utilities.helpers import RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import ConvoMessage, PyroFilters
 from bot.utilities.pyrotools import HelpCmd
 
-database = MongoDB()
-
 
 @Client.on_message(
     filters.private & PyroFilters.admin() & filters.command("unban"),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def unban_user(client: Client, message: ConvoMessage) -> Message | None:  # noqa: ARG001
     """Unban a user from using the bot
 
@@ -1,105 +1,19 @@
-import asyncio
-from typing import cast
-
-from pydantic import BaseModel
 from pyrogram import filters
 from pyrogram.client import Client
-from pyrogram.errors import FloodWait, InputUserDeactivated, PeerIdInvalid, UserIsBlocked, UserIsBot
 from pyrogram.types import Message
 
-from bot.database import MongoDB
+from bot.utilities.broadcast_manager import broadcast_manager
 from bot.utilities.helpers import RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import PyroFilters
 from bot.utilities.pyrotools import HelpCmd
 
-database = MongoDB()
-
-
-class BroadcastConfig(BaseModel):
-    user_ids: list[int]
-    user_ids_codex: list[int]
-    pin: bool
-
-
-class BroadcastHandler:
-    """A handler class for broadcasting messages to multiple users."""
-
-    @staticmethod
-    @RateLimiter.hybrid_limiter(func_count=1)
-    async def message_copy_wrapper(
-        client: Client,  # noqa: ARG004
-        message: Message,
-        chat_id: int,
-        pin: bool,  # noqa: FBT001
-    ) -> Message | list[Message]:
-        """
-        Copy a message to a specified chat ID, handling rate limits and optional pinning.
-
-        Parameters:
-            client (Client): The Pyrogram client instance.
-            message (Message): The message object to be copied.
-            chat_id (int): The ID of the chat to copy the message to.
-            pin (bool): Whether to pin the copied message.
-
-        Returns:
-            Message | list[Message]: The copied message(s).
-        """
-
-        async def copy_and_pin() -> Message | list[Message]:
-            broadcast_message = await message.reply_to_message.copy(chat_id)
-            if pin:
-                if isinstance(broadcast_message, list):
-                    for msg in broadcast_message:
-                        await msg.pin(both_sides=True)
-                else:
-                    await broadcast_message.pin(both_sides=True)
-            return broadcast_message
-
-        try:
-            return await copy_and_pin()
-        except FloodWait as e:
-            await asyncio.sleep(float(cast("float", e.value)))
-            return await copy_and_pin()
-
-    @classmethod
-    async def broadcast_sender(cls, client: Client, message: Message, broadcast_config: BroadcastConfig) -> dict:
-        """
-        Sends a message to multiple users and handles success and failure counts.
-
-        Parameters:
-            client (Client): The Pyrogram client instance.
-            message (Message): The message object to be broadcasted.
-            user_ids (list): List of user IDs to send the message to from teleshare.
-            user_ids_codex (list): List of user IDs to send the message to from CodeXbotz.
-
-        Returns:
-            dict: Dictionary containing successful and unsuccessful message counts.
-        """
-        successful, unsuccessful_ids, unsuccessful_ids_codex = 0, [], []
-        for user_id in list(set(broadcast_config.user_ids + broadcast_config.user_ids_codex)):
-            try:
-                # Required so rate limiter from message_copy_wrapper() can properly handle it.
-                message.chat.id = user_id
-                await cls.message_copy_wrapper(
-                    client=client,
-                    message=message,
-                    chat_id=user_id,
-                    pin=broadcast_config.pin,
-                )
-                successful += 1
-            except (UserIsBlocked, InputUserDeactivated, PeerIdInvalid, UserIsBot):  # noqa: PERF203
-                unsuccessful_ids.append(
-                    user_id,
-                ) if user_id in broadcast_config.user_ids else unsuccessful_ids_codex.append(user_id)
-
-        await database.cleanup_users(unsuccessful_ids=unsuccessful_ids, unsuccessful_ids_codex=unsuccessful_ids_codex)
-        return {"successful": successful, "unsuccessful": len(unsuccessful_ids + unsuccessful_ids_codex)}
-
 
 @Client.on_message(
     filters.private & PyroFilters.admin() & filters.command("broadcast"),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def broadcast(client: Client, message: Message) -> Message:
     """Broadcasts a message to multiple subscribed users
     this command may take awhile depending on user count.
@@ -108,28 +22,23 @@ async def broadcast(client: Client, message: Message) -> Message:
         Create a message then reply with /broadcast to avoid typos.
         To pin the broadcast message add additional arg to the command:
         `/broadcast pin`
+        To stop a running broadcast:
+        `/broadcast cancel`
     """
-    if not message.reply_to_message:
-        return await message.reply(text="Reply to a message with command /broadcast to avoid broadcasting typos.")
-
-    pin_arg = bool((message.command[1]).lower() == "pin") if message.command[1:] else False
-
-    user_ids, user_ids_codex = await database.get_user_ids()
+    arg = message.command[1].lower() if message.command[1:] else None
 
-    notice_message = await message.reply(text="Currently broadcasting... This may take a while.", quote=True)
+    if arg == "cancel":
+        if broadcast_manager.cancel():
+            return await message.reply(text="Cancelling broadcast...", quote=True)
+        return await message.reply(text="There is no running broadcast.", quote=True)
 
-    result = await BroadcastHandler.broadcast_sender(
-        client=client,
-        message=message,
-        broadcast_config=BroadcastConfig(user_ids=user_ids, user_ids_codex=user_ids_codex, pin=pin_arg),
-    )
+    if broadcast_manager.is_running:
+        return await message.reply(text="A broadcast is already running, use `/broadcast cancel` to stop it.")
 
-    successful = result["successful"]
-    unsuccessful = result["unsuccessful"]
+    if not message.reply_to_message:
+        return await message.reply(text="Reply to a message with command /broadcast to avoid broadcasting typos.")
 
-    return await notice_message.edit(
-        text=f">Broadcasting Finished:\nSuccessful: {successful}\nUnsuccessful: {unsuccessful}",
-    )
+    return await broadcast_manager.start(client=client, message=message, pin=arg == "pin")
 
 
 HelpCmd.set_help(
@@ -7,6 +7,7 @@ from pyrogram.types import Message
 from bot.config import config
 from bot.options import InvalidValueError, options
 from bot.utilities.helpers import RateLimiter
+from bot.utilities.outbound_governor import Priority, with_priority
 from bot.utilities.pyrofilters import PyroFilters
 from bot.utilities.pyrotools import HelpCmd
 
@@ -18,6 +19,7 @@ BOOLEN_CONVERT = {"true": True, "false": False}
     filters.private & PyroFilters.admin() & filters.command(["option", "settings"]),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def option_config_cmd(client: Client, message: Message) -> Message | None:  # noqa: ARG001
     """Use to configure database options.
 
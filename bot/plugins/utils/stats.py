@@ -2,18 +2,19 @@ from pyrogram import filters
 from pyrogram.client import Client
 from pyrogram.types import Message
 
-from bot.database import MongoDB
+from bot.database import database
+from bot.utilities.cache_manager import cache_manager
 from bot.utilities.helpers import RateLimiter
+from bot.utilities.outbound_governor import Priority, governor, with_priority
 from bot.utilities.pyrofilters import PyroFilters
 from bot.utilities.pyrotools import HelpCmd
 
-database = MongoDB()
-
 
 @Client.on_message(
     filters.private & PyroFilters.admin() & filters.command("stats"),
 )
 @RateLimiter.hybrid_limiter(func_count=1)
+@with_priority(Priority.ADMIN)
 async def stats(_: Client, message: Message) -> Message:
     """A command to display links and users count.:
 
@@ -22,8 +23,41 @@ async def stats(_: Client, message: Message) -> Message:
     """
 
     link_count, users_count = await database.stats()
+    text = f">STATS:\n**Users Count:** `{users_count}`\n**Links Count:** `{link_count}`"
+
+    daily_stats = await database.daily_stats(days=7)
+    if daily_stats:
+        trends = "\n".join(
+            f"{day['date']}: +{day.get('users', 0)} users, +{day.get('links', 0)} links" for day in daily_stats
+        )
+        text += f"\n\n>LAST {len(daily_stats)} DAYS:\n```\n{trends}```"
+
+    limiter = RateLimiter.counters
+    text += (
+        f"\n\n>RATE LIMITER:\n**Allowed:** `{limiter['allowed']}`\n**Queued:** `{limiter['queued']}`"
+        f"\n**Throttled:** `{limiter['throttled']}`\n**Waiting:** `{limiter['waiting']}`"
+    )
+
+    caches = "\n".join(
+        f"{name}: {cache['size']}/{cache['maxsize']}, {cache['hits']} hits, {cache['misses']} misses, "
+        f"{cache['evictions']} evictions, ~{cache['bytes'] // 1024} KiB"
+        for name, cache in cache_manager.stats().items()
+    )
+    text += f"\n\n>CACHES:\n```\n{caches}```"
+
+    outbound = "\n".join(
+        f"{name}: {level['sent']} sent, {level['queued']} queued, "
+        f"{level['avg_wait']:.2f}s avg wait, {level['max_wait']:.1f}s max wait"
+        for name, level in governor.stats().items()
+    )
+    flood = governor.flood_metrics
+    outbound += (
+        f"\npacing: {governor.pacing} calls\nflood waits: {flood['flood_waits']}, {flood['retried']} retried, "
+        f"{flood['raised']} raised, {flood['paused']:.0f}s paused"
+    )
+    text += f"\n\n>OUTBOUND:\n```\n{outbound}```"
 
-    return await message.reply(f">STATS:\n**Users Count:** `{users_count}`\n**Links Count:** `{link_count}`")
+    return await message.reply(text)
 
 
 HelpCmd.set_help(
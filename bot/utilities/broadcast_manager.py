@@ -0,0 +1,335 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import ClassVar, cast
+
+from pydantic import BaseModel
+from pyrogram.client import Client
+from pyrogram.errors import FloodWait, InputUserDeactivated, PeerIdInvalid, RPCError, UserIsBlocked, UserIsBot
+from pyrogram.types import Message
+
+from bot.config import config
+from bot.database import DeadUserPruner, UserSource, database
+from bot.utilities.outbound_governor import Priority, current_priority
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastState(BaseModel):
+    """
+    The persisted progress of a broadcast.
+
+    Parameters:
+        from_chat_id (int): The chat the broadcast message is copied from.
+        message_id (int): The message to broadcast.
+        notice_chat_id (int): The chat of the progress message.
+        notice_message_id (int): The progress message which is edited periodically.
+        pin (bool): Whether to pin the broadcast message.
+        start_after (int | None): Every user up to this ID has been processed.
+        successful (int): Amount of users the message was sent to.
+        unsuccessful (int): Amount of users the message could not be sent to.
+        total (int): Estimated amount of users to broadcast to.
+    """
+
+    from_chat_id: int
+    message_id: int
+    notice_chat_id: int
+    notice_message_id: int
+    pin: bool
+    start_after: int | None = None
+    successful: int = 0
+    unsuccessful: int = 0
+    total: int = 0
+
+
+class BroadcastPacer:
+    """
+    Paces every broadcast worker globally and backs off when Telegram sends a FloodWait.
+
+    The rate is halved on every FloodWait and recovers additively on successful sends.
+
+    Parameters:
+        rate (float): Maximum messages per second.
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+
+    async def wait(self) -> None:
+        """Waits for the next free sending slot."""
+        now = time.monotonic()
+        slot = max(now, self.next_slot, self.paused_until)
+        self.next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self) -> None:
+        """Slowly increases the rate back to the maximum rate."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+    def on_flood_wait(self, seconds: float) -> None:
+        """
+        Pauses every worker and halves the rate.
+
+        Parameters:
+            seconds (float): The FloodWait value.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.rate = max(1.0, self.rate / 2)
+
+
+class BroadcastManager:
+    """
+    Runs a single broadcast at a time in the background with a bounded worker pool.
+
+    Progress is checkpointed to the database after every batch so a restart resumes where it stopped.
+
+    Attributes:
+        DEAD_USER_ERRORS (ClassVar[tuple]): Errors that mean a user can no longer receive messages.
+        MAX_ATTEMPTS (ClassVar[int]): Maximum attempts per user when a FloodWait is received.
+    """
+
+    DEAD_USER_ERRORS: ClassVar[tuple[type[RPCError], ...]] = (
+        UserIsBlocked,
+        InputUserDeactivated,
+        PeerIdInvalid,
+        UserIsBot,
+    )
+    MAX_ATTEMPTS: ClassVar[int] = 3
+
+    def __init__(self) -> None:
+        self.task: asyncio.Task | None = None
+        self.cancel_requested = False
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def start(self, client: Client, message: Message, pin: bool) -> Message:  # noqa: FBT001
+        """
+        Starts broadcasting the message replied to by an admin.
+
+        Parameters:
+            client (Client): The Pyrogram client instance.
+            message (Message): The broadcast command message, must reply to the message to broadcast.
+            pin (bool): Whether to pin the broadcast message.
+
+        Returns:
+            Message: The progress message.
+        """
+        notice_message = await message.reply(text="Currently broadcasting... This may take a while.", quote=True)
+        state = BroadcastState(
+            from_chat_id=message.chat.id,
+            message_id=message.reply_to_message.id,
+            notice_chat_id=notice_message.chat.id,
+            notice_message_id=notice_message.id,
+            pin=pin,
+            total=await database.count_broadcast_users(),
+        )
+        await database.save_broadcast_checkpoint(state.model_dump())
+        self._run_in_background(client=client, state=state)
+        return notice_message
+
+    async def resume(self, client: Client) -> None:
+        """
+        Resumes an unfinished broadcast from its checkpoint, should be called once during startup.
+
+        Parameters:
+            client (Client): The Pyrogram client instance.
+        """
+        checkpoint = await database.get_broadcast_checkpoint()
+        if checkpoint and not self.is_running:
+            logger.info("Resuming broadcast after user id: %s", checkpoint.get("start_after"))
+            self._run_in_background(client=client, state=BroadcastState(**checkpoint))
+
+    def cancel(self) -> bool:
+        """
+        Requests the running broadcast to stop.
+
+        Returns:
+            bool: Whether a broadcast was running.
+        """
+        if not self.is_running:
+            return False
+        self.cancel_requested = True
+        return True
+
+    def _run_in_background(self, client: Client, state: BroadcastState) -> None:
+        self.cancel_requested = False
+        self.task = asyncio.create_task(self._run(client=client, state=state))
+        self.task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.error("Broadcast stopped, it will resume on restart", exc_info=task.exception())
+
+    async def _run(self, client: Client, state: BroadcastState) -> None:
+        # The task runs in its own copy of the context.
+        current_priority.set(Priority.BROADCAST)
+        pacer = BroadcastPacer(rate=config.BROADCAST_RATE)
+        pruner = DeadUserPruner(database=database)
+        workers = asyncio.Semaphore(config.BROADCAST_WORKERS)
+        progress = {"started_at": time.monotonic(), "processed": 0, "edited_at": time.monotonic()}
+
+        batch: list[tuple[int, UserSource]] = []
+        async for user_id, source in database.iter_user_ids(start_after=state.start_after):
+            batch.append((user_id, source))
+            if len(batch) < config.BROADCAST_BATCH_SIZE:
+                continue
+
+            await self._send_batch(client, state, batch, pacer, pruner, workers)
+            progress["processed"] += len(batch)
+            batch = []
+
+            if self.cancel_requested:
+                break
+
+            if time.monotonic() - progress["edited_at"] >= config.BROADCAST_PROGRESS_SECONDS:
+                progress["edited_at"] = time.monotonic()
+                await self._edit_notice(client, state, self._progress_text(state, progress))
+
+        if batch and not self.cancel_requested:
+            await self._send_batch(client, state, batch, pacer, pruner, workers)
+
+        await pruner.flush()
+        await database.clear_broadcast_checkpoint()
+
+        status = "Cancelled" if self.cancel_requested else "Finished"
+        await self._edit_notice(
+            client,
+            state,
+            f">Broadcasting {status}:\nSuccessful: {state.successful}\nUnsuccessful: {state.unsuccessful}",
+        )
+
+    async def _send_batch(  # noqa: PLR0913
+        self,
+        client: Client,
+        state: BroadcastState,
+        batch: list[tuple[int, UserSource]],
+        pacer: BroadcastPacer,
+        pruner: DeadUserPruner,
+        workers: asyncio.Semaphore,
+    ) -> None:
+        results = await asyncio.gather(
+            *(self._send(client, state, user_id, source, pacer, pruner, workers) for user_id, source in batch),
+        )
+        state.successful += results.count(True)
+        state.unsuccessful += results.count(False)
+        state.start_after = batch[-1][0]
+        await database.save_broadcast_checkpoint(state.model_dump())
+
+    async def _send(  # noqa: PLR0913
+        self,
+        client: Client,
+        state: BroadcastState,
+        user_id: int,
+        source: UserSource,
+        pacer: BroadcastPacer,
+        pruner: DeadUserPruner,
+        workers: asyncio.Semaphore,
+    ) -> bool | None:
+        """
+        Sends the broadcast message to a user, then pins it if requested.
+
+        Unexpected errors are logged and count as unsuccessful so they don't stop the rest of the batch.
+
+        Returns:
+            bool | None: Whether the message was sent, None if the broadcast was cancelled first.
+        """
+        async with workers:
+            try:
+                broadcast_message = await self._copy(client, state, user_id, source, pacer, pruner)
+                if not isinstance(broadcast_message, Message):
+                    return broadcast_message
+
+                if state.pin:
+                    await self._pin(broadcast_message, user_id, pacer)
+            except Exception:
+                logger.exception("Broadcast to %d failed", user_id)
+                return False
+        return True
+
+    async def _copy(  # noqa: PLR0913
+        self,
+        client: Client,
+        state: BroadcastState,
+        user_id: int,
+        source: UserSource,
+        pacer: BroadcastPacer,
+        pruner: DeadUserPruner,
+    ) -> Message | bool | None:
+        """
+        Copies the broadcast message to a user.
+
+        Returns:
+            Message | bool | None: The copy, False if it could not be sent, None if the broadcast was cancelled first.
+        """
+        for _ in range(self.MAX_ATTEMPTS):
+            if self.cancel_requested:
+                return None
+
+            await pacer.wait()
+            try:
+                broadcast_message = await client.copy_message(
+                    chat_id=user_id,
+                    from_chat_id=state.from_chat_id,
+                    message_id=state.message_id,
+                )
+            except FloodWait as e:
+                pacer.on_flood_wait(float(cast("float", e.value)))
+            except self.DEAD_USER_ERRORS:
+                await pruner.add(user_id=user_id, source=source)
+                return False
+            except RPCError as e:
+                logger.warning("Broadcast to %d failed: %s", user_id, e)
+                return False
+            else:
+                pacer.on_success()
+                return cast("Message", broadcast_message)
+        return False
+
+    async def _pin(self, broadcast_message: Message, user_id: int, pacer: BroadcastPacer) -> None:
+        """
+        Pins a sent broadcast message, retried on its own so a FloodWait never sends the message again.
+        """
+        for _ in range(self.MAX_ATTEMPTS):
+            await pacer.wait()
+            try:
+                await broadcast_message.pin(both_sides=True)
+            except FloodWait as e:
+                pacer.on_flood_wait(float(cast("float", e.value)))
+            except RPCError as e:
+                logger.warning("Couldn't pin broadcast for %d: %s", user_id, e)
+                return
+            else:
+                pacer.on_success()
+                return
+
+    @staticmethod
+    def _progress_text(state: BroadcastState, progress: dict[str, float]) -> str:
+        elapsed = max(time.monotonic() - progress["started_at"], 1)
+        rate = progress["processed"] / elapsed
+        processed = state.successful + state.unsuccessful
+        remaining = max(state.total - processed, 0)
+        eta = datetime.timedelta(seconds=int(remaining / rate)) if rate else "N/A"
+
+        return (
+            f">Broadcasting:\nSuccessful: {state.successful}\nUnsuccessful: {state.unsuccessful}\n"
+            f"Progress: {processed}/{state.total}\nRate: {rate:.1f} msg/s\nETA: {eta}\n\n"
+            "Use /broadcast cancel to stop."
+        )
+
+    @staticmethod
+    async def _edit_notice(client: Client, state: BroadcastState, text: str) -> None:
+        try:
+            await client.edit_message_text(chat_id=state.notice_chat_id, message_id=state.notice_message_id, text=text)
+        except RPCError as e:
+            logger.warning("Couldn't edit broadcast progress: %s", e)
+
+
+broadcast_manager = BroadcastManager()
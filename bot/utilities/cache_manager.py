@@ -0,0 +1,336 @@
+import asyncio
+import itertools
+import sys
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+from lru import LRU
+
+from bot.config import config
+
+_MISSING = object()
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+C = TypeVar("C", bound="BaseCache")
+
+
+class BaseCache:
+    """
+    The bookkeeping shared by every cache, a bounded lru dict with hit, miss and eviction counters.
+
+    Parameters:
+        maxsize (int): Maximum amount of entries before the least recently used is evicted.
+        ttl (float): Default amount of seconds an entry stays valid.
+
+    Attributes:
+        hits (int): Amount of lookups answered from the cache.
+        misses (int): Amount of lookups of missing or expired entries.
+        evictions (int): Amount of entries evicted to make room for new ones.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = LRU(maxsize, callback=self._on_evict)
+
+    def _on_evict(self, key: Hashable, value: Any) -> None:  # noqa: ANN401, ARG002
+        self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove a key from the cache if it exists.
+
+        Parameters:
+            key (Hashable): The cache key.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        self._data.clear()
+
+    def memory_usage(self, sample_size: int = 100) -> int:
+        """
+        Estimates the memory used by the entries from a sample, nested objects are not counted.
+
+        Parameters:
+            sample_size (int): Amount of entries measured.
+
+        Returns:
+            int: The estimated size in bytes.
+        """
+        sample = list(itertools.islice(self._data.items(), sample_size))
+        if not sample:
+            return 0
+        sample_bytes = sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in sample)
+        return sample_bytes * len(self._data) // len(sample)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(BaseCache):
+    """A bounded lru cache where every entry expires after a time to live."""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:  # noqa: ANN401
+        """
+        Get a value from the cache.
+
+        Parameters:
+            key (Hashable): The cache key.
+            default (Any): Returned if the key is missing or expired.
+
+        Returns:
+            Any: The cached value or default.
+        """
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:  # noqa: ANN401
+        """
+        Store a value in the cache.
+
+        Parameters:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+            ttl (float | None): Overrides the default time to live of the cache.
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class BitmaskCache(BaseCache):
+    """
+    A compact lru cache of small bitmasks, e.g. the channels a user is verified in.
+
+    Every entry is packed with its expiry into a single int to keep hundreds of thousands
+    of entries cheap, expiry uses the monotonic clock.
+    """
+
+    MASK_BITS = 32
+
+    def get(self, key: Hashable) -> int | None:
+        """
+        Get a bitmask from the cache and count the lookup as a hit or miss.
+
+        Parameters:
+            key (Hashable): The cache key.
+
+        Returns:
+            int | None: The bitmask, or None if the key is missing or expired.
+        """
+        mask = self.peek(key)
+        if mask is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return mask
+
+    def peek(self, key: Hashable) -> int | None:
+        """
+        Get a bitmask from the cache without counting the lookup.
+
+        Parameters:
+            key (Hashable): The cache key.
+
+        Returns:
+            int | None: The bitmask, or None if the key is missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        if entry >> self.MASK_BITS < time.monotonic_ns() // 1_000_000:
+            self._data.pop(key, None)
+            return None
+
+        return entry & ((1 << self.MASK_BITS) - 1)
+
+    def set(self, key: Hashable, mask: int, ttl: float | None = None) -> None:
+        """
+        Store a bitmask in the cache.
+
+        Parameters:
+            key (Hashable): The cache key.
+            mask (int): The bitmask, at most MASK_BITS bits.
+            ttl (float | None): Overrides the default time to live of the cache.
+        """
+        expires_at = time.monotonic_ns() // 1_000_000 + int((self.ttl if ttl is None else ttl) * 1000)
+        self._data[key] = max(expires_at, 0) << self.MASK_BITS | mask
+
+
+class CacheManager:
+    """
+    Every named cache of the bot.
+
+    The size and time to live of each namespace can be overridden per deployment with
+    CACHE_NAMESPACES, e.g. {"links": {"maxsize": 50000, "ttl": 1800}}.
+
+    Attributes:
+        namespaces (dict[str, BaseCache]): The caches by name.
+        hooks (dict[str, list[Callable[[Hashable | None], None]]]): Called after a namespace is invalidated.
+    """
+
+    def __init__(self) -> None:
+        self.namespaces: dict[str, BaseCache] = {}
+        self.hooks: dict[str, list[Callable[[Hashable | None], None]]] = {}
+
+    def namespace(self, name: str, cache_type: type[C], maxsize: int, ttl: float) -> C:
+        """
+        Creates a named cache.
+
+        Parameters:
+            name (str): The unique namespace name.
+            cache_type (type[C]): The cache class, e.g. TTLCache.
+            maxsize (int): The default maximum amount of entries.
+            ttl (float): The default amount of seconds an entry stays valid.
+
+        Returns:
+            C: The cache.
+        """
+        settings = config.CACHE_NAMESPACES.get(name, {})
+        cache = cache_type(maxsize=settings.get("maxsize", maxsize), ttl=settings.get("ttl", ttl))
+        self.namespaces[name] = cache
+        return cache
+
+    def on_invalidate(self, name: str, hook: Callable[[Hashable | None], None]) -> None:
+        """
+        Registers a function called after a namespace is invalidated.
+
+        Parameters:
+            name (str): The namespace name.
+            hook (Callable[[Hashable | None], None]): Receives the invalidated key, None if the namespace was cleared.
+        """
+        self.hooks.setdefault(name, []).append(hook)
+
+    def invalidate(self, name: str, key: Hashable | None = None) -> None:
+        """
+        Removes a key, or every key, from a namespace and runs its hooks.
+
+        Hooks also run for names without a cache, e.g. state that is refreshed rather than cached.
+
+        Parameters:
+            name (str): The namespace name.
+            key (Hashable | None): The key to remove, None to clear the namespace.
+        """
+        cache = self.namespaces.get(name)
+        if cache is not None and key is None:
+            cache.clear()
+        elif cache is not None:
+            cache.pop(key)
+
+        for hook in self.hooks.get(name, []):
+            hook(key)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Retrieves the statistics of every namespace.
+
+        Returns:
+            dict[str, dict[str, int]]: The size, maxsize, hits, misses, evictions and estimated bytes per namespace.
+        """
+        return {
+            name: {
+                "size": len(cache),
+                "maxsize": cache.maxsize,
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "evictions": cache.evictions,
+                "bytes": cache.memory_usage(),
+            }
+            for name, cache in self.namespaces.items()
+        }
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Collects the lookups made within a short window and loads them with a single call.
+
+    Concurrent lookups of the same key share the same result.
+
+    Parameters:
+        load_many (Callable[[list[K]], Awaitable[dict[K, V]]]): Loads many keys at once, missing keys are omitted.
+        window (float): Seconds to wait for more lookups before loading.
+        max_batch (int): Amount of keys that triggers a load right away.
+    """
+
+    def __init__(
+        self,
+        load_many: Callable[[list[K]], Awaitable[dict[K, V]]],
+        window: float,
+        max_batch: int = 500,
+    ) -> None:
+        self.load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[K, asyncio.Future[V | None]] = {}
+        self._dispatch_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> V | None:
+        """
+        Load a key with the next batch.
+
+        Parameters:
+            key (K): The key to load.
+
+        Returns:
+            V | None: The loaded value, or None if the key does not exist.
+        """
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._dispatch_handle is None:
+                self._dispatch_handle = loop.call_later(self.window, self._dispatch)
+
+        # Shielded, the future is shared and must survive a cancelled caller.
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._load_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, batch: dict[K, asyncio.Future[V | None]]) -> None:
+        try:
+            results = await self.load_many(list(batch))
+        except Exception as e:  # noqa: BLE001
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Every waiter may have been cancelled, mark the exception as retrieved so it isn't logged.
+                    future.exception()
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+cache_manager = CacheManager()
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import uuid
+from typing import Any
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from pyrogram.client import Client
+from pyrogram.types import Message
+
+from bot.config import config
+from bot.database import database
+from bot.options import options
+from bot.utilities.file_sender import FileSender, OnChunk
+from bot.utilities.helpers import DataEncoder, DataValidationError, PyroHelper
+from bot.utilities.schedule_manager import schedule_manager
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryQueue:
+    """
+    Delivers file links in the background with a bounded pool of workers.
+
+    /start only stores a delivery job so the update handler is free right away. Jobs are
+    checkpointed after every chunk and resumed on restart, a chunk that was interrupted
+    midway is sent again.
+
+    Every job is leased by the instance delivering it and the lease is renewed while the
+    instance runs, so instances sharing the database never deliver the same job twice. Jobs
+    whose lease expired, e.g. of a stopped or crashed instance, are claimed by the others.
+
+    A delivery that fails midway still schedules the auto delete of the files already sent.
+
+    Attributes:
+        client (Client | None): The Pyrogram client instance, set on start.
+        owner (str): A random ID of this bot instance, the owner of its leases.
+        queue (asyncio.Queue[dict[str, Any]]): Jobs waiting for a worker.
+        workers (list[asyncio.Task]): The running workers.
+        renewer (asyncio.Task | None): Renews the leases and claims expired jobs.
+        finished (list[ObjectId]): Delivered jobs that couldn't be removed yet.
+    """
+
+    def __init__(self) -> None:
+        self.client: Client | None = None
+        self.owner = uuid.uuid4().hex
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.workers: list[asyncio.Task] = []
+        self.renewer: asyncio.Task | None = None
+        self.finished: list[ObjectId] = []
+
+    async def start(self, client: Client) -> None:
+        """
+        Claims unfinished delivery jobs with an expired lease and starts the workers.
+
+        Parameters:
+            client (Client): The Pyrogram client instance.
+        """
+        self.client = client
+
+        await database.ensure_delivery_indexes()
+        await self.claim_expired()
+
+        self.workers = [asyncio.create_task(self._work()) for _ in range(config.DELIVERY_WORKERS)]
+        self.renewer = asyncio.create_task(self._renew())
+
+    async def stop(self) -> None:
+        """Stops the workers and releases the unfinished jobs so they are resumed right away."""
+        tasks = [*self.workers, self.renewer] if self.renewer else self.workers
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers, self.renewer = [], None
+        await self._remove_finished()
+
+        try:
+            await database.release_delivery_jobs(owner=self.owner)
+        except PyMongoError as e:
+            logger.warning("Couldn't release deliveries, they resume once their lease expires: %s", e)
+
+    async def claim_expired(self) -> None:
+        """Claims and queues every job whose lease expired."""
+        claimed = 0
+        while job := await database.claim_delivery_job(owner=self.owner, lease_seconds=config.DELIVERY_LEASE_SECONDS):
+            self.queue.put_nowait(job)
+            claimed += 1
+
+        if claimed:
+            logger.info("Resuming %d deliveries", claimed)
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(config.DELIVERY_LEASE_SECONDS / 3)
+            await self._remove_finished()
+            try:
+                await database.renew_delivery_jobs(owner=self.owner, lease_seconds=config.DELIVERY_LEASE_SECONDS)
+                await self.claim_expired()
+            except PyMongoError as e:
+                logger.warning("Couldn't renew delivery leases: %s", e)
+
+    async def enqueue(self, chat_id: int, base64_file_link: str) -> None:
+        """
+        Stores a delivery job and queues it.
+
+        Parameters:
+            chat_id (int): The chat to deliver the files to.
+            base64_file_link (str): The base64 file link.
+        """
+        job_id = await database.add_delivery_job(
+            chat_id=chat_id,
+            link=base64_file_link,
+            owner=self.owner,
+            lease_seconds=config.DELIVERY_LEASE_SECONDS,
+        )
+        self.queue.put_nowait(
+            {"_id": job_id, "chat_id": chat_id, "link": base64_file_link, "offset": 0, "message_ids": []},
+        )
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.deliver(job)
+            except Exception:
+                logger.exception("Delivery to %d failed", job["chat_id"])
+
+            # Not reached when cancelled on shutdown, the job is resumed on the next start.
+            await self._remove(job["_id"])
+
+    async def _remove_finished(self) -> None:
+        finished, self.finished = self.finished, []
+        for job_id in finished:
+            await self._remove(job_id)
+
+    async def _remove(self, job_id: ObjectId) -> None:
+        try:
+            await database.remove_delivery_job(job_id)
+        except PyMongoError as e:
+            # Still leased by this instance so nobody resumes it, removed again on the next renewal.
+            logger.warning("Couldn't remove delivery job %s, retrying later: %s", job_id, e)
+            self.finished.append(job_id)
+
+    async def deliver(self, job: dict[str, Any]) -> None:
+        """
+        Sends the files of a link from the job offset, then the additional and auto delete messages.
+
+        Parameters:
+            job (dict[str, Any]): The delivery job.
+        """
+        client = self.client
+        if client is None:
+            return
+
+        chat_id: int = job["chat_id"]
+        offset: int = job["offset"]
+        sent_message_ids: list[int] = list(job["message_ids"])
+
+        async def checkpoint(files: int, sent: list[Message]) -> None:
+            nonlocal offset
+            offset += files
+            message_ids = [msg.id for msg in sent]
+            sent_message_ids.extend(message_ids)
+            await database.checkpoint_delivery_job(job_id=job["_id"], offset=offset, message_ids=message_ids)
+
+        try:
+            delivered = await self._send_files(client=client, job=job, on_chunk=checkpoint)
+        except Exception:
+            logger.exception("Delivery to %d failed", chat_id)
+            # The files sent before the failure are still deleted on schedule.
+            delivered = bool(sent_message_ids)
+
+        if delivered:
+            await self._send_extras(
+                client=client,
+                chat_id=chat_id,
+                base64_file_link=job["link"],
+                message_ids=sent_message_ids,
+            )
+
+    @staticmethod
+    async def _send_files(client: Client, job: dict[str, Any], on_chunk: OnChunk) -> bool:
+        """
+        Sends the files of a link from the job offset.
+
+        Parameters:
+            client (Client): The Pyrogram client instance.
+            job (dict[str, Any]): The delivery job.
+            on_chunk (OnChunk): Checkpoints every sent chunk.
+
+        Returns:
+            bool: Whether files were delivered, False if the link is invalid or none of its files exist.
+        """
+        chat_id: int = job["chat_id"]
+        base64_file_link: str = job["link"]
+        offset: int = job["offset"]
+
+        file_document = await database.get_link_document(base64_file_link=base64_file_link)
+        if file_document:
+            if file_document.files[offset:]:
+                await FileSender.teleshare(
+                    client=client,
+                    chat_id=chat_id,
+                    file_data=file_document.files[offset:],
+                    file_origin=file_document.file_origin,
+                    protect_content=config.PROTECT_CONTENT,
+                    on_chunk=on_chunk,
+                )
+            return True
+
+        try:
+            codex_message_ids = DataEncoder.codex_decode(
+                base64_string=base64_file_link,
+                backup_channel=config.BACKUP_CHANNEL,
+            )
+        except (DataValidationError, IndexError):
+            await PyroHelper.send_option_message(
+                client=client,
+                chat_id=chat_id,
+                option_key=options.settings.INVALID_LINK_MESSAGE,
+            )
+            return False
+
+        sent = []
+        if codex_message_ids[offset:]:
+            sent = await FileSender.codexbotz(
+                client=client,
+                codex_message_ids=codex_message_ids[offset:],
+                chat_id=chat_id,
+                from_chat_id=config.BACKUP_CHANNEL,
+                protect_content=config.PROTECT_CONTENT,
+                on_chunk=on_chunk,
+            )
+        if not sent and not job["message_ids"]:
+            await PyroHelper.send_option_message(
+                client=client,
+                chat_id=chat_id,
+                option_key=options.settings.FILE_DOES_NOT_EXIST,
+            )
+            return False
+        return True
+
+    @staticmethod
+    async def _send_extras(client: Client, chat_id: int, base64_file_link: str, message_ids: list[int]) -> None:
+        delete_n_seconds = options.settings.AUTO_DELETE_SECONDS
+        schedule_delete_message = list(message_ids)
+
+        try:
+            if options.settings.ADDITIONAL_MESSAGE != 0:
+                additional_message = await PyroHelper.send_option_message(
+                    client=client,
+                    chat_id=chat_id,
+                    option_key=options.settings.ADDITIONAL_MESSAGE,
+                )
+                if additional_message:
+                    schedule_delete_message.append(additional_message.id)
+
+            if delete_n_seconds != 0:
+                auto_delete_message = (
+                    options.settings.AUTO_DELETE_MESSAGE.format(int(delete_n_seconds / 60))
+                    if not isinstance(options.settings.AUTO_DELETE_MESSAGE, int)
+                    else options.settings.AUTO_DELETE_MESSAGE
+                )
+                auto_delete_message_reply = await PyroHelper.send_option_message(
+                    client=client,
+                    chat_id=chat_id,
+                    option_key=auto_delete_message,
+                )
+                if auto_delete_message_reply:
+                    schedule_delete_message.append(auto_delete_message_reply.id)
+        finally:
+            # The files are deleted on schedule even if a notice couldn't be sent.
+            if delete_n_seconds != 0:
+                await schedule_manager.schedule_delete(
+                    chat_id=chat_id,
+                    message_ids=schedule_delete_message,
+                    delete_n_seconds=delete_n_seconds,
+                    base64_file_link=base64_file_link,
+                )
+
+
+delivery_queue = DeliveryQueue()
@@ -0,0 +1,161 @@
+import asyncio
+import functools
+import logging
+from collections.abc import Awaitable, Callable
+
+from pyrogram.client import Client
+from pyrogram.errors import RPCError
+from pyrogram.types import Message
+
+from bot.options import options
+from bot.utilities.pyrotools import FileResolverModel, Pyrotools
+from bot.utilities.pyrotools.file_resolver import UnsupportedFileError
+
+logger = logging.getLogger(__name__)
+
+OnChunk = Callable[[int, list[Message]], Awaitable[None]]
+
+
+class FileSender:
+    """
+    Used to manage file sending functions between codexbotz and teleshare.
+
+    Chunks, and single files, are sent in order, one that fails after its retries is skipped and the files
+    already sent are still returned so they are deleted on schedule. on_chunk is awaited after
+    every chunk with the amount of files it covered and the messages sent, e.g. to checkpoint.
+    """
+
+    forward_limit_size = 100
+
+    @staticmethod
+    async def codexbotz(  # noqa: PLR0913
+        client: Client,
+        codex_message_ids: list[int],
+        chat_id: int,
+        from_chat_id: int,
+        protect_content: bool,  # noqa: FBT001
+        on_chunk: OnChunk | None = None,
+    ) -> list[Message]:
+        all_sent_files = []
+
+        if len(codex_message_ids) == 1:
+            try:
+                send_files = [
+                    await Pyrotools.with_retries(
+                        functools.partial(
+                            client.copy_message,
+                            chat_id=chat_id,
+                            from_chat_id=from_chat_id,
+                            message_id=codex_message_ids[0],
+                            protect_content=protect_content,
+                        ),
+                    ),
+                ]
+            except RPCError as e:
+                logger.warning("Couldn't copy a file to %d, skipping it: %s", chat_id, e)
+                send_files = []
+
+            all_sent_files.extend(send_files)
+            if on_chunk is not None:
+                await on_chunk(1, send_files)
+
+        else:
+            codex_message_ids_chunk = [
+                codex_message_ids[i : i + FileSender.forward_limit_size]
+                for i in range(0, len(codex_message_ids), FileSender.forward_limit_size)
+            ]
+
+            for codex_files in codex_message_ids_chunk:
+                try:
+                    send_files = await Pyrotools.with_retries(
+                        functools.partial(
+                            client.forward_messages,
+                            chat_id=chat_id,
+                            from_chat_id=from_chat_id,
+                            message_ids=codex_files,
+                            hide_sender_name=True,
+                            protect_content=protect_content,
+                        ),
+                    )
+                except RPCError as e:
+                    logger.warning("Couldn't forward files to %d, skipping them: %s", chat_id, e)
+                    send_files = []
+
+                send_files = send_files if isinstance(send_files, list) else [send_files]
+                all_sent_files.extend(send_files)
+                if on_chunk is not None:
+                    await on_chunk(len(codex_files), send_files)
+
+        return all_sent_files
+
+    @staticmethod
+    async def teleshare(  # noqa: PLR0913
+        client: Client,
+        chat_id: int,
+        file_data: list[FileResolverModel],
+        file_origin: int,
+        protect_content: bool,  # noqa: FBT001
+        on_chunk: OnChunk | None = None,
+    ) -> list[Message]:
+        all_sent_files = []
+
+        if len(file_data) == 1:
+            try:
+                send_files = [
+                    await Pyrotools.with_retries(
+                        functools.partial(
+                            Pyrotools.send_media,
+                            client=client,
+                            chat_id=chat_id,
+                            file_data=file_data[0],
+                            file_origin=file_origin,
+                            protect_content=protect_content,
+                        ),
+                    ),
+                ]
+            except UnsupportedFileError:
+                send_files = []
+            except RPCError as e:
+                logger.warning("Couldn't send a file to %d, skipping it: %s", chat_id, e)
+                send_files = []
+
+            all_sent_files.extend(send_files)
+            if on_chunk is not None:
+                await on_chunk(1, send_files)
+        else:
+            file_data_chunk = [
+                file_data[i : i + FileSender.forward_limit_size]
+                for i in range(0, len(file_data), FileSender.forward_limit_size)
+            ]
+
+            # The backup copies of the next chunk are fetched while the current one is sent. Without a custom
+            # caption the chunks are forwarded and the copies are only fetched if forwarding fails.
+            prefetch_chunk = functools.partial(
+                Pyrotools.prefetch_origin_messages,
+                client=client,
+                file_origin=file_origin,
+            )
+            prefetch_ahead = bool(options.settings.CUSTOM_CAPTION)
+            prefetch = asyncio.create_task(prefetch_chunk(file_data=file_data_chunk[0])) if prefetch_ahead else None
+            try:
+                for index, i_file_data in enumerate(file_data_chunk):
+                    origin_messages = await prefetch if prefetch else None
+                    if prefetch_ahead and index + 1 < len(file_data_chunk):
+                        prefetch = asyncio.create_task(prefetch_chunk(file_data=file_data_chunk[index + 1]))
+
+                    send_files = await Pyrotools.send_media_manager(
+                        client=client,
+                        chat_id=chat_id,
+                        file_data=i_file_data,
+                        file_origin=file_origin,
+                        protect_content=protect_content,
+                        origin_messages=origin_messages,
+                    )
+                    send_files = send_files if isinstance(send_files, list) else [send_files]
+                    all_sent_files.extend(send_files)
+                    if on_chunk is not None:
+                        await on_chunk(len(i_file_data), send_files)
+            finally:
+                if prefetch:
+                    prefetch.cancel()
+        return all_sent_files
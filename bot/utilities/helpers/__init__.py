@@ -1,10 +1,13 @@
 from .data_encoding import DataEncoder, DataValidationError
 from .pyrohelper import NoInviteLinkError, PyroHelper
-from .rate_limiter import RateLimiter
+from .rate_limiter import LimiterBackend, MemoryLimiterBackend, MongoLimiterBackend, RateLimiter
 
 __all__ = [
     "DataEncoder",
     "DataValidationError",
+    "LimiterBackend",
+    "MemoryLimiterBackend",
+    "MongoLimiterBackend",
     "NoInviteLinkError",
     "PyroHelper",
     "RateLimiter",
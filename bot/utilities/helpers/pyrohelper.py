@@ -1,4 +1,4 @@
-from typing import Any, TypedDict, cast
+from typing import Any, ClassVar, TypedDict, cast
 
 from pyrogram import raw
 from pyrogram.client import Client
@@ -6,6 +6,7 @@ from pyrogram.errors import UserIsBlocked
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from bot.config import ChannelInfo, config
+from bot.utilities.cache_manager import TTLCache, cache_manager
 
 
 class NoInviteLinkError(Exception):
@@ -19,7 +20,16 @@ class CustomCaption(TypedDict):
 
 
 class PyroHelper:
-    """Helper class for additional Pyrogram functions."""
+    """
+    Helper class for additional Pyrogram functions.
+
+    Attributes:
+        option_messages (ClassVar[TTLCache]):
+            Option messages fetched from the backup channel by message ID, ready to be copied.
+            Invalidated when the option is updated.
+    """
+
+    option_messages: ClassVar[TTLCache] = cache_manager.namespace("option_messages", TTLCache, maxsize=100, ttl=3600)
 
     @staticmethod
     async def get_channel_invites(client: Client, channels: list[int]) -> dict[str, ChannelInfo]:
@@ -69,32 +79,73 @@ class PyroHelper:
 
         return channels_n_invite
 
-    @staticmethod
+    @classmethod
+    async def get_option_message(cls, client: Client, message_id: int) -> Message:
+        """
+        Fetches an option message from the backup channel, only the first call makes an API request.
+
+        Parameters:
+            client (Client): Pyrogram client instance.
+            message_id (int): The message ID in the backup channel.
+
+        Returns:
+            Message: The option message.
+        """
+        option_message = cls.option_messages.get(message_id)
+        if option_message is None:
+            message_origin = await client.get_messages(chat_id=config.BACKUP_CHANNEL, message_ids=message_id)
+            option_message = message_origin[0] if isinstance(message_origin, list) else message_origin
+            cls.option_messages.set(message_id, option_message)
+        return option_message
+
+    @classmethod
     async def option_message(
+        cls,
         client: Client,
         message: Message,
         option_key: str | int,
         **kwargs: Any,  # noqa: ANN401
     ) -> Message | None:
+        return await cls.send_option_message(client=client, chat_id=message.chat.id, option_key=option_key, **kwargs)
+
+    @classmethod
+    async def send_option_message(
+        cls,
+        client: Client,
+        chat_id: int,
+        option_key: str | int,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Message | None:
+        """
+        Sends an option to a chat, a copy of the option message if it is a message ID otherwise its text.
+
+        Parameters:
+            client (Client): Pyrogram client instance.
+            chat_id (int): The chat ID.
+            option_key (str | int): The option value.
+            **kwargs (Any): Passed to the copy or send call, e.g. reply_markup.
+
+        Returns:
+            Message | None: The sent message, or None if the user blocked the bot.
+        """
         if isinstance(option_key, int):
-            message_origin = await client.get_messages(chat_id=config.BACKUP_CHANNEL, message_ids=option_key)
+            message_origin = await cls.get_option_message(client=client, message_id=option_key)
 
             if message_origin:
-                return cast("Message", await message_origin.copy(chat_id=message.chat.id, **kwargs))  # pyright: ignore[reportCallIssue]
+                return cast("Message", await message_origin.copy(chat_id=chat_id, **kwargs))  # pyright: ignore[reportCallIssue]
         try:
-            return await message.reply(
+            return await client.send_message(
+                chat_id=chat_id,
                 text=str(option_key),
                 **kwargs,
             )
         except UserIsBlocked:
             return None
 
-    @staticmethod
-    async def custom_caption(client: Client, option_key: str) -> CustomCaption:
+    @classmethod
+    async def custom_caption(cls, client: Client, option_key: str) -> CustomCaption:
         if isinstance(option_key, int):
-            message_origin = await client.get_messages(chat_id=config.BACKUP_CHANNEL, message_ids=option_key)
-
-            message = message_origin[0] if isinstance(message_origin, list) else message_origin
+            message = await cls.get_option_message(client=client, message_id=option_key)
 
             return CustomCaption(
                 text=message.text.markdown if message.text else None,
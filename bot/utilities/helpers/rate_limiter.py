@@ -1,64 +1,323 @@
 import asyncio
+import datetime
 import logging
 import time
-from collections.abc import Callable
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Hashable
 from functools import wraps
-from typing import ClassVar
+from typing import ClassVar, NamedTuple
 
 from lru import LRU
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 from pyrogram.client import Client
 from pyrogram.types import Message
 
 from bot.config import config
 
 
+class GCRALimiter:
+    """
+    A generic cell rate algorithm limiter.
+
+    Every key only stores its theoretical arrival time, a check is O(1) and needs no background task.
+
+    Parameters:
+        limit (float): Amount of executions allowed per period, also the allowed burst.
+        period (float): The period in seconds.
+        capacity (int): Maximum amount of keys tracked, the least recently used are evicted.
+        clock (Callable[[], float]): A monotonic clock in seconds, replaceable for simulations.
+    """
+
+    def __init__(
+        self,
+        limit: float,
+        period: float,
+        capacity: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = period / limit
+        self.tolerance = period
+        self.clock = clock
+        self.arrivals = LRU(capacity)
+
+    def reserve(self, key: Hashable, cost: int = 1) -> float:
+        """
+        Reserves executions for a key.
+
+        Parameters:
+            key (Hashable): The key to limit, e.g. a chat ID.
+            cost (int): The amount of executions to reserve.
+
+        Returns:
+            float: The seconds to wait before executing, 0 if it can execute right away.
+        """
+        now = self.clock()
+        arrival = max(self.arrivals.get(key, now), now) + self.interval * cost
+        self.arrivals[key] = arrival
+        return max(arrival - now - self.tolerance, 0.0)
+
+    def release(self, key: Hashable, cost: int = 1) -> None:
+        """
+        Gives back executions reserved for a key that was not executed.
+
+        Parameters:
+            key (Hashable): The key to limit, e.g. a chat ID.
+            cost (int): The amount of executions to give back.
+        """
+        arrival = self.arrivals.get(key)
+        if arrival is not None:
+            self.arrivals[key] = arrival - self.interval * cost
+
+
+class LimitScope(NamedTuple):
+    """
+    A rate limit scope.
+
+    Parameters:
+        name (str): The scope name, e.g. chat.
+        limit (float): Amount of executions allowed per period.
+        period (float): The period in seconds.
+    """
+
+    name: str
+    limit: float
+    period: float
+
+
+class LimiterBackend(ABC):
+    """Where rate limiter counters are stored."""
+
+    @abstractmethod
+    async def reserve(self, scope: LimitScope, key: Hashable, cost: int = 1) -> float:
+        """
+        Reserves executions for a key.
+
+        Parameters:
+            scope (LimitScope): The scope of the key.
+            key (Hashable): The key to limit, e.g. a chat ID.
+            cost (int): The amount of executions to reserve.
+
+        Returns:
+            float: The seconds to wait before executing, 0 if it can execute right away.
+        """
+
+    @abstractmethod
+    async def release(self, scope: LimitScope, key: Hashable, cost: int = 1) -> None:
+        """
+        Gives back executions reserved for a key that was not executed.
+
+        Parameters:
+            scope (LimitScope): The scope of the key.
+            key (Hashable): The key to limit, e.g. a chat ID.
+            cost (int): The amount of executions to give back.
+        """
+
+
+class MemoryLimiterBackend(LimiterBackend):
+    """
+    Keeps counters in process memory with a GCRALimiter per scope.
+
+    Parameters:
+        capacity (int): Maximum amount of keys tracked per scope.
+        clock (Callable[[], float]): A monotonic clock in seconds, replaceable for simulations.
+    """
+
+    def __init__(self, capacity: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = capacity
+        self.clock = clock
+        self.limiters: dict[LimitScope, GCRALimiter] = {}
+
+    def limiter(self, scope: LimitScope) -> GCRALimiter:
+        limiter = self.limiters.get(scope)
+        if limiter is None:
+            limiter = self.limiters[scope] = GCRALimiter(
+                limit=scope.limit,
+                period=scope.period,
+                capacity=self.capacity,
+                clock=self.clock,
+            )
+        return limiter
+
+    async def reserve(self, scope: LimitScope, key: Hashable, cost: int = 1) -> float:
+        return self.limiter(scope).reserve(key, cost)
+
+    async def release(self, scope: LimitScope, key: Hashable, cost: int = 1) -> None:
+        self.limiter(scope).release(key, cost)
+
+
+class MongoLimiterBackend(LimiterBackend):
+    """
+    Keeps counters in a collection shared by every bot instance using the same database.
+
+    Counters are fixed windows updated with an atomic $inc and expired by a TTL index. To avoid
+    a database round trip on every update each instance leases a few executions at once and
+    spends them locally until the lease runs out or the window ends.
+
+    A call over the quota of its window is charged to the next window with room left and waits
+    for it, so every window stays within the limit. Windows known to be full are skipped without
+    a round trip, calls that would wait longer than max_wait reserve nothing.
+
+    Parameters:
+        db (AsyncIOMotorDatabase): The database handle.
+        lease_size (int): Amount of executions leased per database round trip.
+        max_wait (float): Maximum seconds a call is charged ahead, defaults to RATE_LIMIT_MAX_WAIT_SECONDS.
+        clock (Callable[[], float]): A wall clock in seconds, shared between instances.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        lease_size: int,
+        max_wait: float = config.RATE_LIMIT_MAX_WAIT_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.collection = db["RateLimits"]
+        self.lease_size = lease_size
+        self.max_wait = max_wait
+        self.clock = clock
+        # (scope, key) -> (window, remaining executions, whether the window is full in the database)
+        self.leases: LRU = LRU(config.RATE_LIMITER_CAPACITY)
+        # (scope, key) -> window of the last reservation, what release gives back to
+        self.reservations: LRU = LRU(config.RATE_LIMITER_CAPACITY)
+
+    async def setup(self) -> None:
+        """Creates the TTL index that expires old windows, should be called once during startup."""
+        await self.collection.create_index("expire_at", expireAfterSeconds=0)
+
+    async def _lease(self, scope: LimitScope, key: Hashable, window: int, cost: int) -> tuple[int, bool]:
+        """
+        Leases executions of a window from the database.
+
+        Parameters:
+            scope (LimitScope): The scope of the key.
+            key (Hashable): The key to limit, e.g. a chat ID.
+            window (int): The window to lease from.
+            cost (int): The minimum amount of executions to lease.
+
+        Returns:
+            tuple[int, bool]: The executions granted and whether the window is now full.
+        """
+        lease = max(min(self.lease_size, int(scope.limit)), cost)
+        window_end = (window + 1) * scope.period
+        document = await self.collection.find_one_and_update(
+            {"_id": f"{scope.name}:{key}:{window}"},
+            {
+                "$inc": {"count": lease},
+                "$setOnInsert": {"expire_at": datetime.datetime.fromtimestamp(window_end, tz=datetime.timezone.utc)},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        granted = max(min(lease, int(scope.limit) - (document["count"] - lease)), 0)
+        return granted, granted < lease
+
+    async def reserve(self, scope: LimitScope, key: Hashable, cost: int = 1) -> float:
+        now = self.clock()
+        lease_key = (scope.name, key)
+        window = int(now // scope.period)
+
+        while True:
+            delay = max(window * scope.period - now, 0.0)
+            if delay > self.max_wait:
+                self.reservations.pop(lease_key, None)
+                return delay
+
+            lease_window, remaining, full = self.leases.get(lease_key, (window, 0, False))
+            if lease_window > window or (lease_window == window and remaining < cost and full):
+                window = max(lease_window, window + 1)
+                continue
+
+            if lease_window != window or remaining < cost:
+                granted, full = await self._lease(scope, key, window, cost)
+                lease_window, remaining, _ = self.leases.get(lease_key, (window, 0, False))
+                remaining = granted + (remaining if lease_window == window else 0)
+
+            if remaining >= cost:
+                self.leases[lease_key] = (window, remaining - cost, full)
+                self.reservations[lease_key] = window
+                return delay
+
+            self.leases[lease_key] = (window, remaining, True)
+            window += 1
+
+    async def release(self, scope: LimitScope, key: Hashable, cost: int = 1) -> None:
+        lease_key = (scope.name, key)
+        window = self.reservations.pop(lease_key, None)
+
+        lease_window, remaining, full = self.leases.get(lease_key, (None, 0, False))
+        if window is not None and lease_window == window:
+            self.leases[lease_key] = (window, remaining + cost, full)
+
+
 class RateLimiter:
     """
-    A experimental pyrogram rate limiter which use to limit the amount of update or command that bot handles.
+    A pyrogram rate limiter which use to limit the amount of update or command that bot handles.
+
+    Executions are limited per chat, per user and globally. Calls over the limit are queued
+    until their turn, calls that would have to wait longer than RATE_LIMIT_MAX_WAIT_SECONDS are dropped.
 
     Attributes:
         MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT (ClassVar[int]):
             The maximum number of executions per minute for the same chat ID.
-        chat_execution_counts (ClassVar[LRU]):
-            A lru dictionary to store the execution counts for each chat ID.
-        last_second_reset (ClassVar[float]):
-            The time of the last second reset.
-        last_minute_reset (ClassVar[float]):
-            The time of the last minute reset.
+        chat_scope (ClassVar[LimitScope]):
+            Limits executions per chat ID.
+        user_scope (ClassVar[LimitScope]):
+            Limits executions per user ID.
+        global_scope (ClassVar[LimitScope]):
+            Limits executions per second of the whole bot.
+        backend (ClassVar[LimiterBackend]):
+            Where the counters are stored, in memory unless replaced with use_backend.
+        counters (ClassVar[dict[str, int]]):
+            Amount of allowed, queued and throttled (dropped) calls and calls currently waiting.
     """
 
     logger = logging.getLogger(__name__)
 
-    MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT: ClassVar[int] = 25
+    MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT: ClassVar[int] = config.RATE_LIMIT_CHAT_PER_MINUTE
+
+    chat_scope: ClassVar[LimitScope] = LimitScope(name="chat", limit=MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT, period=60)
+    user_scope: ClassVar[LimitScope] = LimitScope(name="user", limit=config.RATE_LIMIT_USER_PER_MINUTE, period=60)
+    global_scope: ClassVar[LimitScope] = LimitScope(name="global", limit=config.RATE_LIMIT_GLOBAL_PER_SECOND, period=1)
 
-    chat_execution_counts: ClassVar[LRU] = LRU(100)
+    backend: ClassVar[LimiterBackend] = MemoryLimiterBackend(capacity=config.RATE_LIMITER_CAPACITY)
 
-    last_second_reset: ClassVar[float] = time.perf_counter()
-    last_minute_reset: ClassVar[float] = time.perf_counter()
+    counters: ClassVar[dict[str, int]] = {"allowed": 0, "queued": 0, "throttled": 0, "waiting": 0}
 
     @classmethod
-    def cooldown_limiter(cls) -> None:
+    def use_backend(cls, backend: LimiterBackend) -> None:
         """
-        Used to update every minute with new time and chat_execution_counts per id.
-        Moves queue to execs for rate limiter.
-        Deletes the key if there's nothing to execute or queue.
-        Should only be runned once during startup."""
-        exec_per_min = cls.MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT
-        cls.logger.info("cooldown_limiter Started...")
+        Replaces where the counters are stored, e.g. a MongoLimiterBackend shared by every bot instance.
 
-        while True:
-            current_time = time.perf_counter()
-            if current_time - cls.last_minute_reset >= 60:  # noqa: PLR2004
-                cls.last_minute_reset = current_time
-                for key, value in cls.chat_execution_counts.items():
-                    queue = value.get("queue", 0)
-                    execs, new_queue = (queue, 0) if queue <= exec_per_min else (exec_per_min, queue - exec_per_min)
-
-                    if execs == 0 and new_queue == 0:
-                        cls.chat_execution_counts.pop(key)
-                    else:
-                        cls.chat_execution_counts.update({key: {"exec": execs, "queue": new_queue}})
-            time.sleep(2)
+        Parameters:
+            backend (LimiterBackend): The new backend.
+        """
+        cls.backend = backend
+
+    @classmethod
+    async def reserve(cls, chat_id: int, user_id: int, cost: int = 1) -> float | None:
+        """
+        Reserves executions in every scope.
+
+        Parameters:
+            chat_id (int): The chat ID of the update.
+            user_id (int): The user ID of the update.
+            cost (int): The amount of executions to reserve.
+
+        Returns:
+            float | None: The seconds to wait before executing, None if the call should be dropped.
+        """
+        scopes = ((cls.chat_scope, chat_id), (cls.user_scope, user_id), (cls.global_scope, None))
+        delay = max([await cls.backend.reserve(scope, key, cost) for scope, key in scopes])
+
+        if delay > config.RATE_LIMIT_MAX_WAIT_SECONDS:
+            for scope, key in scopes:
+                await cls.backend.release(scope, key, cost)
+            cls.counters["throttled"] += 1
+            return None
+
+        cls.counters["queued" if delay else "allowed"] += 1
+        return delay
 
     @classmethod
     def hybrid_limiter(cls, func_count: int = 1) -> Callable[[Callable], Callable]:
@@ -67,7 +326,7 @@ class RateLimiter:
 
         Parameters:
             func_count (int):
-                The number of function executions to count. Defaults to 1.
+                The cost of the command, the number of function executions to count. Defaults to 1.
                 If your function sends 2 message set to 2.
 
         Returns:
@@ -92,25 +351,20 @@ class RateLimiter:
                     return await func(client, message, *args, **kwargs)
 
                 chat_id = message.chat.id
+                user_id = message.from_user.id if message.from_user else chat_id
 
-                cls.chat_execution_counts.setdefault(chat_id, {"exec": 0, "queue": 0})
-
-                user_dict = cls.chat_execution_counts[chat_id]
-                now = time.perf_counter()
-                elapsed_time_minute = now - cls.last_minute_reset
-
-                if user_dict["exec"] >= cls.MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT:
-                    cls.chat_execution_counts[chat_id]["queue"] += func_count
-
-                    sleep_time = 60
-                    sleep_queue = (user_dict["queue"] // cls.MAX_EXECUTIONS_PER_MINUTE_SAME_CHAT) + 1
-
-                    total_sleep = (sleep_time * sleep_queue) - elapsed_time_minute
-
-                    cls.logger.info("Waiting for %d seconds... before next execution, id: %d", total_sleep, chat_id)
-                    await asyncio.sleep(total_sleep)
+                delay = await cls.reserve(chat_id=chat_id, user_id=user_id, cost=func_count)
+                if delay is None:
+                    cls.logger.info("Dropped execution over the rate limit, id: %d", chat_id)
+                    return False
 
-                cls.chat_execution_counts.setdefault(chat_id, {"exec": 0, "queue": 0})["exec"] += func_count
+                if delay:
+                    cls.logger.info("Waiting for %d seconds... before next execution, id: %d", delay, chat_id)
+                    cls.counters["waiting"] += 1
+                    try:
+                        await asyncio.sleep(delay)
+                    finally:
+                        cls.counters["waiting"] -= 1
 
                 return await func(client, message, *args, **kwargs)
 
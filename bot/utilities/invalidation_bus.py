@@ -0,0 +1,201 @@
+import asyncio
+import contextlib
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Hashable
+from typing import NamedTuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from bot.utilities.cache_manager import CacheManager, cache_manager
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationEvent(NamedTuple):
+    """
+    A cache invalidation made by a bot instance.
+
+    Attributes:
+        origin (str): The ID of the bot instance that made the change.
+        name (str): The cache namespace, e.g. "links".
+        key (Hashable | None): The invalidated key, None if the whole namespace changed.
+    """
+
+    origin: str
+    name: str
+    key: Hashable | None
+
+
+class InvalidationTransport(ABC):
+    """Delivers invalidation events between bot instances."""
+
+    async def setup(self) -> None:  # noqa: B027
+        """Prepares the transport, called once before listening."""
+
+    @abstractmethod
+    async def publish(self, event: InvalidationEvent) -> None:
+        """
+        Sends an event to every listener.
+
+        Parameters:
+            event (InvalidationEvent): The event to send.
+        """
+
+    @abstractmethod
+    def listen(self) -> AsyncIterator[InvalidationEvent]:
+        """
+        Receives the events published after the listener started, including its own.
+
+        Returns:
+            AsyncIterator[InvalidationEvent]: The events, never ends unless cancelled.
+        """
+
+
+class MemoryTransport(InvalidationTransport):
+    """Delivers events to the listeners of the same process, e.g. a single instance or tests."""
+
+    def __init__(self) -> None:
+        self.queues: list[asyncio.Queue[InvalidationEvent]] = []
+
+    async def publish(self, event: InvalidationEvent) -> None:
+        for queue in self.queues:
+            queue.put_nowait(event)
+
+    async def listen(self) -> AsyncIterator[InvalidationEvent]:
+        queue: asyncio.Queue[InvalidationEvent] = asyncio.Queue()
+        self.queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.queues.remove(queue)
+
+
+class MongoTransport(InvalidationTransport):
+    """
+    Delivers events through a capped collection tailed by every bot instance using the same database.
+
+    Keys must be BSON scalars, e.g. an int or a str.
+
+    Parameters:
+        db (AsyncIOMotorDatabase): The database handle.
+        size (int): The size of the capped collection in bytes, old events are overwritten.
+        retry_seconds (float): Seconds to wait before tailing again after the cursor died.
+    """
+
+    COLLECTION = "Invalidations"
+
+    def __init__(self, db: AsyncIOMotorDatabase, size: int = 1_048_576, retry_seconds: float = 1) -> None:
+        self.db = db
+        self.collection = db[self.COLLECTION]
+        self.size = size
+        self.retry_seconds = retry_seconds
+
+    async def setup(self) -> None:
+        """Creates the capped collection if it does not exist yet."""
+        with contextlib.suppress(CollectionInvalid):
+            await self.db.create_collection(self.COLLECTION, capped=True, size=self.size)
+
+    async def publish(self, event: InvalidationEvent) -> None:
+        await self.collection.insert_one(event._asdict())
+
+    async def listen(self) -> AsyncIterator[InvalidationEvent]:
+        started, last_id = False, None
+        while True:
+            try:
+                if not started:
+                    latest = await self.collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+                    started, last_id = True, latest["_id"] if latest else None
+
+                # ObjectIds are made by each instance's client and aren't ordered across instances, the
+                # collection is tailed again in insertion order and everything up to the last event is skipped.
+                # A last event that was overwritten meanwhile replays the collection, invalidating twice is harmless.
+                skipping = last_id is not None and await self.collection.find_one({"_id": last_id}) is not None
+
+                # A tailable cursor dies right away on an empty collection or once it fell behind overwritten events.
+                cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for document in cursor:
+                        if skipping:
+                            skipping = document["_id"] != last_id
+                            continue
+
+                        last_id = document["_id"]
+                        yield InvalidationEvent(document["origin"], document["name"], document["key"])
+            except PyMongoError as e:
+                logger.warning("Invalidation cursor failed, tailing again: %s", e)
+            await asyncio.sleep(self.retry_seconds)
+
+
+class InvalidationBus:
+    """
+    Broadcasts cache invalidations to every bot instance sharing the database so each can cache aggressively.
+
+    Publishing only notifies the other instances, the publisher updates its own caches since it knows
+    the new value. Received events are applied with CacheManager.invalidate, state that is not a cache,
+    e.g. the options or the banned users, is refreshed by hooks registered with CacheManager.on_invalidate.
+
+    Parameters:
+        manager (CacheManager): The caches to invalidate.
+        transport (InvalidationTransport | None): Defaults to a MemoryTransport, i.e. a single instance.
+
+    Attributes:
+        origin (str): A random ID of this bot instance, its own events are ignored.
+    """
+
+    def __init__(self, manager: CacheManager, transport: InvalidationTransport | None = None) -> None:
+        self.cache_manager = manager
+        self.transport = transport or MemoryTransport()
+        self.origin = uuid.uuid4().hex
+        self._listener: asyncio.Task | None = None
+
+    def use_transport(self, transport: InvalidationTransport) -> None:
+        """
+        Replaces how events are delivered, e.g. a MongoTransport shared by every bot instance.
+
+        Parameters:
+            transport (InvalidationTransport): The new transport, should be set before start.
+        """
+        self.transport = transport
+
+    async def start(self) -> None:
+        """Starts applying the events published by other bot instances."""
+        await self.transport.setup()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stops listening for events."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def publish(self, name: str, key: Hashable | None = None) -> None:
+        """
+        Tells the other bot instances that a cached value changed, failures are logged and ignored.
+
+        Parameters:
+            name (str): The cache namespace.
+            key (Hashable | None): The changed key, None if the whole namespace changed.
+        """
+        try:
+            await self.transport.publish(InvalidationEvent(origin=self.origin, name=name, key=key))
+        except PyMongoError as e:
+            logger.warning("Couldn't publish invalidation of %s: %s", name, e)
+
+    async def _listen(self) -> None:
+        async for event in self.transport.listen():
+            if event.origin == self.origin:
+                continue
+
+            try:
+                self.cache_manager.invalidate(event.name, event.key)
+            except Exception:
+                logger.exception("Couldn't apply invalidation of %s", event.name)
+
+
+invalidation_bus = InvalidationBus(cache_manager)
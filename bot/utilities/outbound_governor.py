@@ -0,0 +1,327 @@
+import asyncio
+import contextlib
+import functools
+import heapq
+import itertools
+import random
+import time
+from collections.abc import Awaitable, Callable, Hashable, Iterator
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, ClassVar, TypeVar
+
+from lru import LRU
+from pyrogram.client import Client
+from pyrogram.errors import FloodWait
+
+from bot.config import config
+from bot.utilities.helpers.rate_limiter import GCRALimiter
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+class Priority(IntEnum):
+    """Outbound call priorities, lower values are sent first when the global budget is exhausted."""
+
+    INTERACTIVE = 0
+    ADMIN = 1
+    BROADCAST = 2
+    CLEANUP = 3
+
+
+current_priority: ContextVar[Priority] = ContextVar("current_priority", default=Priority.INTERACTIVE)
+_governed: ContextVar[bool] = ContextVar("_governed", default=False)
+
+
+@contextlib.contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """
+    Sets the priority of the outbound calls made within the block.
+
+    Parameters:
+        level (Priority): The priority.
+    """
+    token = current_priority.set(level)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def with_priority(level: Priority) -> Callable[[F], F]:
+    """
+    Decorates a handler so the outbound calls it makes have a priority.
+
+    Parameters:
+        level (Priority): The priority.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            with priority(level):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore[reportReturnType]
+
+    return decorator
+
+
+class OutboundGovernor:
+    """
+    Paces every outbound Telegram call so the bot slows itself down before Telegram answers with a FloodWait.
+
+    A call first waits for its chat and its method, then for the global budget. When the global budget
+    is exhausted calls are queued and released by priority, interactive deliveries before admin
+    commands, broadcasts and auto delete cleanups.
+
+    A FloodWait that still happens pauses every call to the same chat, or of the same method for calls
+    without a chat, so callers hitting the same limit wait once together instead of retrying on their own.
+    At bulk priorities the limit is bot wide, the pause covers every call of the method at those priorities.
+    Broadcast FloodWaits are raised to the caller after the pause is set so the broadcast pacer keeps adapting.
+
+    Reads, e.g. subscription checks, have their own limits on Telegram's side. They are only paced by the
+    method limits and the FloodWait pauses of their method, never by the chat or global budgets of messages.
+
+    Parameters:
+        rate (float): Global calls per second, also the allowed burst.
+        chat_limit (float): Calls per chat per minute, also the allowed burst.
+        method_limits (dict[str, float]): Calls per second of specific client methods.
+        capacity (int): Maximum amount of chats tracked.
+        max_flood_wait (float): Maximum seconds a single call waits on FloodWaits before the error is raised.
+        jitter (float): Maximum random seconds added when a pause ends, spreads out the callers it held.
+        clock (Callable[[], float]): A monotonic clock in seconds.
+
+    Attributes:
+        BULK_PRIORITIES (ClassVar[tuple[Priority, ...]]): Priorities whose FloodWaits pause the whole method.
+        RAISED_PRIORITIES (ClassVar[tuple[Priority, ...]]): Priorities whose FloodWaits are raised, not retried.
+        READ_METHODS (ClassVar[frozenset[str]]): Client methods that read instead of sending.
+        metrics (dict[Priority, dict[str, float]]): Calls sent, seconds waited and the longest wait per priority.
+        flood_metrics (dict[str, float]): FloodWaits received, retried and raised, and the seconds paused.
+    """
+
+    BULK_PRIORITIES: ClassVar[tuple[Priority, ...]] = (Priority.BROADCAST, Priority.CLEANUP)
+    RAISED_PRIORITIES: ClassVar[tuple[Priority, ...]] = (Priority.BROADCAST,)
+    READ_METHODS: ClassVar[frozenset[str]] = frozenset({"get_chat_member", "get_messages"})
+
+    def __init__(  # noqa: PLR0913
+        self,
+        rate: float,
+        chat_limit: float,
+        method_limits: dict[str, float],
+        capacity: int,
+        max_flood_wait: float = 60,
+        jitter: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.max_flood_wait = max_flood_wait
+        self.jitter = jitter
+        self.clock = clock
+        self.tokens = rate
+        self.updated_at = clock()
+        self.chat_limiter = GCRALimiter(limit=chat_limit, period=60, capacity=capacity, clock=clock)
+        self.method_limiters = {
+            method: GCRALimiter(limit=limit, period=1, clock=clock) for method, limit in method_limits.items()
+        }
+        self.waiters: list[tuple[Priority, int, asyncio.Future[None]]] = []
+        self.sequence = itertools.count()
+        self.dispatcher: asyncio.Task | None = None
+        self.pacing = 0
+        self.pauses = LRU(capacity)
+        self.flood_metrics: dict[str, float] = {"flood_waits": 0, "retried": 0, "raised": 0, "paused": 0.0}
+        self.metrics: dict[Priority, dict[str, float]] = {
+            level: {"sent": 0, "waited": 0.0, "max_wait": 0.0} for level in Priority
+        }
+
+    async def acquire(self, method: str, chat_id: Hashable | None) -> None:
+        """
+        Waits until a call can be sent.
+
+        Parameters:
+            method (str): The client method, e.g. "send_message".
+            chat_id (Hashable | None): The destination chat.
+        """
+        level = current_priority.get()
+        started_at = self.clock()
+        read = method in self.READ_METHODS
+
+        paused_until = self.pauses.get(self._pause_key(method=method, chat_id=chat_id, level=level))
+        if paused_until is not None and paused_until > started_at:
+            await asyncio.sleep(paused_until - started_at + random.uniform(0, self.jitter))  # noqa: S311
+
+        delay = self.chat_limiter.reserve(chat_id) if chat_id is not None and not read else 0.0
+        method_limiter = self.method_limiters.get(method)
+        if method_limiter is not None:
+            delay = max(delay, method_limiter.reserve(method))
+
+        if delay:
+            self.pacing += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.pacing -= 1
+
+        if not read:
+            await self._take_token(level)
+
+        waited = self.clock() - started_at
+        metrics = self.metrics[level]
+        metrics["sent"] += 1
+        metrics["waited"] += waited
+        metrics["max_wait"] = max(metrics["max_wait"], waited)
+
+    def _pause_key(self, method: str, chat_id: Hashable | None, level: Priority) -> Hashable:
+        if chat_id is None or level in self.BULK_PRIORITIES or method in self.READ_METHODS:
+            return method
+        return chat_id
+
+    def flood_wait(self, method: str, chat_id: Hashable | None, seconds: float, waited: float) -> bool:
+        """
+        Pauses the calls hitting the same limit after a FloodWait.
+
+        Parameters:
+            method (str): The client method that received the FloodWait.
+            chat_id (Hashable | None): The destination chat.
+            seconds (float): The FloodWait value.
+            waited (float): Seconds the call already waited on previous FloodWaits.
+
+        Returns:
+            bool: Whether the call should be retried, False once it would wait longer than max_flood_wait
+                or if its priority handles FloodWaits itself.
+        """
+        level = current_priority.get()
+        self.flood_metrics["flood_waits"] += 1
+        if waited + seconds > self.max_flood_wait:
+            self.flood_metrics["raised"] += 1
+            return False
+
+        key = self._pause_key(method=method, chat_id=chat_id, level=level)
+        paused_until = self.clock() + seconds
+        previous = self.pauses.get(key, 0.0)
+        if paused_until > previous:
+            self.pauses[key] = paused_until
+            self.flood_metrics["paused"] += paused_until - max(previous, self.clock())
+
+        if level in self.RAISED_PRIORITIES:
+            self.flood_metrics["raised"] += 1
+            return False
+
+        self.flood_metrics["retried"] += 1
+        return True
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def _take_token(self, level: Priority) -> None:
+        self._refill()
+        if not self.waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (level, next(self.sequence), future))
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        while self.waiters:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            _, _, future = heapq.heappop(self.waiters)
+            # Cancelled callers don't spend the budget.
+            if not future.done():
+                self.tokens -= 1
+                future.set_result(None)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Retrieves the queue depth and wait times per priority.
+
+        Returns:
+            dict[str, dict[str, float]]: Calls queued for the global budget, sent, and the average and longest wait.
+        """
+        queued = {level: 0 for level in Priority}
+        for level, _, future in self.waiters:
+            if not future.done():
+                queued[level] += 1
+
+        return {
+            level.name.lower(): {
+                "queued": queued[level],
+                "sent": metrics["sent"],
+                "avg_wait": metrics["waited"] / metrics["sent"] if metrics["sent"] else 0.0,
+                "max_wait": metrics["max_wait"],
+            }
+            for level, metrics in self.metrics.items()
+        }
+
+
+governor = OutboundGovernor(
+    rate=config.OUTBOUND_PER_SECOND,
+    chat_limit=config.OUTBOUND_CHAT_PER_MINUTE,
+    method_limits=config.OUTBOUND_METHOD_PER_SECOND,
+    capacity=config.RATE_LIMITER_CAPACITY,
+    max_flood_wait=config.FLOOD_WAIT_MAX_SECONDS,
+    jitter=config.FLOOD_WAIT_JITTER_SECONDS,
+)
+
+
+def _governed_method(name: str) -> Callable[..., Awaitable[Any]]:
+    method = getattr(Client, name)
+
+    @functools.wraps(method)
+    async def wrapper(self: Client, chat_id: int | str, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        # Calls made by another governed call, e.g. copy_message sending the copy, were already paced.
+        if _governed.get():
+            return await method(self, chat_id, *args, **kwargs)
+
+        token = _governed.set(True)
+        try:
+            waited = 0.0
+            while True:
+                await governor.acquire(method=name, chat_id=chat_id)
+                try:
+                    return await method(self, chat_id, *args, **kwargs)
+                except FloodWait as e:
+                    seconds = float(e.value)  # type: ignore[reportArgumentType]
+                    if not governor.flood_wait(method=name, chat_id=chat_id, seconds=seconds, waited=waited):
+                        raise
+                    waited += seconds
+        finally:
+            _governed.reset(token)
+
+    return wrapper
+
+
+class GovernedClient(Client):
+    """
+    A pyrogram client whose sending, copying, forwarding, editing, deleting and reading calls are paced by the governor.
+
+    FloodWaits of these calls are retried after the shared pause, except at broadcast priority where
+    they are raised to the broadcast pacer. Short ones are still slept by pyrogram itself below its
+    sleep_threshold.
+    """
+
+    send_message = _governed_method("send_message")
+    send_photo = _governed_method("send_photo")
+    send_audio = _governed_method("send_audio")
+    send_document = _governed_method("send_document")
+    send_video = _governed_method("send_video")
+    send_sticker = _governed_method("send_sticker")
+    send_cached_media = _governed_method("send_cached_media")
+    send_media_group = _governed_method("send_media_group")
+    copy_message = _governed_method("copy_message")
+    copy_media_group = _governed_method("copy_media_group")
+    forward_messages = _governed_method("forward_messages")
+    edit_message_text = _governed_method("edit_message_text")
+    pin_chat_message = _governed_method("pin_chat_message")
+    delete_messages = _governed_method("delete_messages")
+    get_chat_member = _governed_method("get_chat_member")
+    get_messages = _governed_method("get_messages")
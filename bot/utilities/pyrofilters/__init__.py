@@ -1,9 +1,10 @@
 from .admins import AdminsFilter
 from .conversation import ConversationFilter, ConvoMessage
+from .ordered import OrderedFilter
 from .subscription import SubscriptionFilter, SubscriptionMessage
 
 
-class PyroFilters(AdminsFilter, SubscriptionFilter, ConversationFilter):
+class PyroFilters(AdminsFilter, SubscriptionFilter, ConversationFilter, OrderedFilter):
     pass
 
 
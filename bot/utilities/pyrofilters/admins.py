@@ -7,6 +7,8 @@ from pyrogram.types import Message
 from bot.config import config
 from bot.options import options
 
+from .ordered import OrderedFilter
+
 
 class AdminsFilter:
     @staticmethod
@@ -18,4 +20,4 @@ class AdminsFilter:
             global_mode = options.settings.GLOBAL_MODE
             return user_id in config.ROOT_ADMINS_ID or (global_mode and allow_global)
 
-        return filters.create(func, "AdminFilter")
+        return filters.create(func, "AdminFilter", cost=OrderedFilter.COST_MEMORY)
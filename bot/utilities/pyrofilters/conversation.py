@@ -4,6 +4,8 @@ from pyrogram import filters
 from pyrogram.client import Client
 from pyrogram.types import Message
 
+from .ordered import OrderedFilter
+
 
 class ConvoMessage(Message):
     def __init__(self) -> None:
@@ -31,7 +33,7 @@ class ConversationFilter:
             unique_id = message.chat.id + message.from_user.id
             return unique_id not in cls._convo_cache
 
-        return filters.create(func, "ConversationFilter")
+        return filters.create(func, "ConversationFilter", cost=OrderedFilter.COST_MEMORY)
 
     @classmethod
     def create_conversation_filter(
@@ -83,4 +85,4 @@ class ConversationFilter:
 
             return False
 
-        return filters.create(func, "ConversationFilter")
+        return filters.create(func, "ConversationFilter", cost=OrderedFilter.COST_STATEFUL)
@@ -0,0 +1,69 @@
+import functools
+from collections.abc import Callable, Coroutine
+from typing import Any, ClassVar
+
+from pyrogram import filters
+from pyrogram.client import Client
+from pyrogram.types import Update
+
+FilterFunc = Callable[[filters.Filter, Client, Update], Coroutine[Any, Any, bool]]
+
+
+class OrderedFilter:
+    """
+    Cost ordered and memoized filter evaluation.
+
+    A filter declares its cost with filters.create(func, name, cost=...), filters without a cost
+    like pyrogram's built-in filters are free. all_of evaluates the cheapest filters first.
+
+    Attributes:
+        COST_MEMORY (ClassVar[int]): Filters that only read memory.
+        COST_NETWORK (ClassVar[int]): Filters that may call the database or telegram.
+        COST_STATEFUL (ClassVar[int]):
+            Filters that change state when they pass, evaluated last so they only run for
+            updates every other filter accepted.
+    """
+
+    COST_MEMORY: ClassVar[int] = 1
+    COST_NETWORK: ClassVar[int] = 100
+    COST_STATEFUL: ClassVar[int] = 1000
+
+    @staticmethod
+    def all_of(*flts: filters.Filter) -> filters.Filter:
+        """
+        Combines filters with and, ordered from the cheapest to the most expensive.
+
+        Parameters:
+            *flts (filters.Filter): The filters to combine, filters of the same cost keep their order.
+
+        Returns:
+            filters.Filter: The combined filter.
+        """
+        ordered = sorted(flts, key=lambda flt: getattr(flt, "cost", 0))
+        return functools.reduce(lambda base, other: base & other, ordered)
+
+    @staticmethod
+    def memoize(func: FilterFunc, key: str) -> FilterFunc:
+        """
+        Wraps a filter function so it runs at most once per update, even if several handlers use it.
+
+        Parameters:
+            func (FilterFunc): The filter function, its result must only depend on the update.
+            key (str): A unique key of the filter.
+
+        Returns:
+            FilterFunc: The memoized filter function.
+        """
+
+        @functools.wraps(func)
+        async def wrapper(flt: filters.Filter, client: Client, update: Update) -> bool:
+            memo: dict[str, bool] | None = getattr(update, "filter_memo", None)
+            if memo is None:
+                memo = {}
+                update.filter_memo = memo  # type: ignore[reportAttributeAccessIssue]
+
+            if key not in memo:
+                memo[key] = await func(flt, client, update)
+            return memo[key]
+
+        return wrapper
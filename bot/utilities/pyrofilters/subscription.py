@@ -1,8 +1,6 @@
-import datetime
+import asyncio
 from typing import ClassVar
 
-import tzlocal
-from lru import LRU
 from pyrogram import filters
 from pyrogram.client import Client
 from pyrogram.enums import ChatMemberStatus
@@ -10,9 +8,10 @@ from pyrogram.errors import UserNotParticipant
 from pyrogram.types import Message
 
 from bot.config import config
-from bot.database import MongoDB
+from bot.database import database
+from bot.utilities.cache_manager import BitmaskCache, cache_manager
 
-database = MongoDB()
+from .ordered import OrderedFilter
 
 
 class SubscriptionMessage(Message):
@@ -25,12 +24,123 @@ class SubscriptionFilter:
     A filter to check if a user is subscribed to the required channels.
 
     Attributes:
-        CACHE_USER_SECONDS (int): Amount of seconds before checking the user again to avoid spams.
-        _subs_cache (ClassVar[LRU[int, datetime.datetime]]): A lru dict to store user IDs and their last check time.
+        SUBSCRIBED_STATUS (ClassVar[tuple[ChatMemberStatus, ...]]): Member status that count as subscribed.
+        CACHE_USER_SECONDS (int): Amount of seconds before checking a subscribed user again.
+        CACHE_NOT_SUBSCRIBED_SECONDS (int): Amount of seconds before checking a not subscribed user again.
+        _subs_cache (ClassVar[BitmaskCache]):
+            The channels each user is verified in, bit n is set if the user is in the nth force sub channel.
     """
 
-    CACHE_USER_SECONDS: int = 15
-    _subs_cache: ClassVar[LRU] = LRU(10)
+    SUBSCRIBED_STATUS: ClassVar[tuple[ChatMemberStatus, ...]] = (
+        ChatMemberStatus.OWNER,
+        ChatMemberStatus.ADMINISTRATOR,
+        ChatMemberStatus.MEMBER,
+    )
+    CACHE_USER_SECONDS: int = config.SUBSCRIPTION_CACHE_SECONDS
+    CACHE_NOT_SUBSCRIBED_SECONDS: int = config.SUBSCRIPTION_NEGATIVE_CACHE_SECONDS
+    _subs_cache: ClassVar[BitmaskCache] = cache_manager.namespace(
+        "subscriptions",
+        BitmaskCache,
+        maxsize=config.SUBSCRIPTION_CACHE_SIZE,
+        ttl=config.SUBSCRIPTION_CACHE_SECONDS,
+    )
+
+    @staticmethod
+    def _channel_bit(channel_id: int) -> int | None:
+        for bit, channel_info in enumerate(config.channels_n_invite.values()):
+            if channel_info["channel_id"] == channel_id:
+                return bit
+        return None
+
+    @classmethod
+    def subscription_joined(cls, user_id: int, channel_id: int) -> None:
+        """
+        Marks a user as verified in a force sub channel after they joined or requested to join it.
+
+        Parameters:
+            user_id (int): The ID of the user.
+            channel_id (int): The ID of the channel.
+        """
+        bit = cls._channel_bit(channel_id)
+        if bit is None:
+            return
+
+        subscribed_mask = (1 << len(config.channels_n_invite)) - 1
+        verified_mask = (cls._subs_cache.peek(user_id) or 0) | 1 << bit
+        if verified_mask == subscribed_mask:
+            cls._subs_cache.set(user_id, verified_mask)
+        else:
+            # The other channels are not verified yet, let the filter check them again.
+            cls._subs_cache.pop(user_id)
+
+    @classmethod
+    def subscription_left(cls, user_id: int, channel_id: int) -> None:
+        """
+        Marks a user as not verified in a force sub channel after they left or were removed from it.
+
+        Parameters:
+            user_id (int): The ID of the user.
+            channel_id (int): The ID of the channel.
+        """
+        bit = cls._channel_bit(channel_id)
+        if bit is None:
+            return
+
+        if config.PRIVATE_REQUEST:
+            # A previous join request still counts as subscribed, let the filter check it again.
+            cls._subs_cache.pop(user_id)
+            return
+
+        verified_mask = cls._subs_cache.peek(user_id) or 0
+        cls._subs_cache.set(user_id, verified_mask & ~(1 << bit), ttl=cls.CACHE_NOT_SUBSCRIBED_SECONDS)
+
+    @classmethod
+    async def _verify_channels(cls, client: Client, user_id: int) -> int:
+        """
+        Checks every force sub channel concurrently and stops at the first channel the user is not in.
+
+        Parameters:
+            client (Client): The Pyrogram client.
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The verified channels bitmask, bit n is set if the user is in the nth force sub channel.
+        """
+        semaphore = asyncio.Semaphore(config.SUBSCRIPTION_CHECK_CONCURRENCY)
+        requested_channels = (
+            asyncio.ensure_future(database.user_requested_channels(user_id)) if config.PRIVATE_REQUEST else None
+        )
+
+        async def verify(bit: int, channel_id: int) -> int:
+            async with semaphore:
+                try:
+                    member = await client.get_chat_member(chat_id=channel_id, user_id=user_id)
+                except UserNotParticipant:
+                    # Shielded, the lookup is shared by every check and must survive a cancelled one.
+                    if requested_channels is None or channel_id not in await asyncio.shield(requested_channels):
+                        return 0
+                    return 1 << bit
+            return 1 << bit if member.status in cls.SUBSCRIBED_STATUS else 0
+
+        tasks = [
+            asyncio.create_task(verify(bit=bit, channel_id=channel_info["channel_id"]))
+            for bit, channel_info in enumerate(config.channels_n_invite.values())
+        ]
+        pending = [*tasks, requested_channels] if requested_channels else tasks
+
+        verified_mask = 0
+        try:
+            for task in asyncio.as_completed(tasks):
+                channel_mask = await task
+                if not channel_mask:
+                    break
+                verified_mask |= channel_mask
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return verified_mask
 
     @classmethod
     def subscription(cls) -> filters.Filter:
@@ -54,47 +164,31 @@ class SubscriptionFilter:
             """
 
             user_id = message.from_user.id
-            status = [
-                ChatMemberStatus.OWNER,
-                ChatMemberStatus.ADMINISTRATOR,
-                ChatMemberStatus.MEMBER,
-            ]
 
-            if await database.is_user_banned(user_id):
+            if database.is_user_banned(user_id):
                 message.user_is_banned = True
                 return False
 
             if user_id in config.ROOT_ADMINS_ID or not config.FORCE_SUB_CHANNELS:
                 return True
 
-            if user_id in cls._subs_cache:
-                user_cache_time = cls._subs_cache.get(user_id)
-                current_time = datetime.datetime.now(tz=tzlocal.get_localzone())
-
-                if user_cache_time and (current_time - user_cache_time) <= datetime.timedelta(
-                    seconds=cls.CACHE_USER_SECONDS,
-                ):
-                    return True
+            channels = list(config.channels_n_invite.values())
+            subscribed_mask = (1 << len(channels)) - 1
 
-                cls._subs_cache.pop(user_id)
+            verified_mask = cls._subs_cache.get(user_id)
+            if verified_mask is not None:
+                return verified_mask == subscribed_mask
 
-            for channel_info in config.channels_n_invite.values():
-                channel_id = channel_info["channel_id"]
-
-                try:
-                    member = await client.get_chat_member(chat_id=channel_id, user_id=user_id)
-
-                    if member.status not in status:
-                        return False
-
-                except UserNotParticipant:
-                    joined_request_channel = await database.user_requested_channels(user_id)
-                    if (not config.PRIVATE_REQUEST) or (
-                        channel_id not in joined_request_channel and config.PRIVATE_REQUEST
-                    ):
-                        return False
+            verified_mask = await cls._verify_channels(client=client, user_id=user_id)
+            if verified_mask == subscribed_mask:
+                cls._subs_cache.set(user_id, verified_mask)
+                return True
 
-            cls._subs_cache[user_id] = datetime.datetime.now(tz=tzlocal.get_localzone())
-            return True
+            cls._subs_cache.set(user_id, verified_mask, ttl=cls.CACHE_NOT_SUBSCRIBED_SECONDS)
+            return False
 
-        return filters.create(func, "SubscriptionFilter")
+        return filters.create(
+            OrderedFilter.memoize(func, key="subscription"),
+            "SubscriptionFilter",
+            cost=OrderedFilter.COST_NETWORK,
+        )
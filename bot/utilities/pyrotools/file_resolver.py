@@ -1,31 +1,20 @@
-import contextlib
-from itertools import groupby
-from typing import TYPE_CHECKING, Any, cast
+import asyncio
+import functools
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar, cast
 
-from pydantic import BaseModel
 from pyrogram.client import Client
-from pyrogram.file_id import FileId
+from pyrogram.errors import InternalServerError, RPCError
 from pyrogram.types import InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo, Message
 
+from bot.config import config
+from bot.database.models import FileResolverModel
 from bot.options import options
 
-if TYPE_CHECKING:
-    from collections.abc import Callable
+logger = logging.getLogger(__name__)
 
-
-class FileResolverModel(BaseModel):
-    """
-    Represents a file resolver.
-
-    Parameters:
-        file_id (str): The file ID.
-        caption (str | None): The file caption.
-    """
-
-    caption: str | None
-    file_id: str
-    message_id: int
-    media_group_id: int | None = None
+T = TypeVar("T")
 
 
 class UnsupportedFileError(Exception):
@@ -33,23 +22,90 @@ class UnsupportedFileError(Exception):
     Raised when an unsupported file type is encountered.
     """
 
-    def __init__(self, file_type: FileId | None) -> None:
+    def __init__(self, file_type: str | None) -> None:
         super().__init__(f"Unsupported file: {file_type}")
 
 
 class SendMedia:
     """
     Provides methods for sending media files.
+
+    Files of a chat are always sent one piece at a time, concurrent sends to the same chat are
+    not guaranteed to arrive in order. What can run ahead, e.g. fetching the backup copies of the
+    next chunk, is fetched in bulk while the current chunk is being sent.
+
+    Files are sent with the media type, album and caption flag stored in their link document.
     """
 
+    @staticmethod
+    async def with_retries(send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Retries a piece of a delivery on telegram server errors, up to DELIVERY_ATTEMPTS times.
+
+        FloodWaits are retried by the GovernedClient.
+
+        Parameters:
+            send (Callable[[], Awaitable[T]]): Sends the piece.
+
+        Returns:
+            T: The result of send.
+
+        Raises:
+            RPCError: If the last attempt failed.
+        """
+        for attempt in range(1, config.DELIVERY_ATTEMPTS):
+            try:
+                return await send()
+            except InternalServerError as e:  # noqa: PERF203
+                logger.warning("Telegram server error, retrying (attempt %d): %s", attempt, e)
+                await asyncio.sleep(attempt)
+        return await send()
+
+    @classmethod
+    async def prefetch_origin_messages(
+        cls,
+        client: Client,
+        file_origin: int,
+        file_data: list[FileResolverModel],
+    ) -> dict[int, Message] | None:
+        """
+        Fetches the backup copies of the files that will be sent one by one with a single request.
+
+        Parameters:
+            client (Client): The Pyrogram client.
+            file_origin (int): Where the files came from.
+            file_data (list[FileResolverModel]): At most 200 files.
+
+        Returns:
+            dict[int, Message] | None:
+                The copies by message ID, None if files aren't sent from their backup copies. Empty if
+                the copies couldn't be fetched so the files are sent by file ID without another request each.
+        """
+        if not options.settings.BACKUP_FILES:
+            return None
+
+        message_ids = [i.message_id for i in cls.pieces(file_data=file_data) if not isinstance(i, list)]
+        if not message_ids:
+            return {}
+
+        try:
+            messages = await client.get_messages(chat_id=file_origin, message_ids=message_ids)
+        except RPCError as e:
+            logger.warning("Couldn't prefetch files from %d: %s", file_origin, e)
+            return {}
+
+        messages = messages if isinstance(messages, list) else [messages]
+        return {message.id: message for message in messages if not getattr(message, "empty", False)}
+
     @classmethod
-    async def send_media(
+    async def send_media(  # noqa: PLR0913
         cls,
         client: Client,
         chat_id: int,
         file_data: FileResolverModel,
         file_origin: int,
         protect_content: bool,  # noqa: FBT001
+        origin_messages: dict[int, Message] | None = None,
     ) -> Message:
         """
         Sends a media file.
@@ -59,6 +115,7 @@ class SendMedia:
             chat_id (int): The chat ID.
             file_data (FileResolverModel): The file data.
             file_origin: (int | None): Where the file came from.
+            origin_messages (dict[int, Message] | None): Prefetched backup copies, fetched on demand if None.
 
         Returns:
             Message: The sent message.
@@ -69,14 +126,17 @@ class SendMedia:
 
         caption = "" if options.settings.CUSTOM_CAPTION == 0 else str(options.settings.CUSTOM_CAPTION)
         if options.settings.BACKUP_FILES:
-            get_file = await client.get_messages(chat_id=file_origin, message_ids=file_data.message_id)
-            if not getattr(get_file, "empty", False):
+            get_file = (
+                origin_messages.get(file_data.message_id)
+                if origin_messages is not None
+                else await client.get_messages(chat_id=file_origin, message_ids=file_data.message_id)
+            )
+            if get_file is not None and not getattr(get_file, "empty", False):
                 return cast(
                     "Message",
                     await get_file.copy(chat_id=chat_id, caption=caption),  # pyright: ignore[reportCallIssue]
                 )
 
-        file_type_data = FileId.decode(file_id=file_data.file_id)
         methods: dict[str, Callable[..., Any]] = {
             "AUDIO": client.send_audio,
             "DOCUMENT": client.send_document,
@@ -84,27 +144,25 @@ class SendMedia:
             "VIDEO": client.send_video,
             "STICKER": client.send_sticker,
         }
-        if file_type_data:
-            file_type = file_type_data.file_type.name
-            if file_type in methods:
-                file_kwargs: dict[str, int | str] = {
-                    "chat_id": chat_id,
-                    file_type.lower(): file_data.file_id,
-                    "protect_content": protect_content,
-                }
-
-                if file_type != "STICKER":
-                    caption = (
-                        options.settings.CUSTOM_CAPTION if options.settings.CUSTOM_CAPTION else file_data.caption or ""
-                    )
-                    file_kwargs["caption"] = caption
-
-                return await methods[file_type](
-                    **file_kwargs,  # pyright: ignore[reportCallIssue]
-                    # https://github.com/microsoft/pyright/issues/5069#issuecomment-1533839392
+        file_type = file_data.media_type
+        if file_type in methods:
+            file_kwargs: dict[str, int | str] = {
+                "chat_id": chat_id,
+                file_type.lower(): file_data.file_id,
+                "protect_content": protect_content,
+            }
+
+            if file_data.captionable:
+                file_kwargs["caption"] = (
+                    options.settings.CUSTOM_CAPTION if options.settings.CUSTOM_CAPTION else file_data.caption or ""
                 )
 
-        raise UnsupportedFileError(file_type_data)
+            return await methods[file_type](
+                **file_kwargs,  # pyright: ignore[reportCallIssue]
+                # https://github.com/microsoft/pyright/issues/5069#issuecomment-1533839392
+            )
+
+        raise UnsupportedFileError(file_type)
 
     @classmethod
     async def send_media_group(
@@ -123,34 +181,59 @@ class SendMedia:
 
         media_group = []
         for i in file_data:
-            file_type_data = FileId.decode(file_id=i.file_id)
-            if not file_type_data:
-                continue
-
-            file_type = file_type_data.file_type.name
-            if file_type in input_media:
+            if i.media_type in input_media:
                 caption = options.settings.CUSTOM_CAPTION if options.settings.CUSTOM_CAPTION else i.caption or ""
-                media_group.append(input_media[file_type](media=i.file_id, caption=caption))
+                media_group.append(input_media[i.media_type](media=i.file_id, caption=caption))
 
         return await client.send_media_group(chat_id=chat_id, media=media_group, protect_content=protect_content)
 
+    @staticmethod
+    def pieces(file_data: list[FileResolverModel]) -> list[FileResolverModel | list[FileResolverModel]]:
+        """
+        Splits files into what is sent at once, an album or a single file, using their stored album.
+
+        An album left with a single file, e.g. the 11th file of a media group, is sent as a single file.
+
+        Parameters:
+            file_data (list[FileResolverModel]): The list of file data.
+
+        Returns:
+            list[FileResolverModel | list[FileResolverModel]]: The albums and single files in order.
+        """
+        # Files of the same album are consecutive, an album split by a chunk boundary is sent as two.
+        pieces: list[FileResolverModel | list[FileResolverModel]] = []
+        for i in file_data:
+            previous = pieces[-1] if pieces else None
+            if i.album is None:
+                pieces.append(i)
+            elif isinstance(previous, list) and previous[0].album == i.album:
+                previous.append(i)
+            else:
+                pieces.append([i])
+        return [piece[0] if isinstance(piece, list) and len(piece) == 1 else piece for piece in pieces]
+
     @classmethod
-    async def send_media_manager(
+    async def send_media_manager(  # noqa: PLR0913
         cls,
         client: Client,
         chat_id: int,
         file_data: list[FileResolverModel],
         file_origin: int,
         protect_content: bool,  # noqa: FBT001
+        origin_messages: dict[int, Message] | None = None,
     ) -> Message | list[Message]:
         """
         Sends a media group.
 
+        Every piece, i.e. the forwarded batch, an album or a single file, is retried on its own and
+        pieces that still fail are skipped so the files already sent are returned for auto delete.
+
         Parameters:
             client (Client): The Pyrogram client.
             chat_id (int): The chat ID.
             file_data (list[FileResolverModel]): The list of file data.
             file_origin: int: Where the file came from.
+            origin_messages (dict[int, Message] | None): Prefetched backup copies, fetched if None.
 
         Returns:
             Message: The sent message.
@@ -158,49 +241,65 @@ class SendMedia:
         messaage_ids = [i.message_id for i in file_data]
 
         if not options.settings.CUSTOM_CAPTION:
-            send_files = await client.forward_messages(
-                chat_id=chat_id,
-                from_chat_id=file_origin,
-                message_ids=messaage_ids,
-                protect_content=protect_content,
-                hide_sender_name=True,
-            )
+            try:
+                send_files = await cls.with_retries(
+                    functools.partial(
+                        client.forward_messages,
+                        chat_id=chat_id,
+                        from_chat_id=file_origin,
+                        message_ids=messaage_ids,
+                        protect_content=protect_content,
+                        hide_sender_name=True,
+                    ),
+                )
+            except RPCError as e:
+                logger.warning("Couldn't forward files to %d, sending them one by one: %s", chat_id, e)
+                send_files = []
 
             if send_files:
                 return send_files
 
-        re_group_file_datas = [
-            list(g) if k[0] else next(g)
-            for k, g in groupby(
-                file_data,
-                key=lambda x: (
-                    x.media_group_id is not None,
-                    x.media_group_id if x.media_group_id is not None else id(x),
-                ),
+        re_group_file_datas = cls.pieces(file_data=file_data)
+
+        if origin_messages is None:
+            origin_messages = await cls.prefetch_origin_messages(
+                client=client,
+                file_origin=file_origin,
+                file_data=file_data,
             )
-        ]
 
         send_files_message = []
         for i in re_group_file_datas:
-            if isinstance(i, list):
-                send_files_message.extend(
-                    await cls.send_media_group(
-                        client=client,
-                        chat_id=chat_id,
-                        file_data=i,
-                        protect_content=protect_content,
-                    ),
-                )
-            else:
-                with contextlib.suppress(UnsupportedFileError):
+            try:
+                if isinstance(i, list):
+                    send_files_message.extend(
+                        await cls.with_retries(
+                            functools.partial(
+                                cls.send_media_group,
+                                client=client,
+                                chat_id=chat_id,
+                                file_data=i,
+                                protect_content=protect_content,
+                            ),
+                        ),
+                    )
+                else:
                     send_files_message.append(
-                        await cls.send_media(
-                            client=client,
-                            chat_id=chat_id,
-                            file_data=i,
-                            file_origin=file_origin,
-                            protect_content=protect_content,
+                        await cls.with_retries(
+                            functools.partial(
+                                cls.send_media,
+                                client=client,
+                                chat_id=chat_id,
+                                file_data=i,
+                                file_origin=file_origin,
+                                protect_content=protect_content,
+                                origin_messages=origin_messages,
+                            ),
                         ),
                     )
+            except UnsupportedFileError:  # noqa: PERF203
+                continue
+            except RPCError as e:
+                logger.warning("Couldn't send a file to %d, skipping it: %s", chat_id, e)
 
         return send_files_message
@@ -1,19 +1,93 @@
+import asyncio
 import datetime
+import heapq
+import logging
+import math
+import time
+import uuid
+from array import array
+from collections.abc import Callable, Iterable
 
 import tzlocal
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from pymongo.errors import PyMongoError
 from pyrogram.client import Client
+from pyrogram.errors import RPCError
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from bot.config import config
+from bot.database import database
+from bot.utilities.outbound_governor import Priority, current_priority
+
+logger = logging.getLogger(__name__)
+
+
+class PendingDelete:
+    """
+    Messages of a single chat waiting to be deleted, merged from every job of the same bucket.
+
+    Attributes:
+        message_ids (array): The message IDs to delete.
+        links (list[str]): The distinct base64 file links to retrieve the deleted files.
+        due_at (int): The due time of the latest merged job as a unix timestamp.
+        attempts (int): Failed attempts to delete the messages.
+    """
+
+    __slots__ = ("attempts", "due_at", "links", "message_ids")
+
+    def __init__(self) -> None:
+        self.message_ids = array("i")
+        self.links: list[str] = []
+        self.due_at = 0
+        self.attempts = 0
+
+    def merge(self, message_ids: Iterable[int], links: Iterable[str], due_at: int) -> None:
+        """
+        Merges another job of the same chat.
+
+        Parameters:
+            message_ids (Iterable[int]): The message IDs to delete.
+            links (Iterable[str]): The base64 file links of the job.
+            due_at (int): The due time of the job as a unix timestamp.
+        """
+        self.message_ids.extend(message_ids)
+        self.links.extend(link for link in links if link not in self.links)
+        self.due_at = max(self.due_at, due_at)
+
 
 class ScheduleManager:
     """
     Manages scheduling of tasks for a Pyrogram client.
 
+    Auto-delete jobs are stored in the database so they survive restarts and are kept in
+    memory in a timer wheel, bucketed per due second and per chat. Jobs of the same chat that
+    come due together are merged into a single deletion and at most AUTO_DELETE_PER_SECOND
+    delete_messages calls are made per second, with the lowest priority in the outbound governor.
+    A chat needing more calls than a whole second allows is cleaned up alone and borrows from the
+    next seconds. Flushes run in the background so a slow one never delays the wheel. A failed
+    deletion is kept and retried DELETE_RETRY_SECONDS later, up to DELETE_ATTEMPTS times.
+
+    Every job is leased by the instance that scheduled it and the lease is renewed while the
+    instance runs, so instances sharing the database only load their own jobs. Jobs whose lease
+    expired, e.g. of a stopped or crashed instance, are claimed by the others.
+
     Attributes:
-        scheduler (AsyncIOScheduler): The scheduler instance.
+        scheduler (AsyncIOScheduler): The scheduler instance for periodic tasks.
+        client (Client | None): The Pyrogram client instance, set on start.
+        owner (str): A random ID of this bot instance, the owner of its leases.
+        wheel (dict[int, dict[int, PendingDelete]]): Pending deletions per due second per chat.
+        wheel_slots (list[int]): A heap of the due seconds in the wheel.
+        ready (dict[int, PendingDelete]): Due deletions per chat waiting for the delete budget.
+        delete_budget (int): delete_messages calls left this second, negative while a large chat is paid back.
+        flush_tasks (set[asyncio.Task]): Running flushes.
+        renewer (asyncio.Task | None): Renews the leases and claims expired jobs.
     """
 
+    RETRIEVE_BUTTONS_LIMIT = 10
+    DELETE_CHUNK_SIZE = 100
+    DELETE_ATTEMPTS = 3
+    DELETE_RETRY_SECONDS = 60
+
     def __init__(self) -> None:
         """
         Initializes the ScheduleManager instance.
@@ -22,36 +96,94 @@ class ScheduleManager:
             timezone=tzlocal.get_localzone(),
             misfire_grace_time=5,
         )
+        self.client: Client | None = None
+        self.owner = uuid.uuid4().hex
+        self.wheel: dict[int, dict[int, PendingDelete]] = {}
+        self.wheel_slots: list[int] = []
+        self.ready: dict[int, PendingDelete] = {}
+        self.delete_budget = 0
+        self.flush_tasks: set[asyncio.Task] = set()
+        self.wheel_task: asyncio.Task | None = None
+        self.renewer: asyncio.Task | None = None
 
-    async def start(self) -> None:
+    async def start(self, client: Client) -> None:
         """
-        Starts the scheduler.
+        Starts the scheduler and claims auto-delete jobs with an expired lease.
+
+        Parameters:
+            client (Client): The Pyrogram client instance.
         """
+        self.client = client
         self.scheduler.start()
 
+        await database.ensure_schedule_indexes()
+        await self.recover_deletes()
+        self.wheel_task = asyncio.create_task(self._run_wheel())
+        self.renewer = asyncio.create_task(self._renew())
+
+    async def stop(self) -> None:
+        """Stops the timer wheel and releases the pending auto-delete jobs so another instance runs them right away."""
+        tasks = [task for task in (self.wheel_task, self.renewer) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, *self.flush_tasks, return_exceptions=True)
+        self.wheel_task, self.renewer = None, None
+
+        try:
+            await database.release_scheduled_deletes(owner=self.owner)
+        except PyMongoError as e:
+            logger.warning("Couldn't release auto deletes, they run once their lease expires: %s", e)
+
+    def schedule_interval(self, func: Callable, seconds: int) -> None:
+        """
+        Schedules a task to run every n seconds.
+
+        Parameters:
+            func (Callable): The function or coroutine function to run.
+            seconds (int): The number of seconds between each run.
+        """
+        self.scheduler.add_job(
+            func=func,
+            trigger="interval",
+            seconds=seconds,
+            coalesce=True,
+            max_instances=1,
+        )
+
     async def delete_messages(
         self,
-        client: Client,
         chat_id: int,
         message_ids: list[int],
-        base64_file_link: str,
+        base64_file_links: list[str],
     ) -> None:
         """
         Deletes messages from a chat.
 
         Parameters:
-            client (Client): The Pyrogram client instance.
             chat_id (int): The chat ID.
             message_ids (list[int]): The list of message IDs to delete.
+            base64_file_links (list[str]): The base64 file links to retrieve the deleted files.
         """
-        chunk_size = 100
+        client = self.client
+        if client is None:
+            return
+
+        chunk_size = self.DELETE_CHUNK_SIZE
         chunked_ids = [message_ids[i : i + chunk_size] for i in range(0, len(message_ids), chunk_size)]
 
         for i in chunked_ids:
             await client.delete_messages(chat_id=chat_id, message_ids=i)
 
-        link = f"https://t.me/{client.me.username}?start={base64_file_link}"  # type: ignore[reportOptionalMemberAccess]
-        retrieve_files = [[InlineKeyboardButton(text="Deleted File(s)", url=link)]]
+        links = base64_file_links[-self.RETRIEVE_BUTTONS_LIMIT :]
+        retrieve_files = [
+            [
+                InlineKeyboardButton(
+                    text="Deleted File(s)" if len(links) == 1 else f"Deleted File(s) #{number}",
+                    url=f"https://t.me/{client.me.username}?start={link}",  # type: ignore[reportOptionalMemberAccess]
+                ),
+            ]
+            for number, link in enumerate(links, start=1)
+        ]
 
         await client.send_message(
             chat_id=chat_id,
@@ -59,9 +191,31 @@ class ScheduleManager:
             reply_markup=InlineKeyboardMarkup(retrieve_files),
         )
 
+    def _wheel_entry(self, chat_id: int, due_at: float) -> tuple[PendingDelete, int]:
+        granularity = max(config.AUTO_DELETE_COALESCE_SECONDS, 1)
+        slot = math.ceil(due_at / granularity) * granularity
+
+        bucket = self.wheel.get(slot)
+        if bucket is None:
+            bucket = self.wheel[slot] = {}
+            heapq.heappush(self.wheel_slots, slot)
+
+        pending = bucket.get(chat_id)
+        if pending is None:
+            pending = bucket[chat_id] = PendingDelete()
+        return pending, slot
+
+    def _add_to_wheel(self, chat_id: int, message_ids: Iterable[int], link: str, due_at: float) -> None:
+        pending, slot = self._wheel_entry(chat_id, due_at)
+        pending.merge(message_ids=message_ids, links=(link,), due_at=slot)
+
+    def _retry_later(self, chat_id: int, failed: PendingDelete) -> None:
+        pending, _ = self._wheel_entry(chat_id, time.time() + self.DELETE_RETRY_SECONDS)
+        pending.merge(message_ids=failed.message_ids, links=failed.links, due_at=failed.due_at)
+        pending.attempts = max(pending.attempts, failed.attempts)
+
     async def schedule_delete(
         self,
-        client: Client,
         chat_id: int,
         message_ids: list[int],
         delete_n_seconds: int,
@@ -71,17 +225,132 @@ class ScheduleManager:
         Schedules a message deletion task.
 
         Parameters:
-            client (Client): The Pyrogram client instance.
             chat_id (int): The chat ID.
             message_ids (list[int]): The list of message IDs to delete.
             delete_n_seconds (int): The number of seconds to wait before deleting.
+            base64_file_link (str): The base64 file link to retrieve the deleted files.
         """
-        now = datetime.datetime.now(tz=tzlocal.get_localzone())
-        self.scheduler.add_job(
-            func=self.delete_messages,
-            trigger="date",
-            run_date=now + datetime.timedelta(seconds=delete_n_seconds),
-            args=[client, chat_id, message_ids, base64_file_link],
+        due_at = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(seconds=delete_n_seconds)
+        await database.add_scheduled_delete(
+            chat_id=chat_id,
+            message_ids=message_ids,
+            link=base64_file_link,
+            due_at=due_at,
+            owner=self.owner,
+            lease_seconds=config.AUTO_DELETE_LEASE_SECONDS,
+        )
+        self._add_to_wheel(chat_id, message_ids, base64_file_link, due_at.timestamp())
+
+    async def recover_deletes(self) -> None:
+        """
+        Claims the auto-delete jobs whose lease expired or that were never leased into the timer wheel,
+        jobs that came due while their instance was offline are run right away within the delete budget.
+        """
+        recovered = 0
+        async for job in database.claim_scheduled_deletes(
+            owner=self.owner,
+            lease_seconds=config.AUTO_DELETE_LEASE_SECONDS,
+        ):
+            self._add_to_wheel(job["chat_id"], job["message_ids"], job["link"], job["due_at"].timestamp())
+            recovered += 1
+
+        if recovered:
+            logger.info("Recovered %d auto delete jobs", recovered)
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(config.AUTO_DELETE_LEASE_SECONDS / 3)
+            try:
+                await database.renew_scheduled_deletes(owner=self.owner, lease_seconds=config.AUTO_DELETE_LEASE_SECONDS)
+                await self.recover_deletes()
+            except PyMongoError as e:
+                logger.warning("Couldn't renew auto delete leases: %s", e)
+
+    async def _run_wheel(self) -> None:
+        # The task runs in its own copy of the context.
+        current_priority.set(Priority.CLEANUP)
+        while True:
+            now = time.time()
+            while self.wheel_slots and self.wheel_slots[0] <= now:
+                for chat_id, pending in self.wheel.pop(heapq.heappop(self.wheel_slots)).items():
+                    ready = self.ready.get(chat_id)
+                    if ready is None:
+                        self.ready[chat_id] = pending
+                    else:
+                        ready.merge(message_ids=pending.message_ids, links=pending.links, due_at=pending.due_at)
+
+            chats = self._take_ready()
+            if chats:
+                task = asyncio.create_task(self._flush_ready(chats))
+                self.flush_tasks.add(task)
+                task.add_done_callback(self.flush_tasks.discard)
+
+            await asyncio.sleep(1 - time.time() % 1)
+
+    def _take_ready(self) -> list[tuple[int, PendingDelete]]:
+        """
+        Takes the due deletions that fit in this second's delete budget.
+
+        Returns:
+            list[tuple[int, PendingDelete]]: The chats to clean up and their deletions.
+        """
+        per_second = config.AUTO_DELETE_PER_SECOND
+        self.delete_budget = min(self.delete_budget + per_second, per_second)
+
+        chats: list[tuple[int, PendingDelete]] = []
+        for chat_id, pending in list(self.ready.items()):
+            calls = math.ceil(len(pending.message_ids) / self.DELETE_CHUNK_SIZE)
+            if calls > self.delete_budget and (chats or self.delete_budget < per_second):
+                break
+
+            chats.append((chat_id, self.ready.pop(chat_id)))
+            self.delete_budget -= calls
+        return chats
+
+    async def _flush_ready(self, chats: list[tuple[int, PendingDelete]]) -> None:
+        try:
+            await self._flush(chats)
+        except Exception:
+            logger.exception("Auto delete flush failed")
+
+    async def _flush(self, chats: list[tuple[int, PendingDelete]]) -> None:
+        results = await asyncio.gather(
+            *(
+                self.delete_messages(
+                    chat_id=chat_id,
+                    message_ids=pending.message_ids.tolist(),
+                    base64_file_links=pending.links,
+                )
+                for chat_id, pending in chats
+            ),
+            return_exceptions=True,
+        )
+
+        # Failed chats keep their stored jobs and are retried on a later pass.
+        finished: list[tuple[int, PendingDelete]] = []
+        for (chat_id, pending), result in zip(chats, results, strict=True):
+            if not isinstance(result, Exception):
+                finished.append((chat_id, pending))
+                continue
+
+            if isinstance(result, RPCError):
+                logger.warning("Auto delete failed in chat %d: %s", chat_id, result)
+            else:
+                logger.error("Auto delete failed in chat %d", chat_id, exc_info=result)
+
+            pending.attempts += 1
+            if pending.attempts < self.DELETE_ATTEMPTS:
+                self._retry_later(chat_id, pending)
+            else:
+                logger.warning("Giving up auto delete in chat %d after %d attempts", chat_id, pending.attempts)
+                finished.append((chat_id, pending))
+
+        await database.remove_due_deletes(
+            owner=self.owner,
+            chats_due=[
+                (chat_id, datetime.datetime.fromtimestamp(pending.due_at, tz=datetime.timezone.utc))
+                for chat_id, pending in finished
+            ],
         )
 
 
@@ -0,0 +1,229 @@
+"""Deterministic rate limiter simulator.
+
+Drives RateLimiter.hybrid_limiter, or any decorator with the same signature, with synthetic
+update streams on a virtual clock, so a simulated hour runs in seconds and every run gives
+the same numbers.
+
+Run with: python -m tests.benchmarks.rate_limiter
+"""
+
+# ruff: noqa: S311, T201
+import asyncio
+import random
+import selectors
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from bot.utilities.helpers.rate_limiter import LimiterBackend, MemoryLimiterBackend, RateLimiter
+
+Update = tuple[float, int, int]
+"""An update as (arrival time, chat id, user id)."""
+
+
+class VirtualClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """A selector that jumps the virtual clock forward instead of blocking."""
+
+    def __init__(self, clock: VirtualClock) -> None:
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout: float | None = None) -> list:
+        if timeout:
+            self.clock.now += timeout
+        return super().select(0)
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """An event loop where asyncio.sleep only advances the virtual clock."""
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        super().__init__(selector=VirtualSelector(clock))
+
+    def time(self) -> float:
+        return self.clock()
+
+
+@dataclass
+class Report:
+    """
+    The result of a simulated scenario.
+
+    Parameters:
+        scenario (str): The scenario name.
+        updates (int): Amount of updates sent.
+        executed (int): Amount of updates the handler executed.
+        dropped (int): Amount of updates dropped by the limiter.
+        throughput (float): Executions per virtual second.
+        delay_p50 (float): Median queueing delay of executed updates in seconds.
+        delay_p95 (float): 95th percentile queueing delay in seconds.
+        delay_p99 (float): 99th percentile queueing delay in seconds.
+        fairness (float): Jain fairness index of executions per user, 1 is perfectly even.
+        peak_memory (int): Peak memory allocated during the run in bytes.
+    """
+
+    scenario: str
+    updates: int
+    executed: int
+    dropped: int
+    throughput: float
+    delay_p50: float
+    delay_p95: float
+    delay_p99: float
+    fairness: float
+    peak_memory: int
+
+
+def jain_index(values: list[float]) -> float:
+    """
+    Computes the Jain fairness index, (sum x)^2 / (n * sum x^2).
+
+    Parameters:
+        values (list[float]): The allocation of every participant.
+
+    Returns:
+        float: Between 1/n (one participant gets everything) and 1 (even allocation).
+    """
+    squares = sum(value * value for value in values)
+    return sum(values) ** 2 / (len(values) * squares) if squares else 1.0
+
+
+def burst(seed: int) -> Iterator[Update]:
+    """A single user sends 200 updates at once."""
+    del seed
+    return ((0.0, 1, 1) for _ in range(200))
+
+
+def many_chats(seed: int) -> Iterator[Update]:
+    """10000 users send a few updates each during 20 minutes."""
+    rng = random.Random(seed)
+    for user_id in range(1, 10001):
+        for _ in range(rng.randint(1, 3)):
+            yield rng.uniform(0, 1200), user_id, user_id
+
+
+def abusive_users(seed: int) -> Iterator[Update]:
+    """5 users send 10 updates per second while 500 users send one per minute."""
+    rng = random.Random(seed)
+    for user_id in range(1, 6):
+        for i in range(3000):
+            yield i / 10 + rng.random() / 10, user_id, user_id
+    for user_id in range(6, 506):
+        for i in range(5):
+            yield i * 60 + rng.uniform(0, 60), user_id, user_id
+
+
+def long_tail(seed: int) -> Iterator[Update]:
+    """2000 users whose amount of updates follows a pareto distribution."""
+    rng = random.Random(seed)
+    for user_id in range(1, 2001):
+        for _ in range(min(int(rng.paretovariate(1.2)), 500)):
+            yield rng.uniform(0, 600), user_id, user_id
+
+
+SCENARIOS: dict[str, Callable[[int], Iterator[Update]]] = {
+    "burst": burst,
+    "many_chats": many_chats,
+    "abusive_users": abusive_users,
+    "long_tail": long_tail,
+}
+
+
+def simulate(
+    scenario: str,
+    limiter: Callable[[int], Callable[[Callable], Callable]] | None = None,
+    backend: Callable[[VirtualClock], LimiterBackend] | None = None,
+    seed: int = 0,
+) -> Report:
+    """
+    Runs a scenario on a virtual clock.
+
+    Parameters:
+        scenario (str): A key of SCENARIOS.
+        limiter (Callable | None): The decorator factory to benchmark, defaults to RateLimiter.hybrid_limiter.
+        backend (Callable | None): Creates the RateLimiter backend from the clock, defaults to MemoryLimiterBackend.
+        seed (int): The seed of the synthetic traffic.
+
+    Returns:
+        Report: The measured results.
+    """
+    clock = VirtualClock()
+    updates = sorted(SCENARIOS[scenario](seed))
+    limiter = limiter or RateLimiter.hybrid_limiter
+    executions: Counter[int] = Counter()
+    delays: list[float] = []
+
+    async def handler(_: object, message: SimpleNamespace, arrival: float) -> bool:
+        executions[message.from_user.id] += 1
+        delays.append(clock() - arrival)
+        return True
+
+    limited = limiter(1)(handler)
+
+    async def deliver(arrival: float, chat_id: int, user_id: int) -> None:
+        await asyncio.sleep(arrival - clock())
+        message = SimpleNamespace(chat=SimpleNamespace(id=chat_id), from_user=SimpleNamespace(id=user_id))
+        await limited(None, message, arrival)
+
+    async def run() -> None:
+        await asyncio.gather(*(deliver(*update) for update in updates))
+
+    previous_backend = RateLimiter.backend
+    previous_counters = RateLimiter.counters.copy()
+    RateLimiter.use_backend(backend(clock) if backend else MemoryLimiterBackend(capacity=100000, clock=clock))
+    loop = VirtualEventLoop(clock)
+    tracemalloc.start()
+    try:
+        loop.run_until_complete(run())
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        loop.close()
+        RateLimiter.use_backend(previous_backend)
+        RateLimiter.counters.update(previous_counters)
+
+    percentiles = statistics.quantiles(delays, n=100, method="inclusive") if len(delays) > 1 else [0.0] * 99
+    users = {user_id for _, _, user_id in updates}
+    return Report(
+        scenario=scenario,
+        updates=len(updates),
+        executed=len(delays),
+        dropped=len(updates) - len(delays),
+        throughput=len(delays) / max(clock(), 1),
+        delay_p50=percentiles[49],
+        delay_p95=percentiles[94],
+        delay_p99=percentiles[98],
+        fairness=jain_index([executions[user_id] for user_id in users]),
+        peak_memory=peak_memory,
+    )
+
+
+def main() -> None:
+    header = f"{'scenario':<14}{'updates':>9}{'executed':>10}{'dropped':>9}{'msg/s':>8}"
+    header += f"{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'jain':>7}{'peak KiB':>10}{'wall s':>8}"
+    print(header)
+    for scenario in SCENARIOS:
+        started_at = time.perf_counter()
+        report = simulate(scenario)
+        print(
+            f"{report.scenario:<14}{report.updates:>9}{report.executed:>10}{report.dropped:>9}"
+            f"{report.throughput:>8.1f}{report.delay_p50:>8.1f}{report.delay_p95:>8.1f}{report.delay_p99:>8.1f}"
+            f"{report.fairness:>7.3f}{report.peak_memory // 1024:>10}{time.perf_counter() - started_at:>8.1f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
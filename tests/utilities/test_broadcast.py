@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any
+
+from bot.database import MongoDB, UserSource
+
+
+class FakeCursor:
+    def __init__(self, user_ids: list[Any]) -> None:
+        self.user_ids = user_ids
+        self.query: dict[str, Any] = {}
+
+    def sort(self, *_: object) -> "FakeCursor":
+        return self
+
+    def batch_size(self, _: int) -> "FakeCursor":
+        return self
+
+    def __aiter__(self) -> "FakeCursor":
+        return self
+
+    async def __anext__(self) -> dict[str, Any]:
+        start_after = self.query["_id"].get("$gt")
+        remaining = sorted(i for i in self.user_ids if isinstance(i, int) and (start_after is None or i > start_after))
+        if not remaining:
+            raise StopAsyncIteration
+        self.query["_id"]["$gt"] = remaining[0]
+        return {"_id": remaining[0]}
+
+
+class FakeCollection:
+    def __init__(self, user_ids: list[Any]) -> None:
+        self.cursor = FakeCursor(user_ids)
+
+    def find(self, query: dict[str, Any], *_: object) -> FakeCursor:
+        self.cursor.query = query
+        return self.cursor
+
+
+class FakeDatabase(dict):
+    client = None
+
+
+def collect(database: MongoDB, start_after: int | None = None) -> list[tuple[int, UserSource]]:
+    async def run() -> list[tuple[int, UserSource]]:
+        return [user async for user in database.iter_user_ids(start_after=start_after)]
+
+    return asyncio.run(run())
+
+
+def test_iter_user_ids_merges_both_collections() -> None:
+    database = MongoDB(
+        db=FakeDatabase(  # type: ignore[arg-type]
+            Users=FakeCollection([5, 1, 3, 7]),
+            users=FakeCollection([2, 3, "not an id", 8]),
+        ),
+    )
+
+    assert collect(database) == [
+        (1, UserSource.MAIN),
+        (2, UserSource.CODEX),
+        (3, UserSource.MAIN | UserSource.CODEX),
+        (5, UserSource.MAIN),
+        (7, UserSource.MAIN),
+        (8, UserSource.CODEX),
+    ]
+    assert collect(database, start_after=5) == [(7, UserSource.MAIN), (8, UserSource.CODEX)]
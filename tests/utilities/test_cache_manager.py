@@ -0,0 +1,105 @@
+import asyncio
+import gc
+import time
+
+from bot.utilities.cache_manager import BatchLoader, BitmaskCache, CacheManager, TTLCache
+
+
+def test_ttl_cache_expiry() -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("link", "document")
+    cache.set("expired", "document", ttl=-1)
+
+    assert cache.get("link") == "document"
+    assert "expired" not in cache
+    assert cache.get("expired", "default") == "default"
+
+
+def test_ttl_cache_eviction() -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+
+    assert "first" in cache
+    assert "second" not in cache
+    assert len(cache) == cache.maxsize
+
+
+def test_ttl_cache_pop() -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("link", time.monotonic())
+    cache.pop("link")
+    cache.pop("missing")
+
+    assert "link" not in cache
+
+
+def test_bitmask_cache() -> None:
+    mask = 0b101
+    cache = BitmaskCache(maxsize=2, ttl=60)
+    cache.set(1, mask)
+    cache.set(2, 0b1, ttl=-1)
+
+    assert cache.get(1) == mask
+    assert cache.get(2) is None
+    assert cache.get(3) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_batch_loader_coalesces_lookups() -> None:
+    batches: list[list[int]] = []
+
+    async def load_many(keys: list[int]) -> dict[int, str]:
+        batches.append(keys)
+        return {key: f"user {key}" for key in keys if key != 0}
+
+    async def run() -> list[str | None]:
+        loader = BatchLoader(load_many=load_many, window=0.01)
+        return await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(0))
+
+    assert asyncio.run(run()) == ["user 1", "user 2", "user 1", None]
+    assert batches == [[1, 2, 0]]
+
+
+def test_batch_loader_failure_with_cancelled_waiter() -> None:
+    errors: list[dict] = []
+
+    async def load_many(keys: list[int]) -> dict[int, str]:
+        raise RuntimeError(keys)
+
+    async def run() -> None:
+        asyncio.get_running_loop().set_exception_handler(lambda _, context: errors.append(context))
+        loader = BatchLoader(load_many=load_many, window=0.01)
+        cancelled = asyncio.create_task(loader.load(1))
+        waiting = asyncio.create_task(loader.load(2))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        results = await asyncio.gather(cancelled, waiting, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert isinstance(results[1], RuntimeError)
+
+        del cancelled, waiting, results
+        gc.collect()
+
+    asyncio.run(run())
+
+    assert errors == []
+
+
+def test_cache_manager_invalidate_and_stats() -> None:
+    manager = CacheManager()
+    cache = manager.namespace("test", TTLCache, maxsize=1, ttl=60)
+    invalidated: list[object] = []
+    manager.on_invalidate("test", invalidated.append)
+
+    cache.set("first", 1)
+    cache.set("second", 2)
+    manager.invalidate("test", "second")
+    manager.invalidate("test")
+
+    assert invalidated == ["second", None]
+    assert manager.stats()["test"]["evictions"] == 1
+    assert "second" not in cache
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any
+
+import pytest
+from bot.database import LinkDocument, database
+from bot.options import options
+from bot.utilities.delivery_queue import DeliveryQueue
+from bot.utilities.file_sender import FileSender, OnChunk
+from bot.utilities.helpers import PyroHelper
+from bot.utilities.schedule_manager import schedule_manager
+from pymongo.errors import AutoReconnect
+
+
+class SentMessage:
+    def __init__(self, message_id: int) -> None:
+        self.id = message_id
+
+
+def setup_delivery(monkeypatch: pytest.MonkeyPatch, files: int, fail_after: int | None = None) -> dict[str, list]:
+    calls: dict[str, list] = {"checkpoints": [], "sent_from": [], "scheduled": []}
+    document = LinkDocument.model_validate(
+        {
+            "file_origin": -100,
+            "files": [{"caption": None, "file_id": "file", "message_id": i} for i in range(files)],
+        },
+    )
+
+    async def get_link_document(base64_file_link: str) -> LinkDocument:  # noqa: ARG001
+        return document
+
+    async def checkpoint_delivery_job(job_id: int, offset: int, message_ids: list[int]) -> None:  # noqa: ARG001
+        calls["checkpoints"].append((offset, len(message_ids)))
+
+    async def teleshare(file_data: list, on_chunk: OnChunk, **_: Any) -> None:  # noqa: ANN401
+        calls["sent_from"].append(file_data[0].message_id)
+        for index in range(0, len(file_data), FileSender.forward_limit_size):
+            if fail_after is not None and len(calls["checkpoints"]) == fail_after:
+                raise RuntimeError
+            chunk = file_data[index : index + FileSender.forward_limit_size]
+            await on_chunk(len(chunk), [SentMessage(1000 + file.message_id) for file in chunk])
+
+    async def send_option_message(**_: Any) -> None:  # noqa: ANN401
+        return None
+
+    async def schedule_delete(message_ids: list[int], **_: Any) -> None:  # noqa: ANN401
+        calls["scheduled"].append(message_ids)
+
+    monkeypatch.setattr(database, "get_link_document", get_link_document)
+    monkeypatch.setattr(database, "checkpoint_delivery_job", checkpoint_delivery_job)
+    monkeypatch.setattr(FileSender, "teleshare", teleshare)
+    monkeypatch.setattr(schedule_manager, "schedule_delete", schedule_delete)
+    monkeypatch.setattr(PyroHelper, "send_option_message", send_option_message)
+    monkeypatch.setattr(options.settings, "ADDITIONAL_MESSAGE", 0)
+    monkeypatch.setattr(options.settings, "AUTO_DELETE_SECONDS", 60)
+    monkeypatch.setattr(options.settings, "AUTO_DELETE_MESSAGE", "")
+    return calls
+
+
+def deliver(job: dict[str, Any]) -> None:
+    queue = DeliveryQueue()
+    queue.client = object()  # type: ignore[assignment]
+    asyncio.run(queue.deliver(job))
+
+
+def test_delivery_resumes_from_checkpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = setup_delivery(monkeypatch, files=250)
+
+    deliver({"_id": 1, "chat_id": 5, "link": "link", "offset": 100, "message_ids": list(range(100))})
+
+    assert calls["sent_from"] == [100]
+    assert calls["checkpoints"] == [(200, 100), (250, 50)]
+    assert calls["scheduled"] == [[*range(100), *range(1100, 1250)]]
+
+
+def test_failed_delivery_still_schedules_sent_files(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = setup_delivery(monkeypatch, files=250, fail_after=1)
+
+    deliver({"_id": 1, "chat_id": 5, "link": "link", "offset": 0, "message_ids": []})
+
+    assert calls["checkpoints"] == [(100, 100)]
+    assert calls["scheduled"] == [list(range(1000, 1100))]
+
+
+def test_worker_survives_failed_job_removal(monkeypatch: pytest.MonkeyPatch) -> None:
+    delivered: list[int] = []
+
+    async def fake_deliver(job: dict[str, Any]) -> None:
+        delivered.append(job["_id"])
+
+    async def remove_delivery_job(job_id: int) -> None:
+        if job_id == 1:
+            raise AutoReconnect
+
+    async def run() -> list[int]:
+        queue = DeliveryQueue()
+        monkeypatch.setattr(queue, "deliver", fake_deliver)
+        queue.queue.put_nowait({"_id": 1, "chat_id": 5})
+        queue.queue.put_nowait({"_id": 2, "chat_id": 5})
+        worker = asyncio.create_task(queue._work())  # noqa: SLF001
+        for _ in range(10):
+            await asyncio.sleep(0)
+        worker.cancel()
+        return queue.finished
+
+    monkeypatch.setattr(database, "remove_delivery_job", remove_delivery_job)
+
+    assert asyncio.run(run()) == [1]
+    assert delivered == [1, 2]
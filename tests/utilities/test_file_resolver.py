@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any
+
+import pytest
+from bot.config import config
+from bot.options import options
+from bot.utilities.pyrotools import FileResolverModel
+from bot.utilities.pyrotools.file_resolver import SendMedia
+from pyrogram.errors import InternalServerError, MessageIdInvalid
+
+
+async def _no_sleep(_: float) -> None:
+    pass
+
+
+def test_with_retries_retries_server_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "DELIVERY_ATTEMPTS", 3)
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+    attempts: list[int] = []
+
+    async def send() -> str:
+        attempts.append(len(attempts) + 1)
+        if len(attempts) < 3:  # noqa: PLR2004
+            raise InternalServerError
+        return "sent"
+
+    assert asyncio.run(SendMedia.with_retries(send)) == "sent"
+    assert attempts == [1, 2, 3]
+
+
+def test_with_retries_raises_on_last_attempt(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "DELIVERY_ATTEMPTS", 2)
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+    attempts: list[int] = []
+
+    async def send() -> str:
+        attempts.append(len(attempts) + 1)
+        raise InternalServerError
+
+    with pytest.raises(InternalServerError):
+        asyncio.run(SendMedia.with_retries(send))
+    assert attempts == [1, 2]
+
+
+class FallbackClient:
+    def __init__(self) -> None:
+        self.lookups = 0
+        self.sent: list[str] = []
+
+    async def forward_messages(self, **_: Any) -> None:  # noqa: ANN401
+        raise MessageIdInvalid
+
+    async def get_messages(self, **_: Any) -> None:  # noqa: ANN401
+        self.lookups += 1
+        raise MessageIdInvalid
+
+    async def send_document(self, document: str, **_: Any) -> str:  # noqa: ANN401
+        self.sent.append(document)
+        return document
+
+    send_audio = send_photo = send_video = send_sticker = send_document
+
+
+def test_failed_prefetch_sends_files_without_a_lookup_each(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(options.settings, "BACKUP_FILES", True)
+    monkeypatch.setattr(options.settings, "CUSTOM_CAPTION", 0)
+    client = FallbackClient()
+    files = [
+        FileResolverModel(caption=None, file_id=f"file {i}", message_id=i, media_type="DOCUMENT") for i in range(3)
+    ]
+
+    sent = asyncio.run(
+        SendMedia.send_media_manager(
+            client=client,  # type: ignore[arg-type]
+            chat_id=1,
+            file_data=files,
+            file_origin=-100,
+            protect_content=False,
+        ),
+    )
+
+    assert sent == ["file 0", "file 1", "file 2"]
+    assert client.lookups == 1
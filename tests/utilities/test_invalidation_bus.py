@@ -0,0 +1,86 @@
+import asyncio
+
+from bot.utilities.cache_manager import CacheManager, TTLCache
+from bot.utilities.invalidation_bus import InvalidationBus, MemoryTransport, MongoTransport
+
+
+def test_invalidation_bus_reaches_other_instances() -> None:
+    transport = MemoryTransport()
+    managers = [CacheManager(), CacheManager()]
+    caches = [manager.namespace("links", TTLCache, maxsize=10, ttl=60) for manager in managers]
+    reloaded: list[object] = []
+    managers[1].on_invalidate("options", reloaded.append)
+
+    async def run() -> None:
+        buses = [InvalidationBus(manager, transport=transport) for manager in managers]
+        for bus in buses:
+            await bus.start()
+        await asyncio.sleep(0)
+
+        for cache in caches:
+            cache.set("link", "document")
+        await buses[0].publish("links", "link")
+        await buses[0].publish("options", "START_MESSAGE")
+        await asyncio.sleep(0)
+
+        for bus in buses:
+            await bus.stop()
+
+    asyncio.run(run())
+
+    assert caches[0].get("link") == "document"
+    assert "link" not in caches[1]
+    assert reloaded == ["START_MESSAGE"]
+    assert not transport.queues
+
+
+class FakeTailableCursor:
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = list(documents)
+        self.alive = True
+
+    def __aiter__(self) -> "FakeTailableCursor":
+        return self
+
+    async def __anext__(self) -> dict:
+        if not self.documents:
+            # The cursor dies at the end of the collection, like a tailable cursor that fell behind.
+            self.alive = False
+            raise StopAsyncIteration
+        return self.documents.pop(0)
+
+
+class FakeCappedCollection:
+    def __init__(self) -> None:
+        self.documents: list[dict] = []
+
+    async def find_one(self, query: dict, *_: object, **__: object) -> dict | None:
+        if not query:
+            return self.documents[-1] if self.documents else None
+        return next((document for document in self.documents if document["_id"] == query["_id"]), None)
+
+    def find(self, *_: object, **__: object) -> FakeTailableCursor:
+        return FakeTailableCursor(self.documents)
+
+
+def test_mongo_transport_resumes_by_insertion_order() -> None:
+    collection = FakeCappedCollection()
+    transport = MongoTransport(db={"Invalidations": collection}, retry_seconds=0)  # type: ignore[arg-type]
+
+    def insert(object_id: int, key: str) -> None:
+        collection.documents.append({"_id": object_id, "origin": "other", "name": "links", "key": key})
+
+    async def run() -> list[object]:
+        insert(50, "before start")
+        events = transport.listen()
+        first = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+
+        # Another instance's ids are smaller than the last seen one.
+        insert(20, "first")
+        insert(30, "second")
+        received = [await first, await anext(events)]
+        await events.aclose()
+        return [event.key for event in received]
+
+    assert asyncio.run(run()) == ["first", "second"]
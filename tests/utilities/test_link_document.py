@@ -0,0 +1,66 @@
+from bot.database.models import FileResolverModel, LinkDocument
+from bot.utilities.pyrotools.file_resolver import SendMedia
+from pyrogram.file_id import FileId, FileType, ThumbnailSource
+
+
+def file_id(file_type: FileType) -> str:
+    if file_type == FileType.PHOTO:
+        return FileId(
+            file_type=file_type,
+            dc_id=1,
+            media_id=1,
+            access_hash=1,
+            volume_id=1,
+            local_id=1,
+            thumbnail_source=ThumbnailSource.LEGACY,
+            secret=1,
+        ).encode()
+    return FileId(file_type=file_type, dc_id=1, media_id=1, access_hash=1).encode()
+
+
+def link_document(*files: tuple[str, int | None]) -> LinkDocument:
+    return LinkDocument.model_validate(
+        {
+            "file_origin": -100,
+            "files": [
+                {"caption": None, "file_id": fid, "message_id": message_id, "media_group_id": media_group_id}
+                for message_id, (fid, media_group_id) in enumerate(files)
+            ],
+        },
+    )
+
+
+def test_prepare_files_splits_albums_at_the_limit() -> None:
+    document = link_document(*[(file_id(FileType.PHOTO), 7)] * 11)
+
+    assert document.prepared
+    assert [file.album for file in document.files] == [0] * 10 + [1]
+    assert all(file.media_type == "PHOTO" and file.captionable for file in document.files)
+
+
+def test_prepare_files_breaks_albums_and_flags_files() -> None:
+    document = link_document(
+        (file_id(FileType.DOCUMENT), 8),
+        (file_id(FileType.STICKER), 8),
+        ("not a file id", 8),
+        (file_id(FileType.DOCUMENT), 8),
+        (file_id(FileType.VIDEO), None),
+    )
+
+    assert [file.media_type for file in document.files] == ["DOCUMENT", "STICKER", None, "DOCUMENT", "VIDEO"]
+    assert [file.album for file in document.files] == [0, None, None, 1, None]
+    assert [file.captionable for file in document.files] == [True, False, True, True, True]
+
+
+def test_prepare_files_keeps_prepared_documents() -> None:
+    stored = FileResolverModel(caption=None, file_id="not a file id", message_id=1, media_type="PHOTO", album=3)
+    document = LinkDocument(file_origin=-100, files=[stored], prepared=True)
+
+    assert (document.files[0].media_type, document.files[0].album) == ("PHOTO", 3)
+
+
+def test_pieces_sends_single_file_albums_on_their_own() -> None:
+    document = link_document(*[(file_id(FileType.PHOTO), 7)] * 11, (file_id(FileType.VIDEO), None))
+    pieces = SendMedia.pieces(document.files)
+
+    assert [len(piece) if isinstance(piece, list) else piece.message_id for piece in pieces] == [10, 10, 11]
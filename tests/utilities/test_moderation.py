@@ -0,0 +1,56 @@
+import asyncio
+import datetime
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from bot.database import MongoDB
+from bot.database.moderation import Moderation
+
+
+def at(second: int) -> datetime.datetime:
+    return datetime.datetime(2024, 1, 1, second=second, tzinfo=datetime.timezone.utc)
+
+
+class FakeUsers:
+    def __init__(self, users: list[dict[str, Any]]) -> None:
+        self.users = users
+        self.queries: list[dict[str, Any]] = []
+
+    async def _iter(self, since: datetime.datetime | None) -> AsyncIterator[dict[str, Any]]:
+        for user in self.users:
+            if since is None or user["ban_updated_at"] >= since:
+                yield user
+
+    def find(self, query: dict[str, Any], *_: object) -> AsyncIterator[dict[str, Any]]:
+        self.queries.append(query)
+        return self._iter(query["ban_updated_at"].get("$gte"))
+
+
+class FakeDatabase(dict):
+    client = None
+
+
+def test_refresh_applies_only_the_ban_changes_since_the_last_one(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Moderation, "_banned_users", {1, 2})
+    monkeypatch.setattr(Moderation, "_bans_updated_at", at(10))
+    users = FakeUsers(
+        [
+            {"_id": 1, "banned": True, "ban_updated_at": at(5)},
+            {"_id": 2, "banned": False, "ban_updated_at": at(20)},
+            {"_id": 3, "banned": True, "ban_updated_at": at(30)},
+        ],
+    )
+    database = MongoDB(db=FakeDatabase(Users=users))  # type: ignore[arg-type]
+
+    asyncio.run(database.refresh_banned_users())
+
+    assert users.queries == [{"ban_updated_at": {"$gte": at(10)}}]
+    assert Moderation._banned_users == {1, 3}  # noqa: SLF001
+    assert Moderation._bans_updated_at == at(30)  # noqa: SLF001
+
+    # The next refresh starts from the latest change seen.
+    users.users[1]["ban_updated_at"] = at(0)
+    asyncio.run(database.refresh_banned_users())
+    assert users.queries[-1] == {"ban_updated_at": {"$gte": at(30)}}
+    assert Moderation._banned_users == {1, 3}  # noqa: SLF001
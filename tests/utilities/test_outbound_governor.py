@@ -0,0 +1,75 @@
+import asyncio
+
+from bot.utilities.outbound_governor import OutboundGovernor, Priority, priority
+
+
+def test_governor_releases_queued_calls_by_priority() -> None:
+    order: list[Priority] = []
+    governor = OutboundGovernor(rate=100, chat_limit=60, method_limits={}, capacity=10)
+
+    async def call(level: Priority) -> None:
+        with priority(level):
+            await governor.acquire(method="send_message", chat_id=level.value)
+        order.append(level)
+
+    async def run() -> None:
+        governor.tokens = 0
+        await asyncio.gather(call(Priority.CLEANUP), call(Priority.BROADCAST), call(Priority.INTERACTIVE))
+
+    asyncio.run(run())
+
+    assert order == [Priority.INTERACTIVE, Priority.BROADCAST, Priority.CLEANUP]
+    assert governor.stats()["cleanup"]["sent"] == 1
+    assert governor.stats()["cleanup"]["queued"] == 0
+
+
+def test_governor_shares_flood_wait_pauses() -> None:
+    governor = OutboundGovernor(
+        rate=100,
+        chat_limit=60,
+        method_limits={},
+        capacity=10,
+        max_flood_wait=30,
+        clock=lambda: 0.0,
+    )
+
+    assert governor.flood_wait(method="send_message", chat_id=1, seconds=10, waited=0)
+    assert governor.flood_wait(method="copy_message", chat_id=1, seconds=5, waited=0)
+    assert not governor.flood_wait(method="send_message", chat_id=1, seconds=25, waited=10)
+
+    assert governor.pauses[1] == 10  # noqa: PLR2004
+    assert governor.flood_metrics == {"flood_waits": 3, "retried": 2, "raised": 1, "paused": 10}
+
+
+def test_governor_raises_broadcast_flood_waits_and_pauses_the_method() -> None:
+    governor = OutboundGovernor(rate=100, chat_limit=60, method_limits={}, capacity=10, clock=lambda: 0.0)
+
+    with priority(Priority.BROADCAST):
+        assert not governor.flood_wait(method="copy_message", chat_id=1, seconds=10, waited=0)
+
+    assert governor.pauses["copy_message"] == 10  # noqa: PLR2004
+    assert 1 not in governor.pauses
+    assert governor.flood_metrics["raised"] == 1
+
+
+def test_governor_paces_reads_apart_from_messages() -> None:
+    governor = OutboundGovernor(
+        rate=100,
+        chat_limit=1,
+        method_limits={},
+        capacity=10,
+        clock=lambda: 0.0,
+    )
+
+    async def run() -> None:
+        governor.tokens = 0
+        await governor.acquire(method="get_chat_member", chat_id=1)
+        await governor.acquire(method="get_chat_member", chat_id=1)
+
+    # Reads neither wait for the global budget nor use up the chat budget.
+    asyncio.run(asyncio.wait_for(run(), timeout=1))
+    assert governor.chat_limiter.reserve(1) == 0
+
+    assert governor.flood_wait(method="get_messages", chat_id=1, seconds=10, waited=0)
+    assert governor.pauses["get_messages"] == 10  # noqa: PLR2004
+    assert 1 not in governor.pauses
@@ -0,0 +1,103 @@
+import asyncio
+
+from bot.utilities.helpers.rate_limiter import GCRALimiter, LimitScope, MongoLimiterBackend, RateLimiter
+
+from tests.benchmarks.rate_limiter import simulate
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_gcra_burst_then_paced() -> None:
+    clock = FakeClock()
+    limiter = GCRALimiter(limit=5, period=10, capacity=10, clock=clock)
+
+    assert [limiter.reserve("chat") for _ in range(5)] == [0.0] * 5
+    assert limiter.reserve("chat") == limiter.interval
+    assert limiter.reserve("other") == 0.0
+
+    clock.now = 20
+    assert limiter.reserve("chat") == 0.0
+
+
+def test_gcra_cost_and_release() -> None:
+    clock = FakeClock()
+    limiter = GCRALimiter(limit=5, period=10, capacity=10, clock=clock)
+
+    assert limiter.reserve("chat", cost=5) == 0.0
+    delay = limiter.reserve("chat", cost=2)
+    assert delay == limiter.interval * 2
+
+    limiter.release("chat", cost=2)
+    assert limiter.reserve("chat") == limiter.interval
+
+
+class FakeRateLimits:
+    def __init__(self) -> None:
+        self.counts: dict[str, int] = {}
+        self.round_trips = 0
+
+    async def find_one_and_update(self, query: dict, update: dict, **_: object) -> dict:
+        self.round_trips += 1
+        self.counts[query["_id"]] = self.counts.get(query["_id"], 0) + update["$inc"]["count"]
+        return {"_id": query["_id"], "count": self.counts[query["_id"]]}
+
+
+def test_mongo_backend_leases_shared_quota() -> None:
+    clock = FakeClock()
+    collection = FakeRateLimits()
+    db = {"RateLimits": collection}
+    scope = LimitScope(name="chat", limit=6, period=60)
+    first = MongoLimiterBackend(db=db, lease_size=4, clock=clock)  # type: ignore[arg-type]
+    second = MongoLimiterBackend(db=db, lease_size=4, clock=clock)  # type: ignore[arg-type]
+
+    async def run() -> list[float]:
+        return [await backend.reserve(scope, 1) for backend in (first, first, first, first, second, second, second)]
+
+    assert asyncio.run(run()) == [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 60.0]
+    assert collection.round_trips == 3  # noqa: PLR2004
+
+
+def test_mongo_backend_charges_over_quota_calls_to_next_windows() -> None:
+    clock = FakeClock()
+    collection = FakeRateLimits()
+    scope = LimitScope(name="chat", limit=5, period=60)
+    backend = MongoLimiterBackend(
+        db={"RateLimits": collection},  # type: ignore[arg-type]
+        lease_size=5,
+        max_wait=120,
+        clock=clock,
+    )
+
+    async def run() -> list[float]:
+        delays = []
+        for _ in range(50):
+            delay = await backend.reserve(scope, 1)
+            if delay > backend.max_wait:
+                await backend.release(scope, 1)
+            delays.append(delay)
+        return delays
+
+    delays = asyncio.run(run())
+
+    assert delays[:15] == [0.0] * 5 + [60.0] * 5 + [120.0] * 5
+    assert all(delay > backend.max_wait for delay in delays[15:])
+    assert collection.round_trips == 6  # noqa: PLR2004
+
+    clock.now = 60
+    assert asyncio.run(backend.reserve(scope, 1)) == 120.0  # noqa: PLR2004
+
+
+def test_simulated_burst() -> None:
+    backend = RateLimiter.backend
+    report = simulate("burst")
+
+    assert report.executed + report.dropped == report.updates
+    assert 0 < report.executed < report.updates
+    assert report.fairness == 1.0
+    assert RateLimiter.backend is backend
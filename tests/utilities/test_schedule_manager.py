@@ -0,0 +1,84 @@
+import asyncio
+import datetime
+from typing import Any
+
+import pytest
+from bot.config import config
+from bot.database import database
+from bot.utilities.schedule_manager import PendingDelete, ScheduleManager
+from pyrogram.errors import UserIsBlocked
+
+
+def pending_delete(messages: int) -> PendingDelete:
+    pending = PendingDelete()
+    pending.merge(message_ids=range(messages), links=("link",), due_at=100)
+    return pending
+
+
+def test_wheel_merges_jobs_of_a_chat_within_the_coalesce_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "AUTO_DELETE_COALESCE_SECONDS", 10)
+    manager = ScheduleManager()
+
+    manager._add_to_wheel(chat_id=1, message_ids=[1, 2], link="a", due_at=101)  # noqa: SLF001
+    manager._add_to_wheel(chat_id=1, message_ids=[3], link="a", due_at=105.5)  # noqa: SLF001
+    manager._add_to_wheel(chat_id=2, message_ids=[4], link="a", due_at=110)  # noqa: SLF001
+    manager._add_to_wheel(chat_id=1, message_ids=[5], link="b", due_at=111)  # noqa: SLF001
+
+    assert sorted(manager.wheel_slots) == [110, 120]
+    merged = manager.wheel[110][1]
+    assert merged.message_ids.tolist() == [1, 2, 3]
+    assert merged.links == ["a"]
+    assert merged.due_at == 110  # noqa: PLR2004
+    assert manager.wheel[110][2].message_ids.tolist() == [4]
+    assert manager.wheel[120][1].links == ["b"]
+
+
+def test_take_ready_fits_small_chats_in_the_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "AUTO_DELETE_PER_SECOND", 2)
+    manager = ScheduleManager()
+    manager.ready = {chat_id: pending_delete(50) for chat_id in (1, 2, 3)}
+
+    assert [chat_id for chat_id, _ in manager._take_ready()] == [1, 2]  # noqa: SLF001
+    assert [chat_id for chat_id, _ in manager._take_ready()] == [3]  # noqa: SLF001
+    assert manager.delete_budget == 1
+
+
+def test_take_ready_carries_a_large_chat_over(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "AUTO_DELETE_PER_SECOND", 2)
+    manager = ScheduleManager()
+    manager.ready = {1: pending_delete(450), 2: pending_delete(50)}
+
+    # Five calls are taken alone with a full budget and paid back over the next seconds.
+    assert [chat_id for chat_id, _ in manager._take_ready()] == [1]  # noqa: SLF001
+    assert manager.delete_budget == -3  # noqa: PLR2004
+    assert manager._take_ready() == []  # noqa: SLF001
+    assert [chat_id for chat_id, _ in manager._take_ready()] == [2]  # noqa: SLF001
+    assert manager.delete_budget == 0
+
+
+def test_flush_keeps_failed_chats_for_a_later_pass(monkeypatch: pytest.MonkeyPatch) -> None:
+    removed: list[list[tuple[int, datetime.datetime]]] = []
+    manager = ScheduleManager()
+
+    async def delete_messages(chat_id: int, **_: Any) -> None:  # noqa: ANN401
+        if chat_id == 2:  # noqa: PLR2004
+            raise UserIsBlocked
+
+    async def remove_due_deletes(owner: str, chats_due: list[tuple[int, datetime.datetime]]) -> None:  # noqa: ARG001
+        removed.append(chats_due)
+
+    monkeypatch.setattr(manager, "delete_messages", delete_messages)
+    monkeypatch.setattr(database, "remove_due_deletes", remove_due_deletes)
+
+    due_at = datetime.datetime.fromtimestamp(100, tz=datetime.timezone.utc)
+    asyncio.run(manager._flush([(1, pending_delete(10)), (2, pending_delete(10))]))  # noqa: SLF001
+    assert removed == [[(1, due_at)]]
+
+    (retry,) = manager.wheel.values()
+    assert retry[2].attempts == 1
+    assert retry[2].due_at == 100  # noqa: PLR2004
+
+    # The last attempt gives up and removes the stored jobs.
+    retry[2].attempts = manager.DELETE_ATTEMPTS - 1
+    asyncio.run(manager._flush([(2, retry[2])]))  # noqa: SLF001
+    assert removed[-1] == [(2, due_at)]
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from bot.config import config
+from bot.utilities.cache_manager import BitmaskCache
+from bot.utilities.pyrofilters.subscription import SubscriptionFilter
+
+USER_ID = 1
+SUBSCRIBED = 0b111
+
+
+@pytest.fixture
+def subs_cache(monkeypatch: pytest.MonkeyPatch) -> BitmaskCache:
+    cache = BitmaskCache(maxsize=10, ttl=3600)
+    channels = {f"channel {i}": {"channel_id": -100 - i, "invite_link": ""} for i in range(3)}
+    monkeypatch.setattr(config, "channels_n_invite", channels)
+    monkeypatch.setattr(config, "PRIVATE_REQUEST", False)
+    monkeypatch.setattr(SubscriptionFilter, "_subs_cache", cache)
+    monkeypatch.setattr(SubscriptionFilter, "CACHE_NOT_SUBSCRIBED_SECONDS", 5)
+    return cache
+
+
+def test_joining_every_channel_marks_the_user_subscribed(subs_cache: BitmaskCache) -> None:
+    subs_cache.set(USER_ID, 0b011)
+    SubscriptionFilter.subscription_joined(user_id=USER_ID, channel_id=-102)
+
+    assert subs_cache.peek(USER_ID) == SUBSCRIBED
+
+
+def test_joining_with_unverified_channels_checks_again(subs_cache: BitmaskCache) -> None:
+    subs_cache.set(USER_ID, 0b001)
+    SubscriptionFilter.subscription_joined(user_id=USER_ID, channel_id=-102)
+
+    assert subs_cache.peek(USER_ID) is None
+
+
+def test_other_channels_are_ignored(subs_cache: BitmaskCache) -> None:
+    subs_cache.set(USER_ID, SUBSCRIBED)
+    SubscriptionFilter.subscription_left(user_id=USER_ID, channel_id=-200)
+
+    assert subs_cache.peek(USER_ID) == SUBSCRIBED
+
+
+def test_leaving_clears_the_channel_with_the_negative_ttl(
+    subs_cache: BitmaskCache,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = time.monotonic_ns()
+    monkeypatch.setattr(time, "monotonic_ns", lambda: now)
+    subs_cache.set(USER_ID, SUBSCRIBED)
+    SubscriptionFilter.subscription_left(user_id=USER_ID, channel_id=-101)
+
+    assert subs_cache.peek(USER_ID) == SUBSCRIBED & ~(1 << 1)
+
+    monkeypatch.setattr(time, "monotonic_ns", lambda: now + 6_000_000_000)
+    assert subs_cache.peek(USER_ID) is None
+
+
+def test_leaving_with_private_requests_checks_again(
+    subs_cache: BitmaskCache,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(config, "PRIVATE_REQUEST", True)
+    subs_cache.set(USER_ID, SUBSCRIBED)
+    SubscriptionFilter.subscription_left(user_id=USER_ID, channel_id=-101)
+
+    assert subs_cache.peek(USER_ID) is None
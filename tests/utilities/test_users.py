@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any
+
+import pytest
+from bot.config import config
+from bot.database import MongoDB
+from bot.database.users import KnownUsers, Users
+from pymongo.errors import AutoReconnect
+
+
+class FlakyUsers:
+    def __init__(self) -> None:
+        self.failures = 1
+        self.written: list[list[int]] = []
+
+    async def bulk_write(self, requests: list[Any], **_: Any) -> Any:  # noqa: ANN401
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect
+        self.written.append(sorted(request._filter["_id"] for request in requests))  # noqa: SLF001
+        return type("BulkWriteResult", (), {"upserted_count": len(requests)})()
+
+
+class FakeDatabase(dict):
+    client = None
+
+
+def test_failed_user_flush_stays_out_of_add_user(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(Users, "_known_users", KnownUsers())
+    monkeypatch.setattr(Users, "_pending_users", set())
+    monkeypatch.setattr(Users, "_flush_task", None)
+    monkeypatch.setattr(config, "USER_FLUSH_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "USER_FLUSH_INTERVAL_MS", 60_000)
+    stats: list[int] = []
+    users = FlakyUsers()
+    database = MongoDB(db=FakeDatabase(Users=users))  # type: ignore[arg-type]
+
+    async def increment_stats(users: int) -> None:
+        stats.append(users)
+
+    monkeypatch.setattr(database, "increment_stats", increment_stats)
+
+    async def run() -> None:
+        assert await database.add_user(1)
+        assert await database.add_user(2)
+
+        # The failed batch is buffered again and a later flush is scheduled.
+        assert Users._pending_users == {1, 2}  # noqa: SLF001
+        retry = Users._flush_task  # noqa: SLF001
+        assert retry is not None
+        retry.cancel()
+        Users._flush_task = None  # noqa: SLF001
+
+        assert not await database.add_user(2)
+        await database.flush_users()
+
+    asyncio.run(run())
+
+    assert users.written == [[1, 2]]
+    assert stats == [2]
+    assert not Users._pending_users  # noqa: SLF001